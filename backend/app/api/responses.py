@@ -0,0 +1,139 @@
+"""Réponse fichier avec support des requêtes HTTP Range.
+
+Le corps n'est jamais chargé en entier en mémoire : si le serveur ASGI
+annonce l'extension ``http.response.zerocopysend``, le fichier lui est
+confié pour un envoi par ``sendfile`` ; sinon il est lu par morceaux avec
+``os.pread`` dans un thread, sans bloquer la boucle d'événements.
+"""
+import os
+import re
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 256 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """ETag fort : les fichiers de sortie ne sont jamais réécrits sur place."""
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Intervalle inclusif demandé par un en-tête Range à plage unique.
+
+    Renvoie None si l'en-tête est ignoré (syntaxe inconnue ou plages
+    multiples : on sert alors le fichier entier) et lève ValueError si la
+    plage n'est pas satisfaisable.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # suffixe : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(Response):
+    def __init__(
+        self,
+        path: Path,
+        request: Request,
+        media_type: str = "application/octet-stream",
+        filename: Optional[str] = None,
+        cache_control: str = "public, max-age=3600",
+    ):
+        self.path = path
+        self.media_type = media_type
+        self.background = None
+        self.send_body = request.method != "HEAD"
+
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = file_etag(stat)
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+            "cache-control": cache_control,
+        }
+        if filename:
+            headers["content-disposition"] = f'attachment; filename="{filename}"'
+
+        self.start, self.end = 0, size - 1
+        self.status_code = 200
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if request.headers.get("if-none-match") == etag:
+            self.status_code = 304
+            self.start, self.end = 0, -1
+        elif range_header and (if_range is None or if_range == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                self.status_code = 416
+                self.start, self.end = 0, -1
+                headers["content-range"] = f"bytes */{size}"
+            else:
+                if byte_range is not None:
+                    self.status_code = 206
+                    self.start, self.end = byte_range
+                    headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+
+        if self.status_code != 304:
+            headers["content-length"] = str(self.end - self.start + 1)
+        if self.status_code in (304, 416):
+            self.media_type = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        count = self.end - self.start + 1
+        if not self.send_body or count <= 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        with open(self.path, "rb") as f:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": f,
+                    "offset": self.start,
+                    "count": count,
+                })
+                return
+
+            fd, offset = f.fileno(), self.start
+            while count > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(CHUNK_SIZE, count), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": count > 0})
+            if count > 0:
+                # fichier tronqué entre-temps : on clôt proprement la réponse
+                await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,120 @@
+import math
+import re
+import wave
+from pathlib import Path
+from typing import List, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from app.api.responses import FileRangeResponse, file_etag
+from app.services.conversion_service import conversion_service
+
+router = APIRouter(prefix="/api/audio", tags=["audio"])
+
+JOB_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{7,63}$")
+
+
+def _audio_path(job_id: str) -> Path:
+    if not JOB_ID_RE.match(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    path = conversion_service.output_path(job_id)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    return path
+
+def _segments(job_id: str) -> Tuple[List[float], bool]:
+    if not JOB_ID_RE.match(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    try:
+        return conversion_service.get_segments(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+@router.get("/info/{job_id}")
+async def get_audio_info(job_id: str):
+    path = _audio_path(job_id)
+    stat = path.stat()
+    with wave.open(str(path), "rb") as wf:
+        frames, rate, channels = wf.getnframes(), wf.getframerate(), wf.getnchannels()
+    return {
+        "job_id": job_id,
+        "size_bytes": stat.st_size,
+        "duration_seconds": round(frames / float(rate), 3),
+        "sample_rate": rate,
+        "channels": channels,
+        "etag": file_etag(stat),
+    }
+
+@router.api_route("/{job_id}", methods=["GET", "HEAD"])
+async def get_audio(job_id: str, request: Request):
+    return FileRangeResponse(_audio_path(job_id), request, media_type="audio/wav")
+
+@router.api_route("/{job_id}/download", methods=["GET", "HEAD"])
+async def download_audio(job_id: str, request: Request):
+    return FileRangeResponse(
+        _audio_path(job_id), request, media_type="audio/wav", filename=f"{job_id}.wav"
+    )
+
+@router.get("/{job_id}/manifest")
+async def get_manifest(job_id: str):
+    """Segments déjà disponibles ; la liste s'allonge pendant la conversion."""
+    durations, complete = _segments(job_id)
+    segments, start = [], 0.0
+    for index, duration in enumerate(durations):
+        segments.append({
+            "index": index,
+            "url": f"/api/audio/{job_id}/segments/{index}",
+            "start_seconds": round(start, 3),
+            "duration_seconds": round(duration, 3),
+        })
+        start += duration
+    return {"job_id": job_id, "complete": complete, "segments": segments}
+
+@router.get("/{job_id}/playlist.m3u8")
+async def get_playlist(job_id: str):
+    """Playlist HLS de type EVENT, close par ENDLIST à la fin du job."""
+    durations, complete = _segments(job_id)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        "#EXT-X-PLAYLIST-TYPE:EVENT",
+        f"#EXT-X-TARGETDURATION:{math.ceil(max(durations, default=1))}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+    ]
+    for index, duration in enumerate(durations):
+        lines.append(f"#EXTINF:{duration:.3f},")
+        lines.append(f"segments/{index}")
+    if complete:
+        lines.append("#EXT-X-ENDLIST")
+    return Response(
+        "\n".join(lines) + "\n",
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+@router.api_route("/{job_id}/segments/{index}", methods=["GET", "HEAD"])
+async def get_segment(job_id: str, index: int, request: Request):
+    durations, _ = _segments(job_id)
+    if not 0 <= index < len(durations):
+        raise HTTPException(status_code=404, detail="Segment not available")
+    return FileRangeResponse(
+        conversion_service.segment_path(job_id, index),
+        request,
+        media_type="audio/wav",
+        cache_control="public, max-age=31536000, immutable",
+    )
+
+@router.api_route("/{job_id}/preview", methods=["GET", "HEAD"])
+async def get_preview(job_id: str, request: Request):
+    """Premiers blocs du job, synthétisés en priorité : disponible bien avant la fin."""
+    if not JOB_ID_RE.match(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    try:
+        path = await run_in_threadpool(conversion_service.preview_path, job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Preview not ready")
+    return FileRangeResponse(path, request, media_type="audio/wav")
@@ -1,21 +1,53 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.exceptions import AdmissionRejected, JobStateError, TextExtractionError, TTSEngineError
 from app.models.conversion import ConversionRequest, ConversionResponse, ConversionStatusResponse
 from app.services.conversion_service import conversion_service
 
 router = APIRouter(prefix="/api/convert", tags=["conversion"])
 
+def client_identity(http_request: Request) -> str:
+    """Identité utilisée pour le partage équitable : l'adresse de la connexion.
+
+    L'en-tête X-Client-ID n'est pris en compte que s'il est posé par un
+    mandataire de confiance (TRUSTED_PROXIES) : sinon un client pourrait
+    changer d'identité à chaque requête et multiplier ses parts.
+    """
+    host = http_request.client.host if http_request.client else "anonymous"
+    client_id = http_request.headers.get("X-Client-ID")
+    if client_id and host in settings.TRUSTED_PROXIES:
+        return client_id
+    return host
+
 @router.post("/start", response_model=ConversionResponse)
-async def start_conversion(request: ConversionRequest):
+async def start_conversion(request: ConversionRequest, http_request: Request):
     try:
         job_id = conversion_service.start_conversion(
             file_id=request.file_id,
-            voice_model=request.voice_model
+            voice_model=request.voice_model,
+            priority=request.priority,
+            client_id=client_identity(http_request),
+            first_audio=request.first_audio,
+            previous_job_id=request.previous_job_id,
+            pages=request.pages,
+            chapters=request.chapters,
         )
         return ConversionResponse(
             job_id=job_id,
             status="started",
             message="Conversion started successfully"
         )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (TTSEngineError, TextExtractionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -27,3 +59,14 @@ async def get_status(job_id: str):
         raise HTTPException(status_code=404, detail="Job not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/{job_id}", response_model=ConversionStatusResponse)
+async def cancel_conversion(job_id: str):
+    try:
+        return await run_in_threadpool(conversion_service.cancel_conversion, job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    except JobStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,107 @@
+import hashlib
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from app.api.responses import FileRangeResponse
+from app.core.exceptions import TTSEngineError
+from app.models.preview import TTSPreviewRequest, TTSPreviewResponse, TTSStreamRequest
+from app.models.voice import VoiceValidationResponse
+from app.services.preview_service import preview_service
+from app.services.tts_engine import resolve_voice_path
+from app.services.voice_catalog import voice_catalog
+from app.services.voice_pool import voice_pool
+
+router = APIRouter(prefix="/api/preview", tags=["preview"])
+
+def _json_with_etag(request: Request, body: bytes, etag: str) -> Response:
+    # no-cache : le navigateur garde la liste mais la revalide (304 si inchangée)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@router.get("/voices")
+async def get_voices(request: Request):
+    body, etag = await run_in_threadpool(voice_catalog.response)
+    return _json_with_etag(request, body, etag)
+
+@router.post("/voices/validate", response_model=VoiceValidationResponse)
+async def validate_voices():
+    """Synthèse d'essai par voix ; seuls les modèles nouveaux ou modifiés sont relancés."""
+    return await run_in_threadpool(voice_catalog.validate, lambda: preview_service.engine)
+
+@router.get("/voices/{voice_id}")
+async def get_voice(voice_id: str, request: Request):
+    voice = await run_in_threadpool(voice_catalog.get, voice_id)
+    if voice is None:
+        raise HTTPException(status_code=404, detail="Voice not found")
+    body = voice.model_dump_json().encode()
+    return _json_with_etag(request, body, f'"{hashlib.sha1(body).hexdigest()[:20]}"')
+
+@router.post("/tts", response_model=TTSPreviewResponse)
+async def preview_tts(request: TTSPreviewRequest):
+    try:
+        resolve_voice_path(request.voice_model)
+    except TTSEngineError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        preview_id, duration, cached = await preview_service.synthesize(request)
+    except TTSEngineError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return TTSPreviewResponse(
+        audio_url=f"/api/preview/audio/{preview_id}",
+        duration_seconds=round(duration, 3),
+        voice_used=request.voice_model,
+        text_length=len(request.text),
+        cached=cached,
+    )
+
+@router.post("/tts/stream")
+async def stream_tts(request: TTSStreamRequest):
+    """WAV en transfert chunked : chaque phrase est envoyée dès qu'elle est synthétisée."""
+    try:
+        resolve_voice_path(request.voice_model)
+    except TTSEngineError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    chunks = await preview_service.stream(request)
+    # la première phrase est synthétisée avant d'envoyer le statut : une
+    # erreur de synthèse donne encore une vraie réponse d'erreur
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=422, detail="No text to synthesize")
+    except TTSEngineError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type="audio/wav",
+        # X-Accel-Buffering : pas de mise en tampon par un proxy nginx
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+@router.api_route("/audio/{preview_id}", methods=["GET", "HEAD"])
+async def get_preview_audio(preview_id: str, request: Request):
+    path = preview_service.preview_path(preview_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    return FileRangeResponse(path, request, media_type="audio/wav", cache_control="private, max-age=3600")
+
+@router.get("/pool")
+async def get_voice_pool():
+    """Sessions de voix chaudes (mémoire, chargements, taux de réussite), cache des aperçus
+    et répartition des CPU entre synthèses."""
+    return {
+        "preview_cache": preview_service.stats(),
+        "memory_budget_bytes": voice_pool.memory_budget,
+        "memory_used_bytes": voice_pool.memory_used(),
+        "interactive_slots": voice_pool.interactive_slots,
+        "voices": voice_pool.stats(),
+        "cpu": voice_pool.governor.describe(),
+    }
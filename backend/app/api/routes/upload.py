@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException, Request
+from app.core.exceptions import UploadError
+from app.models.upload import FileUploadResponse, UploadSessionCreate, UploadSessionResponse
+from app.services.upload_service import upload_service
+
+router = APIRouter(prefix="/api/upload", tags=["upload"])
+
+@router.post("/file", response_model=FileUploadResponse)
+async def upload_file(request: Request):
+    # Corps lu en flux : pas de UploadFile, qui mettrait tout le fichier en tampon
+    try:
+        return await upload_service.receive(
+            request.stream(), request.headers.get("content-type", "")
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.post("/sessions", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(request: UploadSessionCreate):
+    try:
+        return upload_service.create_session(request)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.get("/sessions/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(session_id: str):
+    """État de la session : le client reprend en renvoyant les parties absentes."""
+    try:
+        return upload_service.get_session(session_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.put("/sessions/{session_id}/parts/{index}", response_model=UploadSessionResponse)
+async def upload_part(session_id: str, index: int, request: Request):
+    try:
+        return await upload_service.write_part(session_id, index, request.stream())
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.post("/sessions/{session_id}/complete", response_model=FileUploadResponse)
+async def complete_upload_session(session_id: str):
+    try:
+        return await upload_service.complete_session(session_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.delete("/sessions/{session_id}", status_code=204)
+async def abort_upload_session(session_id: str):
+    try:
+        upload_service.get_session(session_id)
+        upload_service.abort_session(session_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
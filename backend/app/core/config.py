@@ -1,7 +1,108 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
 from pydantic_settings import BaseSettings
 
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
 class Settings(BaseSettings):
     API_TITLE: str = "Audio Book Converter"
     PORT: int = 8001
 
+    # Stockage
+    BASE_DIR: Path = BACKEND_DIR
+    VOICES_BASE_PATH: Path = BACKEND_DIR / "voices"
+    STORAGE_BASE_PATH: Path = BACKEND_DIR / "storage"
+    UPLOAD_DIR: Path = BACKEND_DIR / "storage" / "uploads"
+    OUTPUT_DIR: Path = BACKEND_DIR / "storage" / "outputs"
+    TEMP_DIR: Path = BACKEND_DIR / "storage" / "temp"
+
+    # Upload
+    MAX_FILE_SIZE: int = 50 * 1024 * 1024
+    ALLOWED_EXTENSIONS: List[str] = [".pdf", ".epub"]
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    # Upload reprenable par parties : limite plus haute, le transfert
+    # pouvant reprendre là où il s'est arrêté
+    MAX_RESUMABLE_FILE_SIZE: int = 1024 * 1024 * 1024
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600
+
+    # Piper (mêmes valeurs par défaut que tts.py)
+    PIPER_EXECUTABLE: str = "piper"
+    DEFAULT_VOICE_MODEL: str = "fr_FR-siwis-low"
+    DEFAULT_LENGTH_SCALE: float = 1.0
+    DEFAULT_NOISE_SCALE: float = 0.667
+    DEFAULT_NOISE_W: float = 0.8
+    SENTENCE_SILENCE: float = 0.35
+    PAUSE_BETWEEN_BLOCKS: float = 0.35
+
+    # Pool de voix : sessions Piper gardées chaudes dans ce budget mémoire
+    VOICE_POOL_MEMORY_BUDGET_MB: int = 2048
+    VOICE_WARMUP_TEXT: str = "Bonjour."
+    PIPER_TIMEOUT_SECONDS: float = 300.0
+    # Traînards : une fois le débit de la voix mesuré, un bloc expire après
+    # FACTOR x son temps attendu (au moins MIN secondes) et une copie de
+    # secours est lancée après SPECULATE_AFTER_FACTOR x ce temps (0 = jamais)
+    BLOCK_TIMEOUT_FACTOR: float = 10.0
+    BLOCK_TIMEOUT_MIN_SECONDS: float = 30.0
+    SPECULATE_AFTER_FACTOR: float = 3.0
+    SPECULATE_MIN_SECONDS: float = 5.0
+    # Bloc en échec : nouvelles tentatives espacées (délai doublé à chaque
+    # fois, plafonné), puis découpage en phrases pour isoler la fautive,
+    # remplacée par un silence ("silence"), omise ("skip") ou fatale ("fail")
+    BLOCK_RETRIES: int = 2
+    BLOCK_RETRY_BACKOFF_SECONDS: float = 0.5
+    BLOCK_RETRY_BACKOFF_MAX_SECONDS: float = 8.0
+    BAD_SENTENCE_POLICY: str = "silence"
+    # Répartition des cœurs (os.sched_getaffinity) entre synthèses simultanées :
+    # sans réglage, une synthèse par CPU avec un thread chacune ; avec l'un des
+    # deux, l'autre en est déduit
+    PIPER_MAX_CONCURRENCY: Optional[int] = None
+    PIPER_THREADS_PER_WORKER: Optional[int] = None
+    # Épingle chaque synthèse en cours sur son propre jeu de CPU. C'est ce qui
+    # impose le budget de threads : onnxruntime (Piper) ignore OMP_NUM_THREADS.
+    # None : épinglage dès que workers x threads tient dans les CPU disponibles
+    PIPER_PIN_CPUS: Optional[bool] = None
+    # Créneaux réservés aux synthèses interactives (aperçus, flux), en plus des
+    # créneaux des conversions : le premier son n'attend pas la fin d'un bloc
+    VOICE_POOL_INTERACTIVE_SLOTS: int = 1
+    # Réglages calibrés par `python -m app.tune` (lu aussi par tts.py)
+    TUNING_PROFILE_PATH: Path = BACKEND_DIR / "voices" / "tuning_profile.json"
+    # Intervalle minimal entre deux vérifications des mtimes du dossier des voix
+    VOICE_CATALOG_CHECK_SECONDS: float = 2.0
+
+    # Aperçu
+    PREVIEW_MAX_CHARS: int = 500
+    # Synthèse au fil de l'eau : premier morceau court pour un premier son rapide
+    STREAM_MAX_CHARS: int = 20000
+    STREAM_SENTENCE_MAX_CHARS: int = 300
+    STREAM_FIRST_CHUNK_CHARS: int = 80
+    # Cache LRU des aperçus synthétisés (sur disque, dans TEMP_DIR/previews)
+    PREVIEW_CACHE_MAX_ENTRIES: int = 256
+    PREVIEW_CACHE_MAX_MB: int = 100
+    # Cache du texte extrait et découpé (TEMP_DIR/text_cache), par document
+    TEXT_CACHE_MAX_MB: int = 500
+
+    # Découpage et ordonnancement
+    MAX_CHUNK_CHARS: int = 1500
+    SCHEDULER_WORKERS: Optional[int] = None  # None = une synthèse simultanée par worker
+    SCHEDULER_BATCH_SIZE: int = 2
+    # Blocs de tête d'un job passés en voie express pour un premier extrait
+    FIRST_AUDIO_BLOCKS: int = 2
+
+    # Partage équitable : poids de chaque classe de priorité
+    PRIORITY_WEIGHTS: Dict[str, float] = {"interactive": 8.0, "standard": 2.0, "bulk": 1.0}
+    # Le client est identifié par l'adresse de la connexion ; l'en-tête
+    # X-Client-ID n'est cru que s'il vient de l'un de ces mandataires
+    TRUSTED_PROXIES: List[str] = []
+    # Jobs "interactive" en cours par client ; les suivants passent en "standard"
+    INTERACTIVE_MAX_ACTIVE_JOBS: int = 1
+
+    # Contrôle d'admission : travail en file maximal, en secondes de synthèse
+    # (0 = désactivé). Débit supposé tant qu'une voix n'a pas été mesurée.
+    ADMISSION_MAX_BACKLOG_SECONDS: float = 4 * 3600
+    DEFAULT_SECONDS_PER_CHAR: float = 0.01
+
+
 settings = Settings()
@@ -0,0 +1,30 @@
+class AudioBookError(Exception):
+    """Erreur de base du backend."""
+
+
+class TextExtractionError(AudioBookError):
+    """Échec d'extraction du texte d'un document."""
+
+
+class UploadError(AudioBookError):
+    """Upload refusé ; `status_code` est le code HTTP à renvoyer."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TTSEngineError(AudioBookError):
+    """Échec de synthèse Piper."""
+
+
+class JobStateError(AudioBookError):
+    """Opération impossible dans l'état actuel du job (déjà terminé...)."""
+
+
+class AdmissionRejected(AudioBookError):
+    """File de conversion saturée : le client doit réessayer plus tard."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Conversion queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
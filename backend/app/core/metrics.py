@@ -0,0 +1,189 @@
+"""Métriques au format texte Prometheus, sans dépendance externe.
+
+Les compteurs et histogrammes sont mis à jour par le pipeline ; les jauges
+(file, workers...) sont calculées au moment du scrape par des callbacks, ce
+qui garde le rendu peu coûteux.
+"""
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+RTF_BUCKETS = (0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_format(v)}" for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """Jauge calculée au scrape : `collect` renvoie {valeurs de labels: valeur}."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, collect: Callable[[], Dict[LabelValues, float]],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        items = sorted(self.collect().items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_format(v)}" for k, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # par labels : [compte par bucket (+Inf inclus), somme, total]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._series.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_LATENCY = registry.register(Histogram(
+    "audiobook_stage_duration_seconds",
+    "Duration of each conversion pipeline stage (synthesis is per block).",
+    ["stage"],
+))
+SYNTHESIS_RTF = registry.register(Histogram(
+    "audiobook_synthesis_real_time_factor",
+    "Synthesis wall time divided by produced audio duration, per block.",
+    ["voice"],
+    buckets=RTF_BUCKETS,
+))
+PIPER_RESTARTS = registry.register(Counter(
+    "audiobook_piper_restarts_total",
+    "Piper processes lost mid-synthesis and relaunched, by reason: crash (unexpected "
+    "exit), timeout, or cancelled (cancelled job, losing hedged copy).",
+    ["voice", "reason"],
+))
+BLOCK_RECOVERIES = registry.register(Counter(
+    "audiobook_block_recoveries_total",
+    "Failed block syntheses handled without failing the job, by recovery step "
+    "(retry, bisect, bad_sentence).",
+    ["step"],
+))
+FURNITURE_CHARS = registry.register(Counter(
+    "audiobook_page_furniture_chars_removed_total",
+    "Characters of repeated PDF headers, footers and page numbers dropped before synthesis.",
+))
+SPECULATIVE_RUNS = registry.register(Counter(
+    "audiobook_speculative_blocks_total",
+    "Slow blocks re-run speculatively, by which copy finished first.",
+    ["winner"],
+))
+CACHE_REQUESTS = registry.register(Counter(
+    "audiobook_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ["cache", "result"],
+))
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
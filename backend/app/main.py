@@ -1,9 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
+from app.core.metrics import registry
 from app.api.routes.convert import router
+from app.api.routes.audio import router as audio_router
+from app.api.routes.upload import router as upload_router
+from app.api.routes.preview import router as preview_router
+from app.services.conversion_service import conversion_service
+from app.services.voice_pool import voice_pool
 
-app = FastAPI(title=settings.API_TITLE)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    voice_pool.shutdown()
+
+app = FastAPI(title=settings.API_TITLE, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,6 +27,9 @@ app.add_middleware(
 )
 
 app.include_router(router)
+app.include_router(audio_router)
+app.include_router(upload_router)
+app.include_router(preview_router)
 
 @app.get("/")
 async def root():
@@ -22,3 +38,16 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def ready():
+    load = conversion_service.load()
+    if load["saturated"]:
+        return JSONResponse(status_code=503, content={"status": "saturated", **load})
+    return {"status": "ready", **load}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,23 +1,48 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
+SELECTION_PATTERN = r"^\s*\d+\s*(-\s*\d+\s*)?(,\s*\d+\s*(-\s*\d+\s*)?)*$"
+
 class Status(str, Enum):
     PENDING = "pending"
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class Priority(str, Enum):
+    INTERACTIVE = "interactive"
+    STANDARD = "standard"
+    BULK = "bulk"
 
 class ConversionRequest(BaseModel):
     file_id: str
     voice_model: str = "default"
+    priority: Priority = Priority.STANDARD
+    # Premiers blocs synthétisés en priorité (voie express, hors partage
+    # équitable), écoutables comme extrait ; sans effet pour la classe bulk
+    first_audio: bool = False
+    # Conversion terminée d'une édition précédente : l'audio des blocs
+    # inchangés est repris, seuls les passages modifiés sont synthétisés
+    previous_job_id: Optional[str] = None
+    # Partie à convertir, numérotée à partir de 1 : pages d'un PDF ("120-180")
+    # ou documents du spine d'un EPUB ("3-5", "1,4-6")
+    pages: Optional[str] = Field(None, pattern=SELECTION_PATTERN)
+    chapters: Optional[str] = Field(None, pattern=SELECTION_PATTERN)
 
 class ConversionResponse(BaseModel):
     job_id: str
     status: str
     message: str
 
+class BadSentence(BaseModel):
+    """Phrase impossible à synthétiser, omise ou remplacée par un silence."""
+    block: int
+    text: str
+    error: str
+
 class ConversionStatusResponse(BaseModel):
     job_id: str              # LE CHAMP CRITIQUE
     status: Status
@@ -25,3 +50,18 @@ class ConversionStatusResponse(BaseModel):
     started_at: datetime
     completed_at: Optional[datetime] = None
     error: Optional[str] = None
+    priority: Priority = Priority.STANDARD
+    queue_position: Optional[int] = None
+    expected_start_at: Optional[datetime] = None
+    eta_seconds: Optional[float] = None
+    blocks_done: int = 0
+    blocks_total: int = 0
+    audio_seconds_produced: float = 0.0
+    preview_ready: bool = False
+    first_audio_seconds: Optional[float] = None  # délai entre le début du job et l'extrait
+    bad_sentences: List[BadSentence] = []
+    # en-têtes, pieds de page et numéros de page retirés avant synthèse
+    furniture_chars_removed: int = 0
+    furniture_seconds_saved: float = 0.0
+    previous_job_id: Optional[str] = None
+    blocks_reused: int = 0
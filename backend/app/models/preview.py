@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from app.core.config import settings
+
+class TTSPreviewRequest(BaseModel):
+    text: str = Field(min_length=1, max_length=settings.PREVIEW_MAX_CHARS)
+    voice_model: str = "default"
+    length_scale: float = Field(settings.DEFAULT_LENGTH_SCALE, gt=0, le=4)
+    noise_scale: float = Field(settings.DEFAULT_NOISE_SCALE, ge=0, le=2)
+    noise_w: float = Field(settings.DEFAULT_NOISE_W, ge=0, le=2)
+    sentence_silence: float = Field(settings.SENTENCE_SILENCE, ge=0, le=5)
+
+class TTSStreamRequest(TTSPreviewRequest):
+    text: str = Field(min_length=1, max_length=settings.STREAM_MAX_CHARS)
+
+class TTSPreviewResponse(BaseModel):
+    audio_url: str
+    duration_seconds: float
+    voice_used: str
+    text_length: int
+    cached: bool = False
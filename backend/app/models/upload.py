@@ -0,0 +1,34 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class FileUploadResponse(BaseModel):
+    file_id: str
+    filename: str
+    file_size: int
+    content_type: str
+    content_hash: str        # sha256 du contenu, base de la déduplication
+    format: str              # "pdf" ou "epub", d'après les octets et non l'extension
+    page_count: Optional[int] = None   # pages (PDF) ou documents du spine (EPUB)
+    word_count: Optional[int] = None   # estimation, pour le coût de conversion
+    duplicate: bool = False
+    message: str = "File uploaded successfully"
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    file_size: int = Field(gt=0)
+    content_hash: str = Field(pattern=r"^[0-9a-fA-F]{64}$")  # sha256, vérifié à la finalisation
+    content_type: str = "application/octet-stream"
+    part_size: Optional[int] = None  # défaut : UPLOAD_PART_SIZE
+
+class UploadSessionResponse(BaseModel):
+    session_id: str
+    filename: str
+    file_size: int
+    content_hash: str
+    content_type: str
+    part_size: int
+    part_count: int
+    received_parts: List[int] = []
+    expires_at: datetime
@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from enum import Enum
+
+class VoiceQuality(str, Enum):
+    X_LOW = "x_low"
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
+class VoiceInfo(BaseModel):
+    id: str                   # nom du modèle, ex. "fr_FR-siwis-low"
+    name: str
+    display_name: str
+    model_path: str           # relatif au dossier parent de VOICES_BASE_PATH, comme voice_metadata.json
+    full_path: str
+    language: str
+    dataset: str
+    quality: VoiceQuality
+    sample_rate: int
+    file_size_mb: float
+    is_available: bool        # le .onnx est présent (sinon seule la config l'est)
+    metadata: Dict[str, Any] = {}
+
+class VoiceListResponse(BaseModel):
+    voices: List[VoiceInfo]
+    default_voice: str
+    count: int
+
+class VoiceValidationResult(BaseModel):
+    voice_id: str
+    model_path: str
+    working: bool
+    error: Optional[str] = None
+    seconds: Optional[float] = None
+
+class VoiceValidationResponse(BaseModel):
+    validation_results: List[VoiceValidationResult]
+    summary: Dict[str, Any]
+    recommendations: List[str]
@@ -0,0 +1,65 @@
+import os
+import wave
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+# Morceau à assembler : un fichier WAV, ou une durée de silence en secondes
+Part = Union[Path, float]
+
+
+def append_wav(dst_wf: wave.Wave_write, src_wav: Path):
+    with wave.open(str(src_wav), "rb") as sf:
+        # vérifier format
+        assert sf.getnchannels() == dst_wf.getnchannels()
+        assert sf.getsampwidth() == dst_wf.getsampwidth()
+        assert sf.getframerate() == dst_wf.getframerate()
+        dst_wf.writeframes(sf.readframes(sf.getnframes()))
+
+
+def write_silence(dst_wf: wave.Wave_write, seconds: float, sample_rate: int):
+    if seconds <= 0:
+        return
+    n_samples = int(seconds * sample_rate)
+    dst_wf.writeframes(b"\x00" * dst_wf.getsampwidth() * dst_wf.getnchannels() * n_samples)
+
+
+def wav_duration(path: Path) -> float:
+    """Durée d'un fichier WAV en secondes (lecture de l'en-tête seulement)."""
+    with wave.open(str(path), "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+
+def concatenate_wavs(
+    wavs: Sequence[Part], out_path: Path, pause: float = 0.0, reference: Optional[Path] = None
+) -> float:
+    """Concatène les WAV de blocs dans `out_path` et renvoie la durée en secondes.
+
+    Un nombre à la place d'un fichier insère un silence de cette durée.
+    `reference` donne le format quand `wavs` ne contient que des silences.
+    """
+    reference = next((w for w in wavs if not isinstance(w, (int, float))), reference)
+    if reference is None:
+        raise ValueError("No audio to concatenate")
+
+    with wave.open(str(reference), "rb") as ref:
+        nch, sw, sr = ref.getnchannels(), ref.getsampwidth(), ref.getframerate()
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # écriture dans un fichier temporaire puis renommage : un fichier servi
+    # en téléchargement est toujours complet
+    part_path = out_path.with_name(out_path.name + ".part")
+    with wave.open(str(part_path), "wb") as out_wf:
+        out_wf.setnchannels(nch)
+        out_wf.setsampwidth(sw)
+        out_wf.setframerate(sr)
+        for j, w in enumerate(wavs):
+            if isinstance(w, (int, float)):
+                write_silence(out_wf, w, sr)
+            else:
+                append_wav(out_wf, w)
+            # petite pause entre blocs (en plus du sentence_silence interne)
+            if pause and j < len(wavs) - 1:
+                write_silence(out_wf, pause, sr)
+        frames = out_wf.getnframes()
+    os.replace(part_path, out_path)
+    return frames / float(sr)
@@ -0,0 +1,180 @@
+"""Calibration des réglages de synthèse sur cette machine.
+
+Pour chaque voix, un court texte d'exemple est synthétisé avec plusieurs
+combinaisons (synthèses simultanées × threads par synthèse × taille de
+bloc) et le débit est mesuré en secondes d'audio produites par seconde
+écoulée. La recherche se fait par coordonnées : d'abord la répartition des
+cœurs à taille de bloc par défaut, puis la taille de bloc avec la
+meilleure répartition, ce qui garde le balayage court.
+
+Les sessions Piper sont chargées avant chaque mesure : seul compte le
+régime établi, comme dans le backend où les voix restent chaudes. Les
+mesures se font avec chaque synthèse épinglée sur son créneau de CPU :
+c'est ce qui impose le nombre de threads à onnxruntime, sans quoi le
+balayage des threads ne mesurerait rien. Le profil note l'épinglage.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services.audio_processor import wav_duration
+from app.services.cpu_governor import CpuGovernor, available_cpus
+from app.services.text_processor import TextProcessor
+from app.services.tts_engine import TTSEngine
+from app.services.tuning_profile import TuningProfile, tuning_profile
+from app.services.voice_pool import VoicePool
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_PARAGRAPHS = (
+    "Le soleil se levait à peine sur la vallée quand Marie ouvrit la fenêtre. "
+    "L'air sentait l'herbe mouillée, et au loin, une cloche sonnait six heures.",
+    "Elle descendit l'escalier sans bruit, prit son manteau et sortit dans la rue "
+    "encore déserte. Personne ne devait savoir où elle allait ce matin-là.",
+    "« Tu reviendras avant midi ? » avait demandé son frère la veille. Elle n'avait "
+    "pas répondu ; il y a des questions qui n'appellent que le silence.",
+    "Au bout du chemin, la gare était éclairée. Le train de sept heures douze "
+    "attendait déjà, ses portes ouvertes sur des compartiments presque vides.",
+)
+SAMPLE_CHARS = 6000
+MAX_CHARS_CANDIDATES = (500, 1000, 1500, 2500)
+
+
+def sample_text(chars: int = SAMPLE_CHARS) -> str:
+    """Texte d'exemple d'environ `chars` caractères, en paragraphes."""
+    paragraphs: List[str] = []
+    total = 0
+    while total < chars:
+        paragraph = SAMPLE_PARAGRAPHS[len(paragraphs) % len(SAMPLE_PARAGRAPHS)]
+        paragraphs.append(paragraph)
+        total += len(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def core_splits(cpu_count: int) -> List[Tuple[int, int]]:
+    """Répartitions (synthèses, threads) qui occupent tous les cœurs."""
+    splits = []
+    threads = 1
+    while threads <= cpu_count:
+        splits.append((cpu_count // threads, threads))
+        threads *= 2
+    return splits
+
+
+class Trial:
+    """Mesure d'une combinaison de réglages."""
+
+    __slots__ = ("workers", "threads", "max_chars", "audio_seconds", "wall_seconds", "pinned")
+
+    def __init__(self, workers: int, threads: int, max_chars: int,
+                 audio_seconds: float, wall_seconds: float, pinned: bool = True):
+        self.workers = workers
+        self.threads = threads
+        self.max_chars = max_chars
+        self.audio_seconds = audio_seconds
+        self.wall_seconds = wall_seconds
+        self.pinned = pinned
+
+    @property
+    def speed(self) -> float:
+        """Secondes d'audio produites par seconde écoulée."""
+        return self.audio_seconds / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def entry(self, quality: str) -> Dict[str, object]:
+        """Entrée du profil pour une voix."""
+        return {
+            "workers": self.workers,
+            "threads": self.threads,
+            "max_chars": self.max_chars,
+            "audio_seconds_per_second": round(self.speed, 3),
+            "quality": quality,
+            "pinned": self.pinned,
+        }
+
+
+class Autotuner:
+    def __init__(
+        self,
+        piper_executable: Optional[str] = None,
+        cpus: Optional[Sequence[int]] = None,
+        text: Optional[str] = None,
+        max_chars_candidates: Iterable[int] = MAX_CHARS_CANDIDATES,
+        pin: bool = True,
+    ):
+        self.piper_executable = piper_executable
+        self.cpus = list(cpus) if cpus is not None else available_cpus()
+        self.text = text or sample_text()
+        self.max_chars_candidates = tuple(max_chars_candidates)
+        # sans épinglage, `threads` n'est pas appliqué à Piper (voir cpu_governor)
+        self.pin = pin
+
+    def measure(self, voice_path: Path, workers: int, threads: int, max_chars: int) -> Trial:
+        """Synthétise le texte d'exemple avec ces réglages et mesure le débit."""
+        governor = CpuGovernor(workers=workers, threads=threads, cpus=self.cpus, pin=self.pin)
+        # budget mémoire illimité : la mesure ne doit pas évincer ses propres sessions
+        pool = VoicePool(memory_budget=1 << 62, governor=governor)
+        engine = TTSEngine(self.piper_executable, pool=pool)
+        blocks = list(TextProcessor.chunk_paragraphs(self.text, max_chars))
+        try:
+            with TemporaryDirectory(prefix="tune-") as tmp, ThreadPoolExecutor(workers) as executor:
+                def synthesize(item: Tuple[int, str]) -> float:
+                    index, block = item
+                    path = Path(tmp) / f"{index}.wav"
+                    engine.synthesize_block(block, str(voice_path), str(path))
+                    return wav_duration(path)
+
+                # une session chaude par synthèse simultanée, hors mesure
+                warmup = [settings.VOICE_WARMUP_TEXT] * workers
+                list(executor.map(synthesize, enumerate(warmup, start=len(blocks))))
+
+                started = time.monotonic()
+                audio = sum(executor.map(synthesize, enumerate(blocks)))
+                wall = time.monotonic() - started
+        finally:
+            pool.shutdown()
+        trial = Trial(workers, threads, max_chars, audio, wall, governor.pin)
+        logger.info("%s: %d x %d threads, max_chars=%d -> %.2f audio s/s",
+                    voice_path.stem, workers, threads, max_chars, trial.speed)
+        return trial
+
+    def tune_voice(self, voice_path: Path) -> Tuple[Trial, List[Trial]]:
+        """Meilleur essai pour une voix, et tous les essais effectués."""
+        trials: List[Trial] = []
+
+        def run(workers: int, threads: int, max_chars: int) -> Trial:
+            trial = self.measure(voice_path, workers, threads, max_chars)
+            trials.append(trial)
+            return trial
+
+        default_chars = settings.MAX_CHUNK_CHARS
+        best = max(
+            (run(w, t, default_chars) for w, t in core_splits(len(self.cpus))),
+            key=lambda trial: trial.speed,
+        )
+        for max_chars in self.max_chars_candidates:
+            if max_chars != default_chars:
+                trial = run(best.workers, best.threads, max_chars)
+                if trial.speed > best.speed:
+                    best = trial
+        return best, trials
+
+    def tune(
+        self,
+        voices: Dict[str, Tuple[Path, str]],
+        profile: Optional[TuningProfile] = None,
+    ) -> Dict[str, dict]:
+        """Calibre chaque voix (id -> (modèle, qualité)) et enregistre le profil.
+
+        Les voix déjà présentes dans le profil et non recalibrées sont gardées.
+        """
+        profile = profile or tuning_profile
+        entries = profile.voices()
+        for voice_id, (voice_path, quality) in voices.items():
+            best, _ = self.tune_voice(voice_path)
+            entries[voice_id] = best.entry(quality)
+        profile.save(entries, len(self.cpus))
+        return entries
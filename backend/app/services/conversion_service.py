@@ -1,62 +1,695 @@
+import logging
+import math
+import os
+import shutil
 import threading
 import time
-from datetime import datetime
-from typing import Dict, Any
+import wave
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
 from uuid import uuid4
-from app.models.conversion import ConversionStatusResponse, Status
+from app.core.config import settings
+from app.core.exceptions import AdmissionRejected, JobStateError, TTSEngineError
+from app.core.metrics import BLOCK_RECOVERIES, FURNITURE_CHARS, STAGE_LATENCY, SYNTHESIS_RTF, Gauge, registry
+from app.models.conversion import ConversionStatusResponse, Priority, Status
+from app.services.audio_processor import Part, concatenate_wavs, wav_duration
+from app.services.incremental import (
+    PlannedBlock, load_manifest, plan_blocks, reusable_blocks, write_manifest,
+)
+from app.services.scheduler import TaskGroup, WorkStealingScheduler, scheduler
+from app.services.text_cache import text_cache
+from app.services.text_extractor import TextExtractor, selected_indices
+from app.services.text_processor import TextProcessor
+from app.services.throughput import ThroughputModel, throughput_model
+from app.services.tts_engine import TTSEngine, resolve_voice_path
+from app.services.tuning_profile import tuning_profile
+from app.services.upload_service import CHARS_PER_PAGE, CHARS_PER_WORD, upload_service
+
+logger = logging.getLogger(__name__)
+
+# Répartition de la progression : extraction, synthèse des blocs, assemblage
+EXTRACTION_PROGRESS = 5
+SYNTHESIS_PROGRESS = 90
+# Part de worker minimale supposée pour un job qui partage les cœurs
+MIN_PARALLELISM = 0.05
+FINISHED = (Status.COMPLETED, Status.FAILED, Status.CANCELLED)
+
+
+def find_upload(file_id: str) -> Path:
+    """Retrouve le fichier uploadé (`<file_id>.<ext>`) dans UPLOAD_DIR."""
+    if not file_id or "/" in file_id or "\\" in file_id or file_id.startswith("."):
+        raise FileNotFoundError(f"File {file_id} not found")
+    for path in sorted(Path(settings.UPLOAD_DIR).glob(f"{file_id}.*")):
+        if path.suffix.lower() in settings.ALLOWED_EXTENSIONS:
+            return path
+    raise FileNotFoundError(f"File {file_id} not found")
+
 
 class ConversionService:
-    def __init__(self):
+    def __init__(
+        self,
+        job_scheduler: Optional[WorkStealingScheduler] = None,
+        model: Optional[ThroughputModel] = None,
+    ):
         self.jobs: Dict[str, Dict[str, Any]] = {}
-    
-    def start_conversion(self, file_id: str, voice_model: str = "default") -> str:
+        self.scheduler = job_scheduler or scheduler
+        self.model = model or throughput_model
+        self._engine: Optional[TTSEngine] = None
+        self._lock = threading.Lock()
+        self._preview_lock = threading.Lock()
+
+    @property
+    def engine(self) -> TTSEngine:
+        if self._engine is None:
+            self._engine = TTSEngine()
+        return self._engine
+
+    def start_conversion(
+        self,
+        file_id: str,
+        voice_model: str = "default",
+        priority: Priority = Priority.STANDARD,
+        client_id: str = "anonymous",
+        first_audio: bool = False,
+        previous_job_id: Optional[str] = None,
+        pages: Optional[str] = None,
+        chapters: Optional[str] = None,
+    ) -> str:
+        source = find_upload(file_id)
+        voice_path = resolve_voice_path(voice_model)
+        if previous_job_id is not None and load_manifest(self.segment_dir(previous_job_id)) is None:
+            raise FileNotFoundError(f"No completed conversion {previous_job_id} to reuse")
+        TextExtractor.check_selection(source, pages, chapters)
+        chars_estimate = self._estimate_chars(source, pages or chapters)
+        estimated_cost = self.model.estimate_seconds(voice_path, chars_estimate)
+        self._admit(estimated_cost)
         job_id = str(uuid4())
-        
+
         job_data = {
             "job_id": job_id,
             "status": Status.PENDING,
             "progress": 0,
             "started_at": datetime.now(),
             "completed_at": None,
-            "error": None
+            "error": None,
+            "priority": priority,
+            "client_id": client_id,
+            "source": source,
+            "voice_path": voice_path,
+            "blocks_total": 0,
+            "blocks_done": 0,
+            "chars_estimate": chars_estimate,
+            "chars_total": 0,
+            "chars_done": 0,
+            "audio_seconds_produced": 0.0,
+            "synthesis_started": None,
+            "block_durations": [],
+            "segments_ready": 0,
+            # la voie express passe devant les autres clients : jamais pour bulk
+            "first_audio_blocks": (
+                settings.FIRST_AUDIO_BLOCKS if first_audio and priority != Priority.BULK else 0
+            ),
+            "preview_ready": False,
+            "first_audio_seconds": None,
+            "bad_sentences": [],
+            "furniture_chars_removed": 0,
+            "furniture_seconds_saved": 0.0,
+            "previous_job_id": previous_job_id,
+            "pages": pages,
+            "chapters": chapters,
+            "block_paragraphs": [],
+            "blocks_reused": 0,
         }
-        
-        self.jobs[job_id] = job_data
-        
-        # Démarrer le traitement en arrière-plan (threading, pas asyncio)
-        thread = threading.Thread(target=self._process_conversion, args=(job_id,))
-        thread.daemon = True
-        thread.start()
-        
+
+        with self._lock:
+            # classe interactive bornée par client : au-delà, le job passe en standard
+            if priority == Priority.INTERACTIVE and self._active_jobs(
+                client_id, priority
+            ) >= settings.INTERACTIVE_MAX_ACTIVE_JOBS:
+                logger.info("Client %s already has %d interactive jobs: job %s runs as standard",
+                            client_id, settings.INTERACTIVE_MAX_ACTIVE_JOBS, job_id)
+                job_data["priority"] = Priority.STANDARD
+            self.jobs[job_id] = job_data
+
+        # L'extraction est elle-même une tâche du scheduler global ; elle soumet
+        # ensuite un groupe de tâches de synthèse, une par bloc. Le job garde
+        # sa place dans le flux (client, priorité) jusque-là.
+        self.scheduler.submit(
+            job_id,
+            [lambda: self._prepare(job_id)],
+            on_complete=lambda group: self._on_prepare_complete(job_id, group),
+            keep_open=True,
+            estimated_cost=estimated_cost,
+            **self._flow(job_data),
+        )
+
         return job_id
-    
+
     def get_conversion_status(self, job_id: str) -> ConversionStatusResponse:
         if job_id not in self.jobs:
             raise ValueError(f"Job {job_id} not found")
-        
+
+        job_data = self.jobs[job_id]
+        status = ConversionStatusResponse(**job_data)
+        wait = 0.0
+        if status.status == Status.PENDING:
+            wait = self._fill_queue_estimate(status)
+        if status.status == Status.COMPLETED:
+            status.eta_seconds = 0.0
+        elif status.status not in FINISHED and wait is not None:
+            status.eta_seconds = round(wait + self._remaining_seconds(job_data), 1)
+        return status
+
+    def cancel_conversion(self, job_id: str) -> ConversionStatusResponse:
+        """Arrête un job : blocs en file abandonnés, processus Piper tués, fichiers supprimés.
+
+        Annuler un job déjà annulé ne fait rien ; un job terminé ou en échec
+        lève JobStateError.
+        """
+        if job_id not in self.jobs:
+            raise ValueError(f"Job {job_id} not found")
+        job_data = self.jobs[job_id]
+        with self._lock:
+            status = job_data["status"]
+            if status in (Status.COMPLETED, Status.FAILED):
+                raise JobStateError(f"Job {job_id} is already {status.value}")
+            if status != Status.CANCELLED:
+                job_data["status"] = Status.CANCELLED
+                job_data["completed_at"] = datetime.now()
+                job_data["segments_ready"] = 0
+                job_data["preview_ready"] = False
+        if status != Status.CANCELLED:
+            # les workers libérés reprennent aussitôt les tâches des autres jobs
+            dropped = self.scheduler.cancel(job_id)
+            killed = self.engine.cancel(job_id)
+            shutil.rmtree(self.segment_dir(job_id), ignore_errors=True)
+            self.output_path(job_id).unlink(missing_ok=True)
+            logger.info("Job %s cancelled (%d queued blocks dropped, %d syntheses killed)",
+                        job_id, dropped, killed)
+        return self.get_conversion_status(job_id)
+
+    def _remaining_seconds(self, job_data: Dict[str, Any]) -> float:
+        """Temps de synthèse restant d'après le modèle de débit mesuré.
+
+        Le parallélisme est celui observé pour ce job (secondes de worker
+        consommées par seconde écoulée), ou tous les workers disponibles
+        tant qu'aucun bloc n'est terminé.
+        """
+        voice = job_data["voice_path"]
+        if job_data["blocks_total"]:
+            remaining_chars = job_data["chars_total"] - job_data["chars_done"]
+            remaining_blocks = job_data["blocks_total"] - job_data["blocks_done"]
+        else:
+            remaining_chars = job_data["chars_estimate"]
+            remaining_blocks = math.ceil(remaining_chars / tuning_profile.max_chars(Path(voice).stem))
+        if remaining_blocks <= 0:
+            return 0.0
+
+        parallel = float(self.scheduler.num_workers)
+        started = job_data["synthesis_started"]
+        if job_data["chars_done"] and started is not None:
+            elapsed = time.monotonic() - started
+            consumed = self.model.estimate_seconds(voice, job_data["chars_done"])
+            if elapsed > 0:
+                parallel = min(parallel, max(consumed / elapsed, MIN_PARALLELISM))
+        parallel = min(parallel, remaining_blocks)
+        return self.model.estimate_seconds(voice, remaining_chars) / parallel
+
+    def _admit(self, cost: float):
+        """Refuse le job si la file dépasse la limite une fois ce job ajouté.
+
+        Le délai de nouvel essai est le temps nécessaire, au débit actuel,
+        pour écouler l'excédent. Une file vide accepte toujours un job.
+        """
+        limit = settings.ADMISSION_MAX_BACKLOG_SECONDS
+        if limit <= 0:
+            return
+        backlog = self.scheduler.backlog()
+        if backlog <= 0 or backlog + cost <= limit:
+            return
+        # Sans mesure récente, on suppose tous les workers occupés à plein
+        rate = self.scheduler.drain_rate() or float(self.scheduler.num_workers)
+        excess = backlog + cost - limit
+        raise AdmissionRejected(max(1, math.ceil(excess / rate)))
+
+    def load(self) -> Dict[str, Any]:
+        """Charge actuelle, pour /metrics et /ready."""
+        stats = self.scheduler.stats()
+        backlog = self.scheduler.backlog()
+        limit = settings.ADMISSION_MAX_BACKLOG_SECONDS
+        return {
+            "queued_tasks": stats["queued"],
+            "running_tasks": stats["running"],
+            "workers": stats["workers"],
+            "utilization": stats["running"] / stats["workers"],
+            "backlog_seconds": backlog,
+            "saturated": limit > 0 and backlog >= limit,
+        }
+
+    def _active_jobs(self, client_id: str, priority: Priority) -> int:
+        """Jobs en attente ou en cours d'un client dans une classe (appelé sous self._lock)."""
+        return sum(
+            1 for job_data in self.jobs.values()
+            if job_data["client_id"] == client_id and job_data["priority"] == priority
+            and job_data["status"] in (Status.PENDING, Status.PROCESSING)
+        )
+
+    def count_jobs(self) -> Dict[str, int]:
+        counts = {status.value: 0 for status in Status}
+        for job_data in list(self.jobs.values()):
+            counts[job_data["status"].value] += 1
+        return counts
+
+    def _flow(self, job_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Flux de partage équitable du job : un par client et par priorité."""
+        priority = job_data["priority"]
+        return {
+            "flow": (job_data["client_id"], priority.value),
+            "weight": settings.PRIORITY_WEIGHTS.get(priority.value, 1.0),
+        }
+
+    @staticmethod
+    def _estimate_chars(source: Path, selection: Optional[str] = None) -> float:
+        """Estimation grossière du nombre de caractères avant extraction.
+
+        Pour une sélection de pages ou de chapitres, au prorata de la part retenue.
+        Sans métadonnées d'envoi, on refait la pré-analyse : la taille du fichier
+        (images, polices) ne dit rien de la quantité de texte.
+        """
+        info = upload_service.load_metadata(source.stem)
+        if info is not None:
+            page_count, word_count = info.page_count, info.word_count
+        else:
+            page_count, word_count = upload_service.analyze(source, source.suffix.lstrip(".").lower())
+        share = 1.0
+        if selection and page_count:
+            share = len(selected_indices(selection, page_count)) / page_count
+        if word_count:
+            return float(word_count * CHARS_PER_WORD) * share
+        if page_count:
+            return float(page_count * CHARS_PER_PAGE) * share
+        # illisible : l'extraction échouera de toute façon
+        return 0.0
+
+    def _fill_queue_estimate(self, status: ConversionStatusResponse) -> Optional[float]:
+        """Renseigne la position en file ; renvoie l'attente estimée (None si inconnue)."""
+        info = self.scheduler.queue_info(status.job_id)
+        if info is None:
+            return 0.0
+        status.queue_position, work_ahead = info
+        rate = self.scheduler.drain_rate()
+        if not rate:
+            return None if work_ahead else 0.0
+        wait = work_ahead / rate
+        status.expected_start_at = datetime.now() + timedelta(seconds=wait)
+        return wait
+
+    def output_path(self, job_id: str) -> Path:
+        return Path(settings.OUTPUT_DIR) / f"{job_id}.wav"
+
+    def segment_dir(self, job_id: str) -> Path:
+        return Path(settings.OUTPUT_DIR) / "segments" / job_id
+
+    def segment_path(self, job_id: str, index: int) -> Path:
+        return self.segment_dir(job_id) / f"seg_{index:05d}.wav"
+
+    def get_segments(self, job_id: str) -> Tuple[List[float], bool]:
+        """Durées des segments déjà publiés (dans l'ordre) et fin de la liste.
+
+        Un segment est un bloc synthétisé ; il n'est publié qu'une fois tous
+        les blocs précédents terminés, si bien que la liste ne fait que
+        s'allonger pendant la conversion.
+        """
+        if job_id not in self.jobs:
+            raise ValueError(f"Job {job_id} not found")
         job_data = self.jobs[job_id]
-        return ConversionStatusResponse(**job_data)
-    
-    def _process_conversion(self, job_id: str):
-        """Traitement en arrière-plan avec threading."""
+        with self._lock:
+            durations = job_data["block_durations"][:job_data["segments_ready"]]
+        complete = job_data["status"] in FINISHED
+        return list(durations), complete
+
+    def preview_path(self, job_id: str) -> Path:
+        """Extrait du job : ses premiers blocs, assemblés à la première demande."""
+        if job_id not in self.jobs:
+            raise ValueError(f"Job {job_id} not found")
+        job_data = self.jobs[job_id]
+        if not job_data["preview_ready"]:
+            raise LookupError(f"Preview of job {job_id} is not ready")
+        path = self.segment_dir(job_id) / "preview.wav"
+        with self._preview_lock:
+            if not path.exists():
+                count = min(job_data["first_audio_blocks"], job_data["blocks_total"])
+                wavs = [self.segment_path(job_id, i) for i in range(count)]
+                concatenate_wavs(wavs, path, settings.PAUSE_BETWEEN_BLOCKS)
+        return path
+
+    def _prepare(self, job_id: str):
+        """Extraction + nettoyage + découpage, puis soumission des blocs."""
+        job_data = self.jobs[job_id]
+        with self._lock:
+            if job_data["status"] == Status.CANCELLED:
+                return
+            job_data["status"] = Status.PROCESSING
+
+        voice_path = job_data["voice_path"]
+        paragraphs, furniture = self._extract_paragraphs(
+            job_data["source"], job_data["pages"], job_data["chapters"]
+        )
+        if not paragraphs:
+            raise ValueError("No text found in document after cleaning")
+        previous = None
+        if job_data["previous_job_id"]:
+            previous = reusable_blocks(
+                load_manifest(self.segment_dir(job_data["previous_job_id"])), voice_path
+            )
+        # taille de bloc calibrée pour la voix, à défaut MAX_CHUNK_CHARS
+        plan = plan_blocks(paragraphs, tuning_profile.max_chars(voice_path.stem), previous)
+        blocks = ["\n".join(group) for group, _ in plan]
+        if furniture:
+            saved = self.model.estimate_seconds(job_data["voice_path"], furniture)
+            logger.info("Job %s: dropped %d characters of page headers/footers (~%.0fs of synthesis)",
+                        job_id, furniture, saved)
+            FURNITURE_CHARS.inc(furniture)
+            job_data["furniture_chars_removed"] = furniture
+            job_data["furniture_seconds_saved"] = round(saved, 1)
+
+        wavs = [self.segment_path(job_id, i) for i in range(len(blocks))]
+        self.segment_dir(job_id).mkdir(parents=True, exist_ok=True)
+        reused = self._reuse_segments(job_data, plan, wavs)
+        todo = [i for i in range(len(blocks)) if i not in reused]
+
+        with self._lock:
+            # annulé pendant l'extraction : rien à soumettre
+            if job_data["status"] == Status.CANCELLED:
+                shutil.rmtree(self.segment_dir(job_id), ignore_errors=True)
+                return
+            job_data["block_paragraphs"] = [group for group, _ in plan]
+            job_data["block_durations"] = [None] * len(blocks)
+            job_data["blocks_total"] = len(blocks)
+            job_data["chars_total"] = sum(len(blocks[i]) for i in todo)
+            job_data["progress"] = EXTRACTION_PROGRESS
+            for index, audio_seconds in reused.items():
+                job_data["blocks_done"] += 1
+                job_data["blocks_reused"] += 1
+                job_data["audio_seconds_produced"] += audio_seconds
+                self._publish_segments(job_data, index, audio_seconds)
+
+        # hors du verrou : sans bloc à synthétiser (tout est repris), submit
+        # appelle _assemble aussitôt dans ce thread, et _assemble le reprend.
+        # Une annulation arrivée entre-temps est vue par chaque tâche et par _assemble.
+        self.scheduler.submit(
+            job_id,
+            [self._block_task(job_id, i, blocks[i], wavs[i]) for i in todo],
+            on_complete=lambda group: self._assemble(job_id, wavs, group),
+            costs=[self.model.estimate_seconds(voice_path, len(blocks[i])) for i in todo],
+            # premiers blocs du livre encore à synthétiser (todo est trié)
+            express=sum(1 for i in todo if i < job_data["first_audio_blocks"]),
+            **self._flow(job_data),
+        )
+
+    def _reuse_segments(
+        self, job_data: Dict[str, Any], plan: List[PlannedBlock], wavs: List[Path]
+    ) -> Dict[int, float]:
+        """Reprend (lien physique, sinon copie) l'audio des blocs inchangés ; renvoie leurs durées."""
+        reused: Dict[int, float] = {}
+        previous_id = job_data["previous_job_id"]
+        for index, (_, old_index) in enumerate(plan):
+            if old_index is None:
+                continue
+            source = self.segment_path(previous_id, old_index)
+            try:
+                try:
+                    os.link(source, wavs[index])
+                except OSError:
+                    shutil.copyfile(source, wavs[index])
+                reused[index] = wav_duration(wavs[index])
+            except (OSError, EOFError, wave.Error) as e:
+                # segment supprimé entre-temps : le bloc sera synthétisé
+                logger.warning("Job %s: cannot reuse segment %d of %s: %s",
+                               job_data["job_id"], old_index, previous_id, e)
+                wavs[index].unlink(missing_ok=True)
+        if reused:
+            logger.info("Job %s: reusing %d of %d blocks from %s",
+                        job_data["job_id"], len(reused), len(plan), previous_id)
+        return reused
+
+    @staticmethod
+    def _extract_paragraphs(
+        source: Path, pages: Optional[str] = None, chapters: Optional[str] = None
+    ) -> Tuple[List[str], int]:
+        """Paragraphes du document (ou de la sélection) et caractères d'en-têtes retirés.
+
+        Lus depuis le cache de texte si possible.
+        """
+        key = text_cache.key(source, f"pages={pages or ''};chapters={chapters or ''}")
+        cached = text_cache.get(key)
+        if cached is not None:
+            paragraphs, meta = cached
+            return paragraphs, meta.get("furniture_chars", 0)
+
+        t0 = time.monotonic()
+        raw = TextExtractor.extract_from_file(source, pages=pages, chapters=chapters)
+        t1 = time.monotonic()
+        raw, furniture = TextProcessor.strip_page_furniture(raw)
+        text = TextProcessor.clean_text(raw)
+        paragraphs = TextProcessor.paragraphs(text)
+        STAGE_LATENCY.observe(t1 - t0, stage="extraction")
+        STAGE_LATENCY.observe(time.monotonic() - t1, stage="cleaning")
+        if paragraphs:
+            text_cache.put(key, paragraphs, {"furniture_chars": furniture})
+        return paragraphs, furniture
+
+    def _block_task(self, job_id: str, index: int, block: str, wav: Path):
+        def run():
+            job_data = self.jobs[job_id]
+            if job_data["status"] == Status.CANCELLED:
+                return
+            voice_path = job_data["voice_path"]
+            t0 = time.monotonic()
+            if job_data["synthesis_started"] is None:
+                job_data["synthesis_started"] = t0
+            try:
+                synthesis_seconds = self._synthesize_with_recovery(job_id, index, block, wav)
+                elapsed = time.monotonic() - t0
+                audio_seconds = wav_duration(wav)
+            except Exception:
+                # synthèse tuée ou segments supprimés par l'annulation
+                if job_data["status"] == Status.CANCELLED:
+                    return
+                raise
+            STAGE_LATENCY.observe(elapsed, stage="synthesis")
+            # le modèle de débit ne voit que l'appel réussi, sans attentes
+            # entre tentatives ni découpage en phrases
+            if synthesis_seconds is not None:
+                self.model.record(voice_path, len(block), synthesis_seconds)
+                if audio_seconds > 0:
+                    SYNTHESIS_RTF.observe(synthesis_seconds / audio_seconds, voice=voice_path.stem)
+            with self._lock:
+                if job_data["status"] == Status.CANCELLED:
+                    return
+                job_data["blocks_done"] += 1
+                job_data["chars_done"] += len(block)
+                job_data["audio_seconds_produced"] += audio_seconds
+                self._publish_segments(job_data, index, audio_seconds)
+                done, total = job_data["chars_done"], job_data["chars_total"]
+                job_data["progress"] = EXTRACTION_PROGRESS + SYNTHESIS_PROGRESS * done // total
+        return run
+
+    def _synthesize(self, job_id: str, text: str, wav: Path):
+        voice_path = self.jobs[job_id]["voice_path"]
+        self.engine.synthesize_block(
+            text, str(voice_path), str(wav), tag=job_id, **self._block_deadlines(voice_path, text)
+        )
+
+    def _synthesize_with_retry(self, job_id: str, text: str, wav: Path) -> float:
+        """Synthèse avec nouvelles tentatives espacées ; renvoie la durée de l'appel réussi.
+
+        La dernière erreur remonte.
+        """
+        job_data = self.jobs[job_id]
+        delay = settings.BLOCK_RETRY_BACKOFF_SECONDS
+        for attempt in range(settings.BLOCK_RETRIES + 1):
+            started = time.monotonic()
+            try:
+                self._synthesize(job_id, text, wav)
+                return time.monotonic() - started
+            except TTSEngineError as e:
+                if attempt == settings.BLOCK_RETRIES or job_data["status"] == Status.CANCELLED:
+                    raise
+                logger.warning("Job %s: synthesis failed (%s), retrying in %.1fs", job_id, e, delay)
+                BLOCK_RECOVERIES.inc(step="retry")
+                time.sleep(delay)
+                delay = min(delay * 2, settings.BLOCK_RETRY_BACKOFF_MAX_SECONDS)
+
+    def _synthesize_with_recovery(self, job_id: str, index: int, block: str, wav: Path) -> Optional[float]:
+        """Synthétise un bloc ; s'il échoue toujours, isole la ou les phrases fautives.
+
+        Le bloc est coupé en phrases puis synthétisé par moitiés, récursivement :
+        une phrase qui échoue seule est journalisée puis, selon
+        BAD_SENTENCE_POLICY, remplacée par un silence de durée estimée ou
+        omise. Si aucune phrase ne passe, une synthèse d'essai vérifie la
+        voix : si elle échoue aussi, la voix elle-même est en cause et
+        l'erreur d'origine remonte ; sinon le bloc devient silence.
+
+        Renvoie la durée de la synthèse réussie du bloc entier, ou None si le
+        bloc a dû être découpé (durée sans rapport avec sa longueur).
+        """
+        try:
+            return self._synthesize_with_retry(job_id, block, wav)
+        except TTSEngineError as e:
+            if settings.BAD_SENTENCE_POLICY == "fail" or self.jobs[job_id]["status"] == Status.CANCELLED:
+                raise
+            error = e
+        logger.warning("Job %s: block %d keeps failing (%s), isolating the offending sentence",
+                       job_id, index, error)
+        BLOCK_RECOVERIES.inc(step="bisect")
+        sentences = list(TextProcessor.split_sentences(block, settings.STREAM_SENTENCE_MAX_CHARS))
+        parts: List[Part] = []
+        if len(sentences) > 1:
+            middle = len(sentences) // 2
+            parts += self._bisect(job_id, index, sentences[:middle], wav.with_suffix(".0.wav"))
+            parts += self._bisect(job_id, index, sentences[middle:], wav.with_suffix(".1.wav"))
+        else:
+            parts += self._bad_sentence(job_id, index, block, error)
+        files = [part for part in parts if isinstance(part, Path)]
+        try:
+            reference = None
+            if not files:
+                reference = wav.with_suffix(".probe.wav")
+                files.append(reference)
+                try:
+                    self._synthesize(job_id, settings.VOICE_WARMUP_TEXT, reference)
+                except TTSEngineError:
+                    raise error
+            concatenate_wavs(parts, wav, reference=reference)
+        finally:
+            for part in files:
+                part.unlink(missing_ok=True)
+        return None
+
+    def _bisect(self, job_id: str, index: int, sentences: List[str], wav: Path) -> List[Part]:
+        """Morceaux audio de `sentences`, les phrases en échec isolées par dichotomie."""
+        try:
+            self._synthesize(job_id, " ".join(sentences), wav)
+            return [wav]
+        except TTSEngineError as e:
+            if self.jobs[job_id]["status"] == Status.CANCELLED:
+                raise
+            if len(sentences) == 1:
+                return self._bad_sentence(job_id, index, sentences[0], e)
+        middle = len(sentences) // 2
+        return (self._bisect(job_id, index, sentences[:middle], wav.with_suffix(".0.wav"))
+                + self._bisect(job_id, index, sentences[middle:], wav.with_suffix(".1.wav")))
+
+    def _bad_sentence(self, job_id: str, index: int, sentence: str, error: BaseException) -> List[Part]:
+        """Journalise une phrase impossible à synthétiser ; renvoie son remplaçant."""
+        logger.error("Job %s: block %d, skipping sentence that cannot be synthesized (%s): %r",
+                     job_id, index, error, sentence)
+        BLOCK_RECOVERIES.inc(step="bad_sentence")
+        with self._lock:
+            self.jobs[job_id]["bad_sentences"].append(
+                {"block": index, "text": sentence, "error": str(error)}
+            )
+        if settings.BAD_SENTENCE_POLICY == "skip":
+            return []
+        return [TTSEngine._estimate_audio_duration(
+            sentence, settings.DEFAULT_LENGTH_SCALE, settings.SENTENCE_SILENCE
+        )]
+
+    def _block_deadlines(self, voice_path: Path, block: str) -> Dict[str, Optional[float]]:
+        """Délai maximal d'un bloc et délai avant sa copie de secours, d'après le débit mesuré.
+
+        Tant que la voix n'est pas mesurée, seul le délai global de Piper s'applique.
+        """
+        if not self.model.is_measured(voice_path):
+            return {"timeout": None, "hedge_after": None}
+        expected = self.model.estimate_seconds(voice_path, len(block))
+        timeout = max(settings.BLOCK_TIMEOUT_MIN_SECONDS, settings.BLOCK_TIMEOUT_FACTOR * expected)
+        hedge_after = None
+        if settings.SPECULATE_AFTER_FACTOR > 0:
+            hedge_after = max(settings.SPECULATE_MIN_SECONDS, settings.SPECULATE_AFTER_FACTOR * expected)
+        return {"timeout": timeout, "hedge_after": hedge_after}
+
+    @staticmethod
+    def _publish_segments(job_data: Dict[str, Any], index: int, audio_seconds: float):
+        """Avance le préfixe contigu de blocs terminés (appelé sous self._lock)."""
+        durations = job_data["block_durations"]
+        durations[index] = audio_seconds
+        ready = job_data["segments_ready"]
+        while ready < len(durations) and durations[ready] is not None:
+            ready += 1
+        job_data["segments_ready"] = ready
+        wanted = min(job_data.get("first_audio_blocks", 0), len(durations))
+        if wanted and ready >= wanted and not job_data.get("preview_ready"):
+            job_data["preview_ready"] = True
+            elapsed = (datetime.now() - job_data["started_at"]).total_seconds()
+            job_data["first_audio_seconds"] = round(elapsed, 3)
+            STAGE_LATENCY.observe(elapsed, stage="first_audio")
+
+    def _on_prepare_complete(self, job_id: str, group: TaskGroup):
+        if group.failed:
+            self._fail(job_id, group.errors[0])
+
+    def _assemble(self, job_id: str, wavs: List[Path], group: TaskGroup):
+        """Appelé quand tous les blocs du job sont terminés."""
         try:
             job_data = self.jobs[job_id]
-            job_data["status"] = Status.PROCESSING
-            
-            # Simulation du traitement
-            for i in range(1, 5):
-                time.sleep(1)  # time.sleep au lieu d'asyncio.sleep
-                job_data["progress"] = i * 25
-            
-            # Conversion terminée
-            job_data["status"] = Status.COMPLETED
-            job_data["progress"] = 100
-            job_data["completed_at"] = datetime.now()
-            
+            if group.failed:
+                self._fail(job_id, group.errors[0])
+                return
+            if job_data["status"] == Status.CANCELLED:
+                return
+            t0 = time.monotonic()
+            concatenate_wavs(wavs, self.output_path(job_id), settings.PAUSE_BETWEEN_BLOCKS)
+            STAGE_LATENCY.observe(time.monotonic() - t0, stage="assembly")
+            # base d'une future reconversion incrémentale
+            write_manifest(self.segment_dir(job_id), job_data["voice_path"], job_data["block_paragraphs"])
+
+            # Conversion terminée, sauf si annulée pendant l'assemblage
+            with self._lock:
+                if job_data["status"] == Status.CANCELLED:
+                    self.output_path(job_id).unlink(missing_ok=True)
+                    return
+                job_data["status"] = Status.COMPLETED
+                job_data["progress"] = 100
+                job_data["completed_at"] = datetime.now()
         except Exception as e:
-            job_data["status"] = Status.FAILED
-            job_data["error"] = str(e)
-            job_data["completed_at"] = datetime.now()
+            self._fail(job_id, e)
+
+    def _fail(self, job_id: str, error: BaseException):
+        job_data = self.jobs[job_id]
+        if job_data["status"] == Status.CANCELLED:
+            return
+        job_data["status"] = Status.FAILED
+        job_data["error"] = str(error)
+        job_data["completed_at"] = datetime.now()
+        shutil.rmtree(self.segment_dir(job_id), ignore_errors=True)
+        with self._lock:
+            job_data["segments_ready"] = 0
+            job_data["preview_ready"] = False
 
 # Instance globale
 conversion_service = ConversionService()
+
+registry.register(Gauge(
+    "audiobook_jobs",
+    "Conversion jobs by status.",
+    lambda: {(status,): n for status, n in conversion_service.count_jobs().items()},
+    ["status"],
+))
+registry.register(Gauge(
+    "audiobook_queue_depth",
+    "Block tasks waiting in the scheduler.",
+    lambda: {(): conversion_service.scheduler.stats()["queued"]},
+))
+registry.register(Gauge(
+    "audiobook_queue_backlog_seconds",
+    "Estimated synthesis seconds of queued work.",
+    lambda: {(): conversion_service.scheduler.backlog()},
+))
+registry.register(Gauge(
+    "audiobook_worker_utilization",
+    "Fraction of scheduler workers currently running a task.",
+    lambda: {(): conversion_service.load()["utilization"]},
+))
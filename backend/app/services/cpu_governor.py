@@ -0,0 +1,128 @@
+"""Répartition des cœurs entre les processus Piper actifs.
+
+onnxruntime démarre par défaut un thread de calcul par cœur : plusieurs
+Piper en parallèle se disputent alors tous les cœurs et le débit baisse
+quand la concurrence monte. Le gouverneur découpe les CPU utilisables par
+le processus (``os.sched_getaffinity``, qui tient compte des limites du
+conteneur) en créneaux : chaque synthèse en cours occupe un créneau, avec
+une affinité limitée aux CPU de ce créneau, disjoints de ceux des autres.
+
+C'est l'affinité qui impose le budget de threads : le runtime ONNX de
+Piper ne lit pas OMP_NUM_THREADS et dimensionne son pool sur les CPU qu'il
+voit. Les variables d'environnement ne servent qu'aux autres runtimes de
+calcul. L'épinglage est donc activé par défaut dès que les créneaux
+tiennent dans les CPU disponibles ; sans lui, le budget n'est pas appliqué.
+"""
+import logging
+import os
+from typing import Dict, List, Optional, Sequence
+
+from app.core.config import settings
+from app.services.tuning_profile import tuning_profile
+
+logger = logging.getLogger(__name__)
+
+# Variables lues par les runtimes de calcul pour dimensionner leurs pools
+# (OpenMP, BLAS ; pas onnxruntime, d'où l'épinglage)
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def available_cpus() -> List[int]:
+    """CPU sur lesquels ce processus peut tourner (cpuset du conteneur compris)."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return list(range(os.cpu_count() or 1))
+
+
+def pin_process(pid: int, cpus: Sequence[int]):
+    """Restreint tous les threads existants de `pid` à `cpus` (les suivants en héritent)."""
+    try:
+        tids = [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        tids = [pid]
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except OSError:
+            # thread terminé entre-temps, ou plateforme sans affinité
+            pass
+
+
+class CpuGovernor:
+    """Créneaux de CPU des synthèses simultanées.
+
+    Sans réglage, on prend ceux du profil de calibration pour la voix par
+    défaut, sinon un créneau par CPU et un thread par synthèse. Fixer
+    `workers` donne à chacun sa part des cœurs ; fixer `threads` déduit le
+    nombre de créneaux.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        threads: Optional[int] = None,
+        pin: Optional[bool] = None,
+        cpus: Optional[Sequence[int]] = None,
+    ):
+        self.cpus = list(cpus) if cpus is not None else available_cpus()
+        count = len(self.cpus)
+        workers = workers or settings.PIPER_MAX_CONCURRENCY
+        threads = threads or settings.PIPER_THREADS_PER_WORKER
+        if not workers and not threads:
+            tuned = tuning_profile.voice(settings.DEFAULT_VOICE_MODEL)
+            if tuned is not None:
+                workers, threads = tuned["workers"], tuned["threads"]
+        if workers and not threads:
+            threads = max(1, count // workers)
+        elif threads and not workers:
+            workers = max(1, count // threads)
+        elif not workers:
+            workers, threads = count, 1
+        self.workers = max(1, workers)
+        self.threads = max(1, threads)
+        if pin is None:
+            pin = settings.PIPER_PIN_CPUS
+        if pin is None:
+            pin = self.workers * self.threads <= count
+        self.pin = pin
+        if not self.pin:
+            logger.info("CPU pinning disabled: Piper processes use all %d CPUs each", count)
+        elif self.workers * self.threads > count:
+            logger.warning(
+                "%d workers x %d threads exceed the %d available CPUs: CPU sets will overlap",
+                self.workers, self.threads, count,
+            )
+        self.cpu_sets = [self._cpu_set(slot) for slot in range(self.workers)]
+
+    def _cpu_set(self, slot: int) -> List[int]:
+        # créneaux contigus (cœurs voisins partagent leurs caches), repliés
+        # sur le début de la liste si le budget dépasse les CPU disponibles
+        start = slot * self.threads
+        return [self.cpus[(start + i) % len(self.cpus)] for i in range(self.threads)]
+
+    def environment(self, base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Environnement d'un processus Piper, avec son budget de threads."""
+        env = dict(os.environ if base is None else base)
+        for name in THREAD_ENV_VARS:
+            env[name] = str(self.threads)
+        return env
+
+    def apply(self, pid: int, slot: int):
+        """Épingle le processus `pid` sur les CPU du créneau `slot` (si activé)."""
+        if self.pin:
+            pin_process(pid, self.cpu_sets[slot % self.workers])
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "cpus": self.cpus,
+            "workers": self.workers,
+            # sans épinglage, rien n'impose ce budget à Piper
+            "threads_per_worker": self.threads if self.pin else None,
+            "pinned": self.pin,
+            "cpu_sets": self.cpu_sets if self.pin else [],
+        }
+
+
+# Instance globale
+cpu_governor = CpuGovernor()
@@ -0,0 +1,129 @@
+"""Reconversion incrémentale d'un document révisé.
+
+Une conversion terminée laisse, à côté de ses segments, un manifeste :
+l'empreinte de chaque paragraphe de chaque bloc et la signature de la
+synthèse (modèle de voix et paramètres). Pour convertir une nouvelle
+édition, la suite de ses paragraphes est alignée sur celle de la
+conversion précédente (difflib, sur les empreintes) ; tout bloc précédent
+dont les paragraphes se retrouvent à l'identique et d'un seul tenant est
+repris tel quel avec son audio. Seuls les paragraphes restants sont
+regroupés en nouveaux blocs et synthétisés.
+
+Regrouper toute la nouvelle édition puis comparer les blocs ne suffirait
+pas : le découpage glouton décale toutes les frontières de blocs après
+la moindre modification.
+"""
+import bisect
+import hashlib
+import json
+import logging
+import os
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services.text_processor import TextProcessor
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# (paragraphes du bloc, indice du bloc précédent repris ou None)
+PlannedBlock = Tuple[List[str], Optional[int]]
+
+
+def paragraph_hash(paragraph: str) -> str:
+    return hashlib.blake2b(paragraph.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def synthesis_signature(voice_path: Path) -> Dict[str, Any]:
+    """Ce qui doit être identique pour que l'audio d'un bloc soit réutilisable."""
+    stat = voice_path.stat()
+    return {
+        "voice": str(voice_path),
+        "voice_size": stat.st_size,
+        "voice_mtime_ns": stat.st_mtime_ns,
+        "length_scale": settings.DEFAULT_LENGTH_SCALE,
+        "noise_scale": settings.DEFAULT_NOISE_SCALE,
+        "noise_w": settings.DEFAULT_NOISE_W,
+        "sentence_silence": settings.SENTENCE_SILENCE,
+    }
+
+
+def write_manifest(segment_dir: Path, voice_path: Path, blocks: Sequence[Sequence[str]]):
+    """Enregistre les empreintes des paragraphes de chaque bloc d'une conversion terminée."""
+    data = {
+        "version": MANIFEST_VERSION,
+        "signature": synthesis_signature(voice_path),
+        "blocks": [[paragraph_hash(p) for p in block] for block in blocks],
+    }
+    tmp = segment_dir / f"{MANIFEST_NAME}.part"
+    tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, segment_dir / MANIFEST_NAME)
+
+
+def load_manifest(segment_dir: Path) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads((segment_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data if data.get("version") == MANIFEST_VERSION else None
+
+
+def reusable_blocks(manifest: Optional[Dict[str, Any]], voice_path: Path) -> Optional[List[List[str]]]:
+    """Empreintes des blocs précédents, si leur audio correspond à cette synthèse."""
+    if manifest is None:
+        return None
+    if manifest.get("signature") != synthesis_signature(voice_path):
+        logger.info("Previous conversion used another voice or settings: nothing to reuse")
+        return None
+    return manifest["blocks"]
+
+
+def plan_blocks(
+    paragraphs: Sequence[str],
+    max_chars: int,
+    previous: Optional[Sequence[Sequence[str]]] = None,
+) -> List[PlannedBlock]:
+    """Blocs de la nouvelle édition, en reprenant ceux de `previous` restés identiques.
+
+    `previous` donne, bloc par bloc, les empreintes des paragraphes de la
+    conversion précédente. Sans lui, c'est le découpage habituel.
+    """
+    if not previous:
+        return [(group, None) for group in TextProcessor.group_paragraphs(paragraphs, max_chars)]
+
+    old = [h for block in previous for h in block]
+    starts, total = [], 0
+    for block in previous:
+        starts.append(total)
+        total += len(block)
+    new = [paragraph_hash(p) for p in paragraphs]
+
+    # début (dans la nouvelle suite) -> (bloc précédent, nombre de paragraphes)
+    reuse: Dict[int, Tuple[int, int]] = {}
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for a, b, size in matcher.get_matching_blocks():
+        k = bisect.bisect_left(starts, a)
+        while k < len(previous) and starts[k] + len(previous[k]) <= a + size:
+            if previous[k]:
+                reuse[b + starts[k] - a] = (k, len(previous[k]))
+            k += 1
+
+    plan: List[PlannedBlock] = []
+    gap: List[str] = []
+    i = 0
+    while i < len(paragraphs):
+        if i in reuse:
+            plan.extend((group, None) for group in TextProcessor.group_paragraphs(gap, max_chars))
+            gap = []
+            k, count = reuse[i]
+            plan.append((list(paragraphs[i:i + count]), k))
+            i += count
+        else:
+            gap.append(paragraphs[i])
+            i += 1
+    plan.extend((group, None) for group in TextProcessor.group_paragraphs(gap, max_chars))
+    return plan
@@ -0,0 +1,278 @@
+"""Aperçus de voix : une courte phrase synthétisée sur une session chaude.
+
+Les aperçus sont mis en cache (LRU, sur disque) sous une clé dérivée de la
+voix, des paramètres et du texte : tout le monde écoute la même phrase
+d'exemple, qui n'est synthétisée qu'une fois. Des requêtes identiques
+arrivant pendant la synthèse attendent le même résultat au lieu d'en
+lancer chacune une ; l'attente se fait sur la boucle de l'application,
+sans occuper de thread.
+
+Pour les textes plus longs, `stream` produit un WAV au fil de l'eau : la
+synthèse se fait phrase par phrase et chaque phrase est envoyée dès
+qu'elle est prête, la suivante étant synthétisée pendant l'envoi.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import struct
+import tempfile
+import threading
+import wave
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.exceptions import TTSEngineError
+from app.core.metrics import record_cache
+from app.models.preview import TTSPreviewRequest, TTSStreamRequest
+from app.services.audio_processor import wav_duration
+from app.services.text_processor import TextProcessor
+from app.services.tts_engine import TTSEngine, resolve_voice_path
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+STREAM_PREFETCH = 2  # phrases synthétisées d'avance pendant l'envoi
+UNKNOWN_LENGTH = 0xFFFFFFFF
+
+
+def streaming_wav_header(rate: int, channels: int, sample_width: int) -> bytes:
+    """En-tête WAV de longueur inconnue (tailles RIFF et data au maximum)."""
+    byte_rate = rate * channels * sample_width
+    return b"".join([
+        b"RIFF", struct.pack("<I", UNKNOWN_LENGTH), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, channels, rate, byte_rate,
+                             channels * sample_width, sample_width * 8),
+        b"data", struct.pack("<I", UNKNOWN_LENGTH),
+    ])
+
+
+class _Flight:
+    """Synthèse en cours, partagée par les requêtes identiques."""
+
+    __slots__ = ("done", "duration", "error")
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.duration: Optional[float] = None
+        self.error: Optional[Exception] = None
+
+
+class PreviewService:
+    def __init__(self, engine: Optional[TTSEngine] = None):
+        self._engine = engine
+        # preview_id -> (durée, taille), du moins au plus récemment servi
+        self._entries: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self) -> TTSEngine:
+        if self._engine is None:
+            self._engine = TTSEngine()
+        return self._engine
+
+    @staticmethod
+    def preview_dir() -> Path:
+        return Path(settings.TEMP_DIR) / "previews"
+
+    def preview_path(self, preview_id: str) -> Optional[Path]:
+        if not PREVIEW_ID_RE.match(preview_id):
+            return None
+        path = self.preview_dir() / f"{preview_id}.wav"
+        return path if path.is_file() else None
+
+    @staticmethod
+    def cache_key(request: TTSPreviewRequest, voice_path: Path) -> str:
+        """Identifiant d'un aperçu : voix (et version du modèle), paramètres, texte."""
+        stat = voice_path.stat()
+        material = json.dumps([
+            str(voice_path), stat.st_size, stat.st_mtime_ns,
+            request.length_scale, request.noise_scale, request.noise_w,
+            request.sentence_silence,
+            hashlib.sha256(request.text.encode()).hexdigest(),
+        ])
+        return hashlib.sha256(material.encode()).hexdigest()[:32]
+
+    async def synthesize(self, request: TTSPreviewRequest) -> Tuple[str, float, bool]:
+        """Renvoie l'identifiant, la durée de l'aperçu et s'il venait du cache."""
+        voice_path = resolve_voice_path(request.voice_model)
+        preview_id = self.cache_key(request, voice_path)
+
+        missed = False
+        while True:
+            with self._lock:
+                duration = self._lookup(preview_id)
+                if duration is not None:
+                    record_cache("preview", True)
+                    return preview_id, duration, True
+                flight = self._inflight.get(preview_id)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[preview_id] = _Flight()
+            if not missed:
+                missed = True
+                record_cache("preview", False)
+            if leader:
+                break
+            await flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.duration is not None:
+                return preview_id, flight.duration, True
+            # meneur annulé (client parti) : l'un des suivants reprend la synthèse
+
+        try:
+            flight.duration = await self._render(request, voice_path, preview_id)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(preview_id, None)
+            flight.done.set()
+        return preview_id, flight.duration, False
+
+    def _lookup(self, preview_id: str) -> Optional[float]:
+        """Durée d'un aperçu en cache (sous verrou), fichier laissé par un run précédent compris."""
+        entry = self._entries.get(preview_id)
+        if entry is not None:
+            if (self.preview_dir() / f"{preview_id}.wav").is_file():
+                self._entries.move_to_end(preview_id)
+                return entry[0]
+            self._bytes -= entry[1]
+            del self._entries[preview_id]
+            return None
+        path = self.preview_dir() / f"{preview_id}.wav"
+        try:
+            duration, size = wav_duration(path), path.stat().st_size
+        except (OSError, EOFError, wave.Error):
+            return None
+        self._add(preview_id, duration, size)
+        return duration
+
+    async def _render(self, request: TTSPreviewRequest, voice_path: Path, preview_id: str) -> float:
+        directory = self.preview_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{preview_id}.wav"
+        tmp = path.with_suffix(".wav.part")
+        try:
+            duration = await self.engine.synthesize_text(
+                request.text,
+                str(voice_path),
+                str(tmp),
+                length_scale=request.length_scale,
+                noise_scale=request.noise_scale,
+                noise_w=request.noise_w,
+                sentence_silence=request.sentence_silence,
+                interactive=True,
+            )
+            try:
+                tmp.replace(path)
+            except FileNotFoundError:
+                raise TTSEngineError("Piper produced no audio")
+        finally:
+            tmp.unlink(missing_ok=True)
+        with self._lock:
+            self._add(preview_id, duration, path.stat().st_size)
+        return duration
+
+    def _add(self, preview_id: str, duration: float, size: int):
+        """Ajoute une entrée et évince les moins récentes au-delà des limites (sous verrou)."""
+        self._entries[preview_id] = (duration, size)
+        self._bytes += size
+        max_bytes = settings.PREVIEW_CACHE_MAX_MB * 1024 * 1024
+        while len(self._entries) > 1 and (
+            len(self._entries) > settings.PREVIEW_CACHE_MAX_ENTRIES or self._bytes > max_bytes
+        ):
+            evicted, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            (self.preview_dir() / f"{evicted}.wav").unlink(missing_ok=True)
+
+    async def stream(self, request: TTSStreamRequest) -> AsyncIterator[bytes]:
+        """En-tête WAV puis PCM, une phrase à la fois.
+
+        La voix est résolue à l'appel : une voix inconnue lève avant le
+        premier octet. Le premier morceau produit contient l'en-tête.
+        """
+        voice_path = resolve_voice_path(request.voice_model)
+        sentences = list(TextProcessor.split_sentences(
+            TextProcessor.clean_text(request.text),
+            settings.STREAM_SENTENCE_MAX_CHARS,
+            settings.STREAM_FIRST_CHUNK_CHARS,
+        ))
+        return self._stream_sentences(request, voice_path, sentences)
+
+    async def _stream_sentences(
+        self, request: TTSStreamRequest, voice_path: Path, sentences
+    ) -> AsyncIterator[bytes]:
+        queue: "asyncio.Queue" = asyncio.Queue(maxsize=STREAM_PREFETCH)
+
+        async def produce():
+            with tempfile.TemporaryDirectory(prefix="tts-stream-") as tmp:
+                try:
+                    for i, sentence in enumerate(sentences):
+                        wav = await self._render_sentence(
+                            request, voice_path, sentence, Path(tmp) / f"{i}.wav"
+                        )
+                        await queue.put(wav)
+                except Exception as e:
+                    await queue.put(e)
+                    return
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        header_sent = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                params, frames = item
+                if not header_sent:
+                    header_sent = True
+                    yield streaming_wav_header(*params) + frames
+                else:
+                    yield frames
+        finally:
+            # client parti ou erreur : inutile de synthétiser la suite
+            producer.cancel()
+
+    async def _render_sentence(
+        self, request: TTSStreamRequest, voice_path: Path, sentence: str, path: Path
+    ) -> Tuple[Tuple[int, int, int], bytes]:
+        # annuler le producteur annule la synthèse en cours dans le pool ;
+        # voie interactive : le premier son n'attend pas les blocs des conversions
+        await self.engine.synthesize_text(
+            sentence,
+            str(voice_path),
+            str(path),
+            length_scale=request.length_scale,
+            noise_scale=request.noise_scale,
+            noise_w=request.noise_w,
+            sentence_silence=request.sentence_silence,
+            interactive=True,
+        )
+        with wave.open(str(path), "rb") as wf:
+            params = (wf.getframerate(), wf.getnchannels(), wf.getsampwidth())
+            frames = wf.readframes(wf.getnframes())
+        path.unlink()
+        return params, frames
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "in_flight": len(self._inflight),
+            }
+
+
+# Instance globale
+preview_service = PreviewService()
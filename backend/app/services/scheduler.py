@@ -0,0 +1,431 @@
+"""Scheduler global partagé par tous les jobs de conversion.
+
+Chaque job est découpé en tâches de niveau bloc, regroupées dans un
+``TaskGroup`` qui suit la complétion du job. Les tâches soumises attendent
+dans une file d'injection à files pondérées (weighted fair queuing) : un
+flux par client et par classe de priorité, servi selon son temps virtuel,
+si bien qu'un client qui envoie toute sa bibliothèque n'affame pas les
+autres. Dans un flux, les jobs passent dans l'ordre de soumission.
+
+Chaque worker prend un petit lot dans cette file vers sa deque locale ;
+quand la file d'injection est vide, un worker inactif vole la moitié de la
+deque d'un autre, si bien que la fin d'un gros job occupe tous les cœurs
+libres.
+
+Une voie express, servie avant tout le reste, reçoit les quelques tâches
+dont un job veut le résultat au plus vite (ses premiers blocs, pour un
+premier extrait audible sans attendre son tour).
+"""
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services.cpu_governor import cpu_governor
+
+logger = logging.getLogger(__name__)
+
+IDLE_WAIT_SECONDS = 0.05
+DRAIN_WINDOW_SECONDS = 60.0
+DEFAULT_FLOW = "default"
+
+
+class TaskGroup:
+    """Tâches d'un même job soumises ensemble, avec suivi de complétion."""
+
+    def __init__(
+        self,
+        job_id: str,
+        total: int,
+        on_complete: Optional[Callable[["TaskGroup"], None]] = None,
+    ):
+        self.job_id = job_id
+        self.total = total
+        self.done = 0
+        self.errors: List[BaseException] = []
+        self.cancelled = False
+        self.on_complete = on_complete
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.errors)
+
+    def cancel(self):
+        """Les tâches pas encore démarrées seront ignorées."""
+        self.cancelled = True
+
+    def _task_finished(self, error: Optional[BaseException] = None) -> bool:
+        with self._lock:
+            self.done += 1
+            if error is not None:
+                self.errors.append(error)
+                # Un bloc en échec fait échouer le job : inutile de continuer
+                self.cancelled = True
+            return self.done == self.total
+
+
+class _Task:
+    __slots__ = ("group", "fn", "cost")
+
+    def __init__(self, group: TaskGroup, fn: Callable[[], None], cost: float):
+        self.group = group
+        self.fn = fn
+        self.cost = cost
+
+
+class _JobEntry:
+    """Tâches en attente d'un job dans son flux."""
+
+    __slots__ = ("job_id", "tasks", "holds", "estimate", "started")
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.tasks: Deque[_Task] = deque()
+        # Groupes `keep_open` non terminés : d'autres tâches vont suivre
+        self.holds = 0
+        # Coût attendu des tâches pas encore soumises
+        self.estimate = 0.0
+        self.started = False
+
+    @property
+    def backlog(self) -> float:
+        return sum(t.cost for t in self.tasks) + self.estimate
+
+
+class _Flow:
+    """File d'un client pour une classe de priorité."""
+
+    __slots__ = ("key", "weight", "jobs", "vtime")
+
+    def __init__(self, key: Hashable, weight: float, vtime: float):
+        self.key = key
+        self.weight = weight
+        self.jobs: "OrderedDict[str, _JobEntry]" = OrderedDict()
+        self.vtime = vtime
+
+    @property
+    def head(self) -> Optional[_JobEntry]:
+        return next(iter(self.jobs.values()), None)
+
+    @property
+    def backlog(self) -> float:
+        return sum(entry.backlog for entry in self.jobs.values())
+
+
+class WorkStealingScheduler:
+    def __init__(self, num_workers: Optional[int] = None, batch_size: Optional[int] = None):
+        self.num_workers = max(1, num_workers or settings.SCHEDULER_WORKERS or cpu_governor.workers)
+        self.batch_size = max(1, batch_size or settings.SCHEDULER_BATCH_SIZE)
+        self._flows: Dict[Hashable, _Flow] = {}
+        self._entries: Dict[str, Tuple[_Flow, _JobEntry]] = {}
+        self._vtime = 0.0
+        self._locals: List[Deque[_Task]] = [deque() for _ in range(self.num_workers)]
+        self._express: Deque[_Task] = deque()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+        self._drained: Deque[Tuple[float, float]] = deque()
+        self._busy_since: Optional[float] = None  # début de la mesure de débit en cours
+        self._shutdown = False
+
+    # API publique ----------------------------------------------------------
+
+    def submit(
+        self,
+        job_id: str,
+        calls: Sequence[Callable[[], None]],
+        on_complete: Optional[Callable[[TaskGroup], None]] = None,
+        flow: Hashable = DEFAULT_FLOW,
+        weight: float = 1.0,
+        costs: Optional[Sequence[float]] = None,
+        keep_open: bool = False,
+        estimated_cost: float = 0.0,
+        express: int = 0,
+    ) -> TaskGroup:
+        """Soumet les tâches d'un job ; `on_complete` est appelé quand toutes sont terminées.
+
+        Les tâches rejoignent le flux `flow` (pondéré par `weight`) ; un job
+        déjà présent dans son flux garde sa place. Avec `keep_open`, le job
+        reste en tête de son flux jusqu'à la fin du groupe, le temps qu'il
+        soumette la suite de ses tâches (d'un coût attendu `estimated_cost`).
+        Les `express` premières tâches passent par la voie express, devant
+        toutes les files.
+        """
+        group = TaskGroup(job_id, len(calls), on_complete)
+        if not calls:
+            self._complete(group)
+            return group
+        if costs is None:
+            costs = [1.0] * len(calls)
+
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Scheduler is shut down")
+            tasks = [_Task(group, fn, cost) for fn, cost in zip(calls, costs)]
+            self._express.extend(tasks[:express])
+            tasks = tasks[express:]
+            if tasks or keep_open:
+                _, entry = self._entry(job_id, flow, weight)
+                entry.tasks.extend(tasks)
+                entry.estimate = estimated_cost if keep_open else 0.0
+                if keep_open:
+                    entry.holds += 1
+                    group.on_complete = self._release_after(job_id, on_complete)
+            self._ensure_started()
+            self._cond.notify_all()
+        return group
+
+    def queue_info(self, job_id: str) -> Optional[Tuple[int, float]]:
+        """Position (1 = prochain) et travail restant avant le démarrage d'un job.
+
+        Renvoie None si le job a déjà démarré ou n'est pas en file. Le
+        travail en avance compte ce qui précède le job dans son propre flux,
+        plus la part que les autres flux serviront pendant ce temps.
+        """
+        with self._cond:
+            if job_id not in self._entries:
+                return None
+            flow, entry = self._entries[job_id]
+            if entry.started:
+                return None
+            ahead = 0.0
+            position = 1
+            for other in flow.jobs.values():
+                if other is entry:
+                    break
+                ahead += other.backlog
+                if not other.started:
+                    position += 1
+            work = ahead
+            for other_flow in self._flows.values():
+                if other_flow is not flow:
+                    work += min(other_flow.backlog, ahead * other_flow.weight / flow.weight)
+        return position, work
+
+    def drain_rate(self) -> Optional[float]:
+        """Coût traité par seconde sur la fenêtre récente (None sans mesure).
+
+        Rapporté au temps écoulé depuis le début de l'activité mesurée, borné
+        à la fenêtre : le temps passé sur la première tâche compte aussi.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self._trim_drained(now)
+            if not self._drained or self._busy_since is None:
+                return None
+            elapsed = max(min(now - self._busy_since, DRAIN_WINDOW_SECONDS), 1.0)
+            return sum(cost for _, cost in self._drained) / elapsed
+
+    def backlog(self) -> float:
+        """Coût total en attente (file d'injection, estimations et deques locales)."""
+        with self._cond:
+            queued = sum(flow.backlog for flow in self._flows.values())
+            queued += sum(t.cost for t in list(self._express))
+        for local in self._locals:
+            queued += sum(t.cost for t in list(local))
+        return queued
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            queued = sum(len(e.tasks) for _, e in self._entries.values()) + len(self._express)
+        queued += sum(len(q) for q in self._locals)
+        return {
+            "workers": self.num_workers,
+            "running": self._running,
+            "queued": queued,
+        }
+
+    def cancel(self, job_id: str) -> int:
+        """Abandonne les tâches pas encore démarrées d'un job ; renvoie leur nombre.
+
+        Les tâches de la file d'injection sont retirées tout de suite ; celles
+        déjà passées en voie express ou dans une deque locale appartiennent à
+        un groupe marqué annulé et seront ignorées par le worker qui les prend.
+        Les tâches en cours d'exécution ne sont pas interrompues ici.
+        """
+        dropped: List[_Task] = []
+        with self._cond:
+            if job_id in self._entries:
+                flow, entry = self._entries[job_id]
+                dropped.extend(entry.tasks)
+                entry.tasks.clear()
+                entry.estimate = 0.0
+                self._drop_entry_if_done(flow, entry)
+            pending = [t for t in list(self._express) if t.group.job_id == job_id]
+        for local in self._locals:
+            pending.extend(t for t in list(local) if t.group.job_id == job_id)
+        for task in dropped + pending:
+            task.group.cancel()
+        for task in dropped:
+            if task.group._task_finished():
+                self._complete(task.group)
+        with self._cond:
+            self._cond.notify_all()
+        return len(dropped) + len(pending)
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    # File d'injection (appelé sous self._cond) ------------------------------
+
+    def _entry(self, job_id: str, key: Hashable, weight: float) -> Tuple[_Flow, _JobEntry]:
+        if job_id in self._entries:
+            return self._entries[job_id]
+        flow = self._flows.get(key)
+        if flow is None:
+            # Un flux qui (re)devient actif part du temps virtuel courant
+            flow = self._flows[key] = _Flow(key, weight, self._vtime)
+        entry = flow.jobs[job_id] = _JobEntry(job_id)
+        self._entries[job_id] = (flow, entry)
+        return flow, entry
+
+    def _drop_entry_if_done(self, flow: _Flow, entry: _JobEntry):
+        if entry.tasks or entry.holds:
+            return
+        flow.jobs.pop(entry.job_id, None)
+        self._entries.pop(entry.job_id, None)
+        if not flow.jobs:
+            self._flows.pop(flow.key, None)
+
+    def _release_after(self, job_id: str, on_complete):
+        def release(group: TaskGroup):
+            with self._cond:
+                if job_id in self._entries:
+                    flow, entry = self._entries[job_id]
+                    entry.holds -= 1
+                    if not entry.holds:
+                        entry.estimate = 0.0
+                    self._drop_entry_if_done(flow, entry)
+                self._cond.notify_all()
+            if on_complete is not None:
+                on_complete(group)
+        return release
+
+    def _take_batch(self) -> List[_Task]:
+        # Flux éligible de plus petit temps virtuel (un job ouvert mais sans
+        # tâche bloque son flux : les jobs d'un même flux restent en ordre)
+        eligible = [f for f in self._flows.values() if f.head is not None and f.head.tasks]
+        if not eligible:
+            return []
+        flow = min(eligible, key=lambda f: f.vtime)
+        entry = flow.head
+        batch = [entry.tasks.popleft() for _ in range(min(self.batch_size, len(entry.tasks)))]
+        entry.started = True
+        self._vtime = max(self._vtime, flow.vtime)
+        flow.vtime += sum(t.cost for t in batch) / flow.weight
+        self._drop_entry_if_done(flow, entry)
+        return batch
+
+    def _trim_drained(self, now: float):
+        while self._drained and now - self._drained[0][0] > DRAIN_WINDOW_SECONDS:
+            self._drained.popleft()
+
+    # Workers ---------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        for i in range(self.num_workers):
+            t = threading.Thread(
+                target=self._worker_loop, args=(i,), name=f"scheduler-{i}", daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+    def _worker_loop(self, index: int):
+        local = self._locals[index]
+        while True:
+            task = self._next_task(index, local)
+            if task is None:
+                with self._cond:
+                    if self._shutdown:
+                        return
+                    self._cond.wait(IDLE_WAIT_SECONDS)
+                continue
+            self._run(task)
+
+    def _next_task(self, index: int, local: Deque[_Task]) -> Optional[_Task]:
+        # 0. voie express, une tâche à la fois pour la répartir entre workers
+        try:
+            return self._express.popleft()
+        except IndexError:
+            pass
+        # 1. deque locale (FIFO : les premiers blocs d'un job finissent en premier)
+        try:
+            return local.popleft()
+        except IndexError:
+            pass
+        # 2. un lot pris dans la file d'injection, selon l'ordre équitable
+        with self._cond:
+            batch = self._take_batch()
+        if batch:
+            local.extend(batch[1:])
+            return batch[0]
+        # 3. vol de la moitié de la deque d'un autre worker
+        return self._steal(index, local)
+
+    def _steal(self, index: int, local: Deque[_Task]) -> Optional[_Task]:
+        victims = [i for i in range(self.num_workers) if i != index]
+        random.shuffle(victims)
+        for victim in victims:
+            source = self._locals[victim]
+            stolen = []
+            for _ in range(len(source) // 2 or len(source)):
+                try:
+                    # le propriétaire consomme par la gauche, on vole par la droite
+                    stolen.append(source.pop())
+                except IndexError:
+                    break
+            if stolen:
+                stolen.reverse()
+                local.extend(stolen[1:])
+                return stolen[0]
+        return None
+
+    def _run(self, task: _Task):
+        group = task.group
+        error = None
+        if not group.cancelled:
+            with self._cond:
+                now = time.monotonic()
+                self._trim_drained(now)
+                if self._running == 0 and not self._drained:
+                    self._busy_since = now
+                self._running += 1
+            try:
+                task.fn()
+            except Exception as e:
+                logger.exception("Task of job %s failed", group.job_id)
+                error = e
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    if error is None:
+                        now = time.monotonic()
+                        self._drained.append((now, task.cost))
+                        self._trim_drained(now)
+        if group._task_finished(error):
+            self._complete(group)
+
+    def _complete(self, group: TaskGroup):
+        try:
+            if group.on_complete is not None:
+                group.on_complete(group)
+        except Exception:
+            logger.exception("Completion callback of job %s failed", group.job_id)
+        finally:
+            group.finished.set()
+
+
+# Instance globale
+scheduler = WorkStealingScheduler()
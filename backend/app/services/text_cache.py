@@ -0,0 +1,174 @@
+"""Cache disque du texte extrait, nettoyé et découpé de chaque document.
+
+Reconvertir un livre avec une autre voix ou une autre vitesse ne refait
+pas l'extraction PDF/EPUB ni le nettoyage : les paragraphes sont relus
+depuis TEMP_DIR/text_cache, puis regroupés en blocs selon la taille de
+bloc de la voix (opération triviale). La clé combine le sha256 du
+document, les versions de l'extracteur et du nettoyage et les pages ou
+chapitres retenus ; changer l'un d'eux produit une autre clé et l'ancienne entrée finit évincée (LRU sur
+la date de dernier accès, dans la limite de TEXT_CACHE_MAX_MB).
+
+Format d'une entrée (little-endian) :
+
+    magic "ABTC" | version u16 | nombre de morceaux u32 | taille des métadonnées u32
+    métadonnées JSON
+    index : (nombre + 1) positions u64, relatives au début des données
+    données : morceaux UTF-8 compressés (zlib) un par un, bout à bout
+
+L'index permet de relire un seul morceau (`read_chunk`) sans décompresser
+les autres.
+"""
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.services.text_extractor import EXTRACTOR_VERSION
+from app.services.text_processor import CLEANER_VERSION
+from app.services.upload_service import upload_service
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ABTC"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHII")
+
+
+def file_hash(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(settings.UPLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class TextCache:
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_dir() -> Path:
+        return Path(settings.TEMP_DIR) / "text_cache"
+
+    def entry_path(self, key: str) -> Path:
+        return self.cache_dir() / f"{key}.chunks"
+
+    @staticmethod
+    def key(source: Path, selection: str = "") -> str:
+        """Clé d'un document : contenu, versions du traitement et partie extraite."""
+        info = upload_service.load_metadata(source.stem)
+        content_hash = info.content_hash if info is not None else file_hash(source)
+        material = f"{content_hash}:{EXTRACTOR_VERSION}:{CLEANER_VERSION}:{selection}"
+        return hashlib.sha256(material.encode()).hexdigest()[:32]
+
+    def get(self, key: str) -> Optional[Tuple[List[str], Dict[str, Any]]]:
+        """Morceaux et métadonnées en cache, ou None (entrée absente ou illisible)."""
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                meta, offsets, _ = self._read_header(f)
+                data = f.read()
+            chunks = [
+                zlib.decompress(data[offsets[i]:offsets[i + 1]]).decode("utf-8")
+                for i in range(len(offsets) - 1)
+            ]
+        except FileNotFoundError:
+            record_cache("text", False)
+            return None
+        except (OSError, ValueError, struct.error, zlib.error) as e:
+            logger.warning("Dropping unreadable text cache entry %s: %s", path.name, e)
+            path.unlink(missing_ok=True)
+            record_cache("text", False)
+            return None
+        self._touch(path)
+        record_cache("text", True)
+        return chunks, meta
+
+    def read_chunk(self, key: str, index: int) -> str:
+        """Un seul morceau d'une entrée, lu via l'index."""
+        with open(self.entry_path(key), "rb") as f:
+            _, offsets, base = self._read_header(f)
+            if not 0 <= index < len(offsets) - 1:
+                raise IndexError(index)
+            f.seek(base + offsets[index])
+            data = f.read(offsets[index + 1] - offsets[index])
+        return zlib.decompress(data).decode("utf-8")
+
+    def put(self, key: str, chunks: Sequence[str], meta: Optional[Dict[str, Any]] = None):
+        """Enregistre les morceaux d'un document (remplacement atomique), puis évince si besoin."""
+        directory = self.cache_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        meta_bytes = json.dumps(meta or {}, separators=(",", ":")).encode()
+        compressed = [zlib.compress(chunk.encode("utf-8")) for chunk in chunks]
+        offsets = [0]
+        for data in compressed:
+            offsets.append(offsets[-1] + len(data))
+
+        tmp = directory / f".{key}-{uuid4().hex}.part"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(compressed), len(meta_bytes)))
+                f.write(meta_bytes)
+                f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+                for data in compressed:
+                    f.write(data)
+            os.replace(tmp, self.entry_path(key))
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            logger.warning("Cannot write text cache entry %s: %s", key, e)
+            return
+        self._evict()
+
+    @staticmethod
+    def _read_header(f) -> Tuple[Dict[str, Any], Tuple[int, ...], int]:
+        """Métadonnées, index et position du début des données."""
+        header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise ValueError("truncated header")
+        magic, version, count, meta_size = _HEADER.unpack(header)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a text cache entry")
+        meta = json.loads(f.read(meta_size))
+        index = f.read(8 * (count + 1))
+        if len(index) != 8 * (count + 1):
+            raise ValueError("truncated index")
+        offsets = struct.unpack(f"<{count + 1}Q", index)
+        return meta, offsets, _HEADER.size + meta_size + 8 * (count + 1)
+
+    @staticmethod
+    def _touch(path: Path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment lues au-delà du budget."""
+        budget = self.max_bytes if self.max_bytes is not None else settings.TEXT_CACHE_MAX_MB * 1024 * 1024
+        with self._lock:
+            entries = []
+            for path in self.cache_dir().glob("*.chunks"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= budget:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+# Instance globale
+text_cache = TextCache()
@@ -0,0 +1,139 @@
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+
+from app.core.exceptions import TextExtractionError
+from app.services.text_processor import PAGE_BREAK
+
+# À incrémenter quand le texte extrait change (invalide le cache de texte)
+EXTRACTOR_VERSION = 3
+
+_CONTAINER_NS = {"c": "urn:oasis:names:tc:opendocument:xmlns:container"}
+_OPF_NS = {"opf": "http://www.idpf.org/2007/opf"}
+_RANGE_RE = re.compile(r"^\s*(\d+)\s*(?:-\s*(\d+))?\s*$")
+
+
+def parse_selection(spec: str) -> List[Tuple[int, int]]:
+    """"120-180,200" -> [(120, 180), (200, 200)] ; numérotation à partir de 1."""
+    ranges = []
+    for part in spec.split(","):
+        match = _RANGE_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid range: {part.strip()!r}")
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid range: {part.strip()!r}")
+        ranges.append((start, end))
+    return ranges
+
+
+def selected_indices(spec: Optional[str], count: int) -> List[int]:
+    """Indices (à partir de 0) des pages ou chapitres retenus, dans l'ordre du document."""
+    if not spec:
+        return list(range(count))
+    try:
+        ranges = parse_selection(spec)
+    except ValueError as e:
+        raise TextExtractionError(str(e)) from e
+    chosen = sorted({i - 1 for start, end in ranges for i in range(start, min(end, count) + 1)})
+    if not chosen:
+        raise TextExtractionError(f"Selection {spec!r} is outside the document ({count} in total)")
+    return chosen
+
+
+def epub_spine(zf: zipfile.ZipFile) -> List[str]:
+    """Chemins (dans le zip) des documents du spine, dans l'ordre de lecture.
+
+    Seuls META-INF/container.xml et le fichier OPF sont lus.
+    """
+    container = ET.fromstring(zf.read("META-INF/container.xml"))
+    rootfile = container.find(".//c:rootfile", _CONTAINER_NS)
+    if rootfile is None:
+        raise TextExtractionError("EPUB container has no rootfile")
+    opf_path = rootfile.get("full-path", "")
+    opf = ET.fromstring(zf.read(opf_path))
+    base = posixpath.dirname(opf_path)
+    hrefs = {
+        item.get("id"): posixpath.normpath(posixpath.join(base, unquote(item.get("href", ""))))
+        for item in opf.iterfind("opf:manifest/opf:item", _OPF_NS)
+    }
+    return [
+        hrefs[ref.get("idref")]
+        for ref in opf.iterfind("opf:spine/opf:itemref", _OPF_NS)
+        if ref.get("idref") in hrefs
+    ]
+
+
+class TextExtractor:
+    @staticmethod
+    def extract_from_pdf(fp: Path, pages: Optional[str] = None) -> str:
+        """Texte des pages `pages` ("120-180", tout le document par défaut).
+
+        Les pages hors sélection ne sont ni décodées ni analysées.
+        """
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(str(fp))
+        parts = []
+        for i in selected_indices(pages, len(reader.pages)):
+            t = reader.pages[i].extract_text() or ""
+            parts.append(t)
+        # pages séparées pour repérer en-têtes et pieds de page répétés
+        return PAGE_BREAK.join(parts)
+
+    @staticmethod
+    def iter_epub(fp: Path, chapters: Optional[str] = None) -> Iterator[str]:
+        """Texte de chaque document du spine (ou des seuls `chapters`), dans l'ordre de lecture.
+
+        Le zip n'est lu qu'à la demande : son répertoire central, container.xml,
+        l'OPF, puis un document XHTML à la fois. Images, polices et feuilles
+        de style ne sont jamais décompressées ; la mémoire dépend du plus
+        gros chapitre, pas du livre.
+        """
+        from bs4 import BeautifulSoup
+
+        with zipfile.ZipFile(fp) as zf:
+            spine = [name for name in epub_spine(zf) if name in zf.NameToInfo]
+            for i in selected_indices(chapters, len(spine)):
+                html = zf.read(spine[i]).decode("utf-8", errors="ignore")
+                yield BeautifulSoup(html, "lxml").get_text(" ", strip=True)
+
+    @classmethod
+    def extract_from_epub(cls, fp: Path, chapters: Optional[str] = None) -> str:
+        """Texte du livre, ou des seuls documents du spine `chapters` ("3-5")."""
+        return "\n".join(cls.iter_epub(fp, chapters))
+
+    @staticmethod
+    def check_selection(fp: Path, pages: Optional[str] = None, chapters: Optional[str] = None):
+        """Vérifie que la sélection convient au format : pages pour un PDF, chapitres pour un EPUB."""
+        suffix = fp.suffix.lower()
+        if pages and suffix != ".pdf":
+            raise TextExtractionError("Page ranges apply to PDF documents only")
+        if chapters and suffix != ".epub":
+            raise TextExtractionError("Chapter selection applies to EPUB documents only")
+        for spec in (pages, chapters):
+            if spec:
+                try:
+                    parse_selection(spec)
+                except ValueError as e:
+                    raise TextExtractionError(str(e)) from e
+
+    @classmethod
+    def extract_from_file(cls, fp: Path, pages: Optional[str] = None, chapters: Optional[str] = None) -> str:
+        suffix = fp.suffix.lower()
+        if suffix not in (".pdf", ".epub"):
+            raise TextExtractionError(f"Unsupported format: {suffix or fp.name}")
+        cls.check_selection(fp, pages, chapters)
+        try:
+            if suffix == ".pdf":
+                return cls.extract_from_pdf(fp, pages)
+            return cls.extract_from_epub(fp, chapters)
+        except TextExtractionError:
+            raise
+        except Exception as e:
+            raise TextExtractionError(f"Failed to extract text from {fp.name}: {e}") from e
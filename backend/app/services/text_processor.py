@@ -0,0 +1,132 @@
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable, Iterator, List, Tuple
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+_CLAUSE_SEPARATORS = (", ", "; ", ": ", " - ")
+
+# À incrémenter quand le nettoyage ou le découpage change (invalide le cache de texte)
+CLEANER_VERSION = 2
+
+# Séparateur de pages dans le texte extrait d'un PDF (comme pdftotext)
+PAGE_BREAK = "\f"
+_DIGITS_RE = re.compile(r"\d+")
+
+# Caractères que Piper gère mal (cf. test_final.py)
+_REPLACEMENTS = {
+    "\u200b": "",    # ZERO WIDTH SPACE
+    "\u200c": "",    # ZERO WIDTH NON-JOINER
+    "\u200d": "",    # ZERO WIDTH JOINER
+    "\ufeff": "",    # ZERO WIDTH NO-BREAK SPACE
+    "\u201c": '"',   # LEFT DOUBLE QUOTATION MARK
+    "\u201d": '"',   # RIGHT DOUBLE QUOTATION MARK
+    "\u2018": "'",   # LEFT SINGLE QUOTATION MARK
+    "\u2019": "'",   # RIGHT SINGLE QUOTATION MARK
+    "\u2014": "-",   # EM DASH
+    "\u2013": "-",   # EN DASH
+    "\u2026": "...", # HORIZONTAL ELLIPSIS
+}
+
+
+class TextProcessor:
+    @staticmethod
+    def clean_text(text: str) -> str:
+        # NFC pour garder les accents composés, puis suppression des diacritiques isolés
+        text = unicodedata.normalize("NFC", text).replace(PAGE_BREAK, "\n")
+        text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+        for old, new in _REPLACEMENTS.items():
+            text = text.replace(old, new)
+        text = re.sub(r"[ \t]+", " ", text)
+        text = re.sub(r"\n{2,}", "\n\n", text)
+        return text.strip()
+
+    @staticmethod
+    def strip_page_furniture(
+        text: str, edge_lines: int = 3, min_ratio: float = 0.3, min_pages: int = 3
+    ) -> Tuple[str, int]:
+        """Retire en-têtes, pieds de page et numéros de page répétés d'un texte paginé.
+
+        Chacune des `edge_lines` premières et dernières lignes d'une page est
+        réduite à une empreinte (minuscules, espaces réduits, nombres
+        remplacés par #, donc "Page 12" == "Page 13") associée à sa position.
+        Les empreintes présentes sur au moins `min_ratio` des pages (et
+        `min_pages`) sont retirées partout. Renvoie le texte et le nombre de
+        caractères retirés.
+        """
+        pages = text.split(PAGE_BREAK)
+        if len(pages) < min_pages:
+            return text, 0
+
+        def edges(lines: List[str]) -> Iterator[Tuple[int, Tuple[str, int, str]]]:
+            filled = [i for i, line in enumerate(lines) if line.strip()]
+            for rank, i in enumerate(filled[:edge_lines]):
+                yield i, ("top", rank, _fingerprint(lines[i]))
+            for rank, i in enumerate(reversed(filled[-edge_lines:])):
+                yield i, ("bottom", rank, _fingerprint(lines[i]))
+
+        split_pages = [page.split("\n") for page in pages]
+        counts: Counter = Counter()
+        for lines in split_pages:
+            counts.update({key for _, key in edges(lines)})
+        threshold = max(min_pages, min_ratio * len(pages))
+        furniture = {key for key, n in counts.items() if n >= threshold}
+        if not furniture:
+            return text, 0
+
+        removed = 0
+        kept_pages = []
+        for lines in split_pages:
+            drop = {i for i, key in edges(lines) if key in furniture}
+            removed += sum(len(lines[i].strip()) for i in drop)
+            kept_pages.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+        return PAGE_BREAK.join(kept_pages), removed
+
+    @staticmethod
+    def paragraphs(text: str) -> List[str]:
+        return [p.strip() for p in re.split(r"\n{2,}", text) if p.strip()]
+
+    @staticmethod
+    def group_paragraphs(paras: Iterable[str], max_chars: int = 1500) -> Iterator[List[str]]:
+        """Regroupe des paragraphes consécutifs en blocs d'au plus `max_chars` (sauf paragraphe plus long)."""
+        cur, count = [], 0
+        for p in paras:
+            if count + len(p) > max_chars and cur:
+                yield cur
+                cur, count = [p], len(p)
+            else:
+                cur.append(p)
+                count += len(p)
+        if cur:
+            yield cur
+
+    @classmethod
+    def chunk_paragraphs(cls, text: str, max_chars: int = 1500) -> Iterator[str]:
+        for group in cls.group_paragraphs(cls.paragraphs(text), max_chars):
+            yield "\n".join(group)
+
+    @staticmethod
+    def split_sentences(text: str, max_chars: int = 300, first_max_chars: int = 0) -> Iterator[str]:
+        """Découpe en phrases, les plus longues étant coupées aux virgules.
+
+        `first_max_chars` borne plus bas le premier morceau : c'est lui qui
+        fixe le délai avant le premier son en synthèse au fil de l'eau.
+        """
+        limit = first_max_chars or max_chars
+        for sentence in _SENTENCE_END_RE.split(" ".join(text.split())):
+            while len(sentence) > limit:
+                cut = max(sentence.rfind(sep, 0, limit + 1) for sep in _CLAUSE_SEPARATORS)
+                if cut <= 0:
+                    cut = sentence.rfind(" ", 0, limit)
+                if cut <= 0:
+                    cut = limit
+                yield sentence[:cut + 1].strip()
+                sentence = sentence[cut + 1:].strip()
+                limit = max_chars
+            if sentence:
+                yield sentence
+                limit = max_chars
+
+
+def _fingerprint(line: str) -> str:
+    return _DIGITS_RE.sub("#", " ".join(line.lower().split()))
@@ -0,0 +1,70 @@
+"""Modèle de débit de synthèse mesuré, par voix et par hôte.
+
+Chaque bloc synthétisé met à jour une moyenne glissante (EWMA) du temps de
+calcul par caractère de sa voix sur cette machine. Le coût d'un travail
+s'exprime ensuite en secondes de worker : c'est l'unité des coûts passés au
+scheduler, de l'admission et des ETA.
+"""
+import socket
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from app.core.config import settings
+
+VoiceKey = Union[str, Path]
+
+
+class ThroughputModel:
+    def __init__(self, alpha: float = 0.2, host: Optional[str] = None):
+        self.alpha = alpha
+        self.host = host or socket.gethostname()
+        self._seconds_per_char: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, voice: VoiceKey) -> Tuple[str, str]:
+        return self.host, Path(voice).stem
+
+    def record(self, voice: VoiceKey, chars: int, seconds: float):
+        """Enregistre la synthèse de `chars` caractères en `seconds` secondes."""
+        if chars <= 0 or seconds <= 0:
+            return
+        sample = seconds / chars
+        key = self._key(voice)
+        with self._lock:
+            current = self._seconds_per_char.get(key)
+            if current is None:
+                self._seconds_per_char[key] = sample
+            else:
+                self._seconds_per_char[key] = current + self.alpha * (sample - current)
+
+    def seconds_per_char(self, voice: VoiceKey) -> float:
+        with self._lock:
+            return self._seconds_per_char.get(
+                self._key(voice), settings.DEFAULT_SECONDS_PER_CHAR
+            )
+
+    def is_measured(self, voice: VoiceKey) -> bool:
+        """Vrai si le débit de la voix a été mesuré sur cet hôte (sinon valeur par défaut)."""
+        with self._lock:
+            return self._key(voice) in self._seconds_per_char
+
+    def chars_per_second(self, voice: VoiceKey) -> float:
+        return 1.0 / self.seconds_per_char(voice)
+
+    def estimate_seconds(self, voice: VoiceKey, chars: float) -> float:
+        """Secondes de worker attendues pour synthétiser `chars` caractères."""
+        return chars * self.seconds_per_char(voice)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Caractères par seconde mesurés, par voix, pour cet hôte."""
+        with self._lock:
+            return {
+                voice: 1.0 / spc
+                for (host, voice), spc in self._seconds_per_char.items()
+                if host == self.host
+            }
+
+
+# Instance globale
+throughput_model = ThroughputModel()
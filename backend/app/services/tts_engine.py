@@ -0,0 +1,152 @@
+import re
+import shutil
+import wave
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+from app.core.exceptions import TTSEngineError
+from app.services.audio_processor import wav_duration
+from app.services.voice_catalog import voice_catalog
+from app.services.voice_pool import VoicePool, voice_pool
+
+
+def resolve_voice_path(voice_model: str) -> Path:
+    """Trouve le fichier .onnx d'une voix (chemin explicite, nom ou "default")."""
+    if voice_model in ("", "default"):
+        voice_model = settings.DEFAULT_VOICE_MODEL
+
+    candidate = Path(voice_model)
+    if candidate.suffix == ".onnx" and candidate.exists():
+        return candidate
+
+    name = candidate.stem if candidate.suffix == ".onnx" else candidate.name
+    voice = voice_catalog.get(name)
+    if voice is not None and voice.is_available:
+        return Path(voice.full_path)
+    raise TTSEngineError(f"Voice model file not found: {voice_model}")
+
+
+class TTSEngine:
+    """Synthèse par le binaire Piper, via les sessions chaudes du pool de voix."""
+
+    def __init__(self, piper_executable: Optional[str] = None, pool: Optional[VoicePool] = None):
+        self.pool = pool or voice_pool
+        executable = piper_executable or settings.PIPER_EXECUTABLE
+        found = shutil.which(executable)
+        if found is None and not Path(executable).exists():
+            raise TTSEngineError(f"Piper executable not found: {executable}")
+        self.piper_executable = found or executable
+
+    def build_command(
+        self,
+        voice_path: str,
+        output_path: Optional[str],
+        length_scale: float,
+        noise_scale: float,
+        noise_w: float,
+        sentence_silence: float,
+    ) -> list:
+        """Ligne de commande Piper ; sans `output_path`, pour une session du pool."""
+        output = ["--output_file", str(output_path)] if output_path is not None else []
+        return [
+            self.piper_executable,
+            "--model", str(voice_path),
+            *output,
+            "--length_scale", str(length_scale),
+            "--noise_scale", str(noise_scale),
+            "--noise_w", str(noise_w),
+            "--sentence_silence", str(sentence_silence),
+        ]
+
+    def synthesize_block(
+        self,
+        text: str,
+        voice_path: str,
+        output_path: str,
+        length_scale: float = settings.DEFAULT_LENGTH_SCALE,
+        noise_scale: float = settings.DEFAULT_NOISE_SCALE,
+        noise_w: float = settings.DEFAULT_NOISE_W,
+        sentence_silence: float = settings.SENTENCE_SILENCE,
+        timeout: Optional[float] = None,
+        tag: Optional[str] = None,
+        hedge_after: Optional[float] = None,
+    ) -> None:
+        """Synthèse bloquante, pour les workers du scheduler.
+
+        Avec `tag`, l'appel peut être interrompu par `cancel(tag)` ; avec
+        `hedge_after`, une copie de secours est lancée s'il dure plus longtemps.
+        """
+        self.pool.run(self._synthesize(
+            text, voice_path, output_path,
+            length_scale, noise_scale, noise_w, sentence_silence, timeout, hedge_after,
+        ), tag=tag)
+
+    def cancel(self, tag: str) -> int:
+        """Interrompt les synthèses en cours étiquetées `tag` ; renvoie leur nombre."""
+        return self.pool.cancel(tag)
+
+    async def synthesize_text(
+        self,
+        text: str,
+        voice_path: str,
+        output_path: str,
+        length_scale: float = settings.DEFAULT_LENGTH_SCALE,
+        noise_scale: float = settings.DEFAULT_NOISE_SCALE,
+        noise_w: float = settings.DEFAULT_NOISE_W,
+        sentence_silence: float = settings.SENTENCE_SILENCE,
+        timeout: Optional[float] = None,
+        interactive: bool = False,
+    ) -> float:
+        """Synthèse depuis une route async ; renvoie la durée de l'audio produit.
+
+        `interactive` : quelqu'un attend le son, la synthèse peut prendre un
+        créneau réservé du pool plutôt que d'attendre les conversions.
+        """
+        await self.pool.run_async(self._synthesize(
+            text, voice_path, output_path,
+            length_scale, noise_scale, noise_w, sentence_silence, timeout,
+            interactive=interactive,
+        ))
+        try:
+            return wav_duration(output_path)
+        except (OSError, EOFError, wave.Error):
+            return self._estimate_audio_duration(text, length_scale, sentence_silence)
+
+    async def _synthesize(
+        self,
+        text: str,
+        voice_path: str,
+        output_path: str,
+        length_scale: float,
+        noise_scale: float,
+        noise_w: float,
+        sentence_silence: float,
+        timeout: Optional[float],
+        hedge_after: Optional[float] = None,
+        interactive: bool = False,
+    ) -> None:
+        if not text.strip():
+            raise TTSEngineError("Empty text provided")
+        if not Path(voice_path).exists():
+            raise TTSEngineError(f"Voice model file not found: {voice_path}")
+
+        cmd = self.build_command(
+            voice_path, None, length_scale, noise_scale, noise_w, sentence_silence
+        )
+        # les paramètres de synthèse font partie de la commande : une session par jeu
+        key = (str(voice_path), tuple(cmd[3:]))
+        # piper lit une ligne = un énoncé ; on force un seul énoncé par bloc
+        line = " ".join(text.split())
+        await self.pool.synthesize_hedged(
+            key, cmd, line, str(output_path), timeout or settings.PIPER_TIMEOUT_SECONDS,
+            hedge_after, interactive,
+        )
+
+    @staticmethod
+    def _estimate_audio_duration(
+        text: str, length_scale: float, sentence_silence: float
+    ) -> float:
+        """Estimation grossière : ~15 caractères par seconde à vitesse normale."""
+        sentences = max(1, len(re.findall(r"[.!?]+", text)))
+        return len(text) / 15.0 * length_scale + sentences * sentence_silence
@@ -0,0 +1,86 @@
+"""Profil de calibration : meilleurs réglages de synthèse mesurés par voix.
+
+Le fichier est produit par ``python -m app.tune`` et lu au démarrage, par
+le backend comme par ``tts.py``. Pour chaque voix : nombre de synthèses
+simultanées, threads par synthèse, taille de bloc (``max_chars``) et si
+les synthèses étaient épinglées sur leurs CPU pendant la mesure. Un
+profil mesuré sur une machine avec un autre nombre de CPU est ignoré.
+"""
+import json
+import logging
+import os
+import socket
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_VERSION = 1
+
+
+class TuningProfile:
+    def __init__(self, path: Optional[Path] = None, cpus: Optional[int] = None):
+        self.path = Path(path or settings.TUNING_PROFILE_PATH)
+        self.cpus = cpus
+        self._voices: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self):
+        """(Re)lit le fichier ; un profil absent, illisible ou d'une autre machine est vide."""
+        self._voices = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable tuning profile %s: %s", self.path, e)
+            return
+        if data.get("version") != PROFILE_VERSION:
+            logger.warning("Ignoring tuning profile %s: unsupported version", self.path)
+            return
+        cpus = self.cpus if self.cpus is not None else _cpu_count()
+        if data.get("cpus") != cpus:
+            logger.info("Ignoring tuning profile %s: measured on %s CPUs, %d here",
+                        self.path, data.get("cpus"), cpus)
+            return
+        self._voices = dict(data.get("voices") or {})
+
+    def voice(self, voice_id: str) -> Optional[Dict[str, Any]]:
+        return self._voices.get(voice_id)
+
+    def max_chars(self, voice_id: str) -> int:
+        entry = self.voice(voice_id)
+        return int(entry["max_chars"]) if entry else settings.MAX_CHUNK_CHARS
+
+    def voices(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._voices)
+
+    def save(self, voices: Dict[str, Dict[str, Any]], cpus: int):
+        """Écrit le profil (en remplaçant le précédent d'un coup) et le recharge."""
+        data = {
+            "version": PROFILE_VERSION,
+            "host": socket.gethostname(),
+            "cpus": cpus,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "voices": voices,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.part")
+        tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.cpus = cpus
+        self.load()
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+# Instance globale, lue au démarrage
+tuning_profile = TuningProfile()
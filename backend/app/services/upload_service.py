@@ -0,0 +1,406 @@
+"""Réception en flux des documents uploadés.
+
+Le corps multipart est lu morceau par morceau depuis la requête : chaque
+morceau du fichier est haché et écrit sur disque au fil de l'eau, sans
+jamais garder le document entier en mémoire. Le format est reconnu sur les
+premiers octets. L'identifiant du fichier dérive de son empreinte SHA-256,
+ce qui déduplique les envois identiques ; une pré-analyse légère (pages,
+documents du spine, nombre de mots estimé) est enregistrée à côté pour
+estimer le coût d'une conversion sans réextraire le texte.
+
+Pour les gros documents, une session d'upload reprenable reçoit le fichier
+par parties numérotées, écrites directement à leur offset dans un fichier
+préalloué : une connexion coupée ne fait renvoyer que les parties
+manquantes, et l'empreinte annoncée est vérifiée à la finalisation.
+"""
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import uuid4
+
+import anyio
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+from app.core.exceptions import UploadError
+from app.models.upload import FileUploadResponse, UploadSessionCreate, UploadSessionResponse
+from app.services.text_extractor import epub_spine
+
+logger = logging.getLogger(__name__)
+
+FILE_FIELD = b"file"
+SNIFF_BYTES = 64
+CHARS_PER_WORD = 6  # longueur moyenne d'un mot français, espace comprise
+CHARS_PER_PAGE = 3000  # page pleine d'un roman : estimation haute, faute de mieux
+PDF_SAMPLE_PAGES = 5
+EPUB_SAMPLE_DOCS = 3
+MIN_PART_SIZE = 256 * 1024
+
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_TAG_RE = re.compile(rb"<[^>]+>")
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """Format d'après les premiers octets (l'extension n'est pas fiable)."""
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    # un EPUB est un zip dont la première entrée, stockée, est "mimetype"
+    if head.startswith(b"PK\x03\x04") and b"mimetypeapplication/epub+zip" in head:
+        return "epub"
+    return None
+
+
+class _FilePartSink:
+    """Callbacks du parseur multipart : collecte les données de la partie fichier."""
+
+    def __init__(self):
+        self.filename: Optional[str] = None
+        self.content_type = "application/octet-stream"
+        self.pending: List[bytes] = []
+        self.found = False
+        self._in_file = False
+        self._headers: dict = {}
+        self._field = b""
+        self._value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self):
+        self._headers = {}
+        self._field = self._value = b""
+
+    def _header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def _header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def _headers_finished(self):
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        # seule la première partie "file" est retenue
+        self._in_file = params.get(b"name") == FILE_FIELD and not self.found
+        if self._in_file:
+            self.found = True
+            raw_name = params.get(b"filename", b"")
+            self.filename = Path(raw_name.decode("utf-8", "replace")).name or "document"
+            if b"content-type" in self._headers:
+                self.content_type = self._headers[b"content-type"].decode("latin-1")
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.pending.append(data[start:end])
+
+    def _part_end(self):
+        self._in_file = False
+
+
+class UploadService:
+    def __init__(self):
+        self._session_lock = threading.Lock()
+
+    def metadata_path(self, file_id: str) -> Path:
+        return Path(settings.UPLOAD_DIR) / f"{file_id}.json"
+
+    def load_metadata(self, file_id: str) -> Optional[FileUploadResponse]:
+        try:
+            return FileUploadResponse.model_validate_json(self.metadata_path(file_id).read_text())
+        except (OSError, ValueError):
+            return None
+
+    async def receive(self, stream: AsyncIterator[bytes], content_type: str) -> FileUploadResponse:
+        """Enregistre le fichier d'un corps multipart lu en flux."""
+        mime, params = parse_options_header(content_type or "")
+        boundary = params.get(b"boundary")
+        if mime != b"multipart/form-data" or not boundary:
+            raise UploadError("Expected a multipart/form-data body")
+
+        upload_dir = Path(settings.UPLOAD_DIR)
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        part_path = upload_dir / f".upload-{uuid4().hex}.part"
+
+        sink = _FilePartSink()
+        parser = MultipartParser(boundary, sink.callbacks())
+        hasher = hashlib.sha256()
+        head = b""
+        size = 0
+        try:
+            with open(part_path, "wb") as f:
+                async for chunk in stream:
+                    parser.write(chunk)
+                    if not sink.pending:
+                        continue
+                    data = b"".join(sink.pending)
+                    sink.pending.clear()
+                    size += len(data)
+                    if size > settings.MAX_FILE_SIZE:
+                        raise UploadError(
+                            f"File exceeds the {settings.MAX_FILE_SIZE} bytes limit", 413
+                        )
+                    if len(head) < SNIFF_BYTES:
+                        head += data[:SNIFF_BYTES - len(head)]
+                    hasher.update(data)
+                    await anyio.to_thread.run_sync(f.write, data)
+                parser.finalize()
+
+            if not sink.found:
+                raise UploadError("No 'file' field in upload")
+            return await self._store(
+                part_path, hasher.hexdigest(), size, head, sink.filename, sink.content_type
+            )
+        finally:
+            if part_path.exists():
+                part_path.unlink()
+
+    async def _store(
+        self,
+        data_path: Path,
+        content_hash: str,
+        size: int,
+        head: bytes,
+        filename: str,
+        content_type: str,
+    ) -> FileUploadResponse:
+        """Range un fichier reçu sous son identifiant de contenu (ou le déduplique)."""
+        fmt = sniff_format(head)
+        if fmt is None:
+            raise UploadError("Unsupported file format (PDF or EPUB only)", 415)
+
+        file_id = content_hash[:32]
+        existing = self.load_metadata(file_id)
+        if existing is not None:
+            data_path.unlink()
+            return existing.model_copy(update={
+                "filename": filename,
+                "duplicate": True,
+                "message": "File already uploaded",
+            })
+
+        final_path = Path(settings.UPLOAD_DIR) / f"{file_id}.{fmt}"
+        os.replace(data_path, final_path)
+        page_count, word_count = await anyio.to_thread.run_sync(self.analyze, final_path, fmt)
+        info = FileUploadResponse(
+            file_id=file_id,
+            filename=filename,
+            file_size=size,
+            content_type=content_type,
+            content_hash=content_hash,
+            format=fmt,
+            page_count=page_count,
+            word_count=word_count,
+        )
+        self.metadata_path(file_id).write_text(info.model_dump_json())
+        return info
+
+    # Sessions d'upload reprenable ------------------------------------------
+
+    @staticmethod
+    def session_dir() -> Path:
+        return Path(settings.UPLOAD_DIR) / ".sessions"
+
+    def _session_paths(self, session_id: str) -> Tuple[Path, Path]:
+        if not _SESSION_ID_RE.match(session_id):
+            raise UploadError("Upload session not found", 404)
+        base = self.session_dir() / session_id
+        return base.with_suffix(".json"), base.with_suffix(".data")
+
+    def _save_session(self, session: UploadSessionResponse):
+        state_path, _ = self._session_paths(session.session_id)
+        tmp = state_path.with_suffix(".json.tmp")
+        tmp.write_text(session.model_dump_json())
+        os.replace(tmp, state_path)
+
+    def get_session(self, session_id: str) -> UploadSessionResponse:
+        state_path, _ = self._session_paths(session_id)
+        try:
+            session = UploadSessionResponse.model_validate_json(state_path.read_text())
+        except (OSError, ValueError):
+            raise UploadError("Upload session not found", 404)
+        if session.expires_at < datetime.now():
+            self.abort_session(session_id)
+            raise UploadError("Upload session expired", 404)
+        return session
+
+    def create_session(self, request: UploadSessionCreate) -> UploadSessionResponse:
+        """Ouvre une session : le fichier de données est préalloué à sa taille finale."""
+        if request.file_size > settings.MAX_RESUMABLE_FILE_SIZE:
+            raise UploadError(
+                f"File exceeds the {settings.MAX_RESUMABLE_FILE_SIZE} bytes limit", 413
+            )
+        part_size = request.part_size or settings.UPLOAD_PART_SIZE
+        if not MIN_PART_SIZE <= part_size <= settings.UPLOAD_PART_SIZE * 8:
+            raise UploadError("Invalid part size")
+
+        self.session_dir().mkdir(parents=True, exist_ok=True)
+        self.purge_expired_sessions()
+        session = UploadSessionResponse(
+            session_id=uuid4().hex,
+            filename=Path(request.filename).name or "document",
+            file_size=request.file_size,
+            content_hash=request.content_hash.lower(),
+            content_type=request.content_type,
+            part_size=part_size,
+            part_count=math.ceil(request.file_size / part_size),
+            expires_at=datetime.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS),
+        )
+        _, data_path = self._session_paths(session.session_id)
+        fd = os.open(data_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            # réserve l'espace d'un coup : un disque plein échoue ici, pas en cours d'envoi
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(fd, 0, session.file_size)
+            else:
+                os.ftruncate(fd, session.file_size)
+        except OSError:
+            os.close(fd)
+            data_path.unlink()
+            raise UploadError("Not enough storage for this upload", 507)
+        os.close(fd)
+        self._save_session(session)
+        return session
+
+    async def write_part(
+        self, session_id: str, index: int, stream: AsyncIterator[bytes]
+    ) -> UploadSessionResponse:
+        """Écrit la partie `index` à son offset ; renvoyer une partie la remplace."""
+        session = self.get_session(session_id)
+        if not 0 <= index < session.part_count:
+            raise UploadError(f"Part index out of range (0..{session.part_count - 1})")
+        offset = index * session.part_size
+        expected = min(session.part_size, session.file_size - offset)
+
+        _, data_path = self._session_paths(session_id)
+        fd = os.open(data_path, os.O_WRONLY)
+        written = 0
+        try:
+            async for chunk in stream:
+                if written + len(chunk) > expected:
+                    raise UploadError(f"Part {index} must be exactly {expected} bytes")
+                await anyio.to_thread.run_sync(os.pwrite, fd, chunk, offset + written)
+                written += len(chunk)
+        finally:
+            os.close(fd)
+        if written != expected:
+            raise UploadError(f"Part {index} must be exactly {expected} bytes")
+
+        # plusieurs parties peuvent arriver en parallèle : relecture sous verrou
+        with self._session_lock:
+            session = self.get_session(session_id)
+            if index not in session.received_parts:
+                session.received_parts = sorted(session.received_parts + [index])
+                self._save_session(session)
+        return session
+
+    async def complete_session(self, session_id: str) -> FileUploadResponse:
+        """Vérifie l'empreinte du fichier assemblé puis le range comme un upload simple."""
+        session = self.get_session(session_id)
+        missing = sorted(set(range(session.part_count)) - set(session.received_parts))
+        if missing:
+            raise UploadError(f"Missing parts: {missing[:20]}", 409)
+
+        state_path, data_path = self._session_paths(session_id)
+        content_hash, head = await anyio.to_thread.run_sync(self._hash_file, data_path)
+        if content_hash != session.content_hash:
+            # impossible de savoir quelle partie est corrompue : on repart de zéro
+            self.abort_session(session_id)
+            raise UploadError("Content hash mismatch, upload discarded", 422)
+        info = await self._store(
+            data_path, content_hash, session.file_size, head,
+            session.filename, session.content_type,
+        )
+        state_path.unlink(missing_ok=True)
+        return info
+
+    def abort_session(self, session_id: str):
+        for path in self._session_paths(session_id):
+            path.unlink(missing_ok=True)
+
+    def purge_expired_sessions(self):
+        now = datetime.now()
+        for state_path in self.session_dir().glob("*.json"):
+            try:
+                session = UploadSessionResponse.model_validate_json(state_path.read_text())
+            except (OSError, ValueError):
+                continue
+            if session.expires_at < now:
+                self.abort_session(session.session_id)
+
+    @staticmethod
+    def _hash_file(path: Path) -> Tuple[str, bytes]:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            hasher.update(head)
+            for block in iter(lambda: f.read(settings.UPLOAD_CHUNK_SIZE), b""):
+                hasher.update(block)
+        return hasher.hexdigest(), head
+
+    def analyze(self, path: Path, fmt: str) -> Tuple[Optional[int], Optional[int]]:
+        """Nombre de pages (ou de documents du spine) et nombre de mots estimé.
+
+        On n'extrait le texte que d'un échantillon réparti dans le document
+        et on extrapole : l'analyse reste rapide même pour un gros livre.
+        """
+        try:
+            if fmt == "pdf":
+                return self._analyze_pdf(path)
+            return self._analyze_epub(path)
+        except Exception as e:
+            logger.warning("Pre-analysis of %s failed: %s", path.name, e)
+            return None, None
+
+    @staticmethod
+    def _sample(count: int, size: int) -> List[int]:
+        if count <= size:
+            return list(range(count))
+        return [round(i * (count - 1) / (size - 1)) for i in range(size)]
+
+    def _analyze_pdf(self, path: Path) -> Tuple[int, int]:
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(str(path))
+        pages = len(reader.pages)
+        if not pages:
+            return 0, 0
+        sample = self._sample(pages, PDF_SAMPLE_PAGES)
+        words = sum(len((reader.pages[i].extract_text() or "").split()) for i in sample)
+        return pages, round(words / len(sample) * pages)
+
+    def _analyze_epub(self, path: Path) -> Tuple[int, int]:
+        with zipfile.ZipFile(path) as zf:
+            spine = [name for name in epub_spine(zf) if name in zf.NameToInfo]
+            if not spine:
+                return 0, 0
+            total_bytes = sum(zf.getinfo(name).file_size for name in spine)
+            sampled_bytes = sampled_words = 0
+            for i in self._sample(len(spine), EPUB_SAMPLE_DOCS):
+                raw = zf.read(spine[i])
+                sampled_bytes += len(raw)
+                sampled_words += len(_TAG_RE.sub(b" ", raw).split())
+        if not sampled_bytes:
+            return len(spine), 0
+        return len(spine), round(sampled_words / sampled_bytes * total_bytes)
+
+
+# Instance globale
+upload_service = UploadService()
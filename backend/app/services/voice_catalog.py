@@ -0,0 +1,271 @@
+"""Catalogue des voix installées, gardé en mémoire.
+
+Le catalogue est construit en parcourant ``VOICES_BASE_PATH`` (modèles
+``.onnx`` et leurs configurations ``.onnx.json``) et en y fusionnant
+``voice_metadata.json``. Il n'est reconstruit que si la signature du
+dossier change : mtimes des répertoires (ajout ou suppression d'un
+fichier) et des fichiers de voix. Cette signature n'est recalculée qu'au
+plus toutes les ``VOICE_CATALOG_CHECK_SECONDS`` ; la réponse sérialisée et
+son ETag sont gardés avec le catalogue. Un identifiant inconnu ne force
+une reconstruction que si l'un des répertoires a changé depuis (un stat
+par répertoire, sans parcours).
+
+La validation d'une voix (une synthèse d'essai) est mise en cache par
+taille et mtime du modèle : seul un modèle remplacé est revalidé.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.exceptions import TTSEngineError
+from app.core.metrics import record_cache
+from app.models.voice import (
+    VoiceInfo, VoiceListResponse, VoiceQuality, VoiceValidationResponse, VoiceValidationResult,
+)
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = "voice_metadata.json"
+VALIDATION_TEXT = "Bonjour, ceci est un test de voix."
+
+Signature = Tuple[Tuple[str, int, int], ...]
+
+
+class VoiceCatalog:
+    def __init__(self, voices_dir: Optional[Path] = None):
+        # None : suit settings.VOICES_BASE_PATH (modifiable à chaud, ex. en test)
+        self.voices_dir = voices_dir
+        self._lock = threading.Lock()
+        self._built_for: Optional[Tuple[Path, Signature]] = None
+        self._checked_at = 0.0
+        self._voices: Dict[str, VoiceInfo] = {}
+        self._body = b""
+        self.etag = ""
+        self._validations: Dict[Tuple[str, int, int], VoiceValidationResult] = {}
+
+    @property
+    def root(self) -> Path:
+        return Path(self.voices_dir or settings.VOICES_BASE_PATH)
+
+    # Catalogue ---------------------------------------------------------------
+
+    def voices(self) -> List[VoiceInfo]:
+        self.refresh()
+        return list(self._voices.values())
+
+    def get(self, voice_id: str) -> Optional[VoiceInfo]:
+        self.refresh()
+        voice = self._voices.get(voice_id)
+        if voice is None and self._directories_changed():
+            # un modèle tout juste copié n'attend pas la fin de l'intervalle
+            self.refresh(force=True)
+            voice = self._voices.get(voice_id)
+        return voice
+
+    def response(self) -> Tuple[bytes, str]:
+        """Liste sérialisée des voix et son ETag."""
+        self.refresh()
+        with self._lock:
+            return self._body, self.etag
+
+    def _directories_changed(self) -> bool:
+        """Un fichier a-t-il été ajouté ou supprimé depuis le dernier parcours ?"""
+        with self._lock:
+            if self._built_for is None or self._built_for[0] != self.root:
+                return True
+            directories = [(path, mtime) for path, mtime, size in self._built_for[1] if size < 0]
+        for path, mtime in directories:
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def refresh(self, force: bool = False):
+        now = time.monotonic()
+        root = self.root
+        with self._lock:
+            fresh = (
+                self._built_for is not None
+                and self._built_for[0] == root
+                and now - self._checked_at < settings.VOICE_CATALOG_CHECK_SECONDS
+            )
+            if fresh and not force:
+                return
+            signature = self._signature(root)
+            self._checked_at = now
+            if self._built_for == (root, signature):
+                record_cache("voice_catalog", True)
+                return
+            record_cache("voice_catalog", False)
+            self._build(root)
+            self._built_for = (root, signature)
+
+    @staticmethod
+    def _signature(root: Path) -> Signature:
+        """mtimes des répertoires (taille -1) et des fichiers de voix, sans rien lire."""
+        entries = []
+        stack = [str(root)]
+        while stack:
+            directory = stack.pop()
+            try:
+                stat = os.stat(directory)
+                entries.append((directory, stat.st_mtime_ns, -1))
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.endswith((".onnx", ".json")):
+                            st = entry.stat()
+                            entries.append((entry.path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                continue
+        return tuple(sorted(entries))
+
+    def _build(self, root: Path):
+        metadata = self._load_metadata(root)
+        voices: Dict[str, VoiceInfo] = {}
+        models = {p.with_suffix("") for p in root.rglob("*.onnx.json")}
+        models.update(root.rglob("*.onnx"))
+        for model in sorted(models):
+            try:
+                voice = self._voice_info(root, model, metadata)
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping voice %s: %s", model, e)
+                continue
+            voices.setdefault(voice.id, voice)
+
+        self._voices = voices
+        listing = VoiceListResponse(
+            voices=list(voices.values()),
+            default_voice=settings.DEFAULT_VOICE_MODEL,
+            count=len(voices),
+        )
+        self._body = listing.model_dump_json().encode()
+        self.etag = f'"{hashlib.sha1(self._body).hexdigest()[:20]}"'
+        logger.info("Voice catalog rebuilt: %d voices", len(voices))
+
+    @staticmethod
+    def _load_metadata(root: Path) -> Dict[str, dict]:
+        try:
+            return json.loads((root / METADATA_FILE).read_text(encoding="utf-8")).get("voices", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _voice_info(self, root: Path, model: Path, metadata: Dict[str, dict]) -> VoiceInfo:
+        config_path = model.with_name(model.name + ".json")
+        config = json.loads(config_path.read_text(encoding="utf-8")) if config_path.exists() else {}
+        model_path = f"{root.name}/{model.relative_to(root).as_posix()}"
+        meta = metadata.get(model_path) or next(
+            (m for key, m in metadata.items() if key.endswith("/" + model.name)), {}
+        )
+        technical = meta.get("technical", {})
+        available = model.exists()
+        # noms Piper : langue-dataset-qualité ; sinon le nom du fichier entier
+        name_parts = model.stem.split("-")
+        dataset = (config.get("dataset") or technical.get("dataset")
+                   or (name_parts[1] if len(name_parts) > 1 else model.stem))
+        language = (config.get("language") or meta.get("language") or {}).get("code")
+        return VoiceInfo(
+            id=model.stem,
+            name=meta.get("name") or dataset.replace("_", " ").title(),
+            display_name=meta.get("display_name") or model.stem,
+            model_path=model_path,
+            full_path=str(model),
+            language=language or model.stem.split("-")[0],
+            dataset=dataset,
+            quality=self._determine_quality(model, config),
+            sample_rate=config.get("audio", {}).get("sample_rate") or technical.get("sample_rate", 22050),
+            file_size_mb=round(model.stat().st_size / 1e6, 1) if available else technical.get("file_size_mb", 0),
+            is_available=available,
+            metadata={k: v for k, v in meta.items() if k not in ("name", "display_name", "language")},
+        )
+
+    @staticmethod
+    def _determine_quality(model: Path, config: dict) -> VoiceQuality:
+        quality = config.get("audio", {}).get("quality")
+        if quality is None:
+            parts = [model.parent.name] + model.stem.split("-")[-1:]
+            quality = next((p for p in parts if p in VoiceQuality._value2member_map_), "medium")
+        try:
+            return VoiceQuality(quality)
+        except ValueError:
+            return VoiceQuality.MEDIUM
+
+    # Validation --------------------------------------------------------------
+
+    def validate(self, engine_factory) -> VoiceValidationResponse:
+        """Synthèse d'essai de chaque voix installée, en cache par (taille, mtime).
+
+        `engine_factory` renvoie le moteur TTS ; s'il est indisponible (Piper
+        absent), aucun résultat n'est mis en cache.
+        """
+        voices = [v for v in self.voices() if v.is_available]
+        try:
+            engine = engine_factory()
+        except TTSEngineError as e:
+            engine, piper_error = None, str(e)
+
+        results = []
+        for voice in voices:
+            stat = os.stat(voice.full_path)
+            key = (voice.full_path, stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                cached = self._validations.get(key)
+            record_cache("voice_validation", cached is not None)
+            if cached is None:
+                if engine is None:
+                    results.append(VoiceValidationResult(
+                        voice_id=voice.id, model_path=voice.model_path,
+                        working=False, error=piper_error,
+                    ))
+                    continue
+                cached = self._validate_one(engine, voice)
+                with self._lock:
+                    self._validations[key] = cached
+            results.append(cached)
+
+        working = sum(r.working for r in results)
+        recommendations = []
+        if engine is None:
+            recommendations.append("Install Piper and make sure it is in the PATH")
+        elif not voices:
+            recommendations.append(f"Download voice models into {self.root}")
+        recommendations += [f"Re-download {r.model_path}: {r.error}" for r in results if engine and not r.working]
+        return VoiceValidationResponse(
+            validation_results=results,
+            summary={
+                "total_models": len(results),
+                "working_models": working,
+                "success_rate": round(working / len(results), 3) if results else 0.0,
+                "piper_available": engine is not None,
+            },
+            recommendations=recommendations,
+        )
+
+    @staticmethod
+    def _validate_one(engine, voice: VoiceInfo) -> VoiceValidationResult:
+        started = time.monotonic()
+        with tempfile.TemporaryDirectory(prefix="voice-check-") as tmp:
+            try:
+                engine.synthesize_block(VALIDATION_TEXT, voice.full_path, str(Path(tmp) / "check.wav"))
+            except TTSEngineError as e:
+                return VoiceValidationResult(
+                    voice_id=voice.id, model_path=voice.model_path, working=False, error=str(e)
+                )
+        return VoiceValidationResult(
+            voice_id=voice.id, model_path=voice.model_path, working=True,
+            seconds=round(time.monotonic() - started, 3),
+        )
+
+
+# Instance globale
+voice_catalog = VoiceCatalog()
@@ -0,0 +1,499 @@
+"""Pool de processus Piper gardés chauds, par voix.
+
+Lancer Piper pour chaque bloc recharge le modèle ONNX à chaque fois. Ici,
+chaque session est un processus Piper en mode ``--json-input`` : il lit
+une requête JSON par ligne (texte et fichier de sortie) et écrit le chemin
+du WAV produit sur stdout, le modèle restant chargé entre deux énoncés.
+Une session neuve synthétise d'abord un énoncé factice, pour que la
+première vraie requête ne paie pas l'initialisation du runtime.
+
+Les sessions inactives sont rangées par ordre d'utilisation ; quand la
+mémoire totale des sessions dépasse le budget, les moins récemment
+utilisées sont arrêtées.
+
+Tous les processus appartiennent à une boucle asyncio dédiée : ils sont
+lancés par ``asyncio.create_subprocess_exec`` et leurs tubes lus sans
+bloquer, chaque appel ayant son délai maximal. Un sémaphore borne le
+nombre de synthèses simultanées ; chacune occupe un créneau de CPU du
+gouverneur (budget de threads, épinglage éventuel). Les synthèses
+interactives (aperçus, flux) prennent un créneau libre s'il y en a un,
+sinon l'un des ``VOICE_POOL_INTERACTIVE_SLOTS`` créneaux qui leur sont
+réservés : elles n'attendent jamais la fin d'un bloc de conversion. Un
+appel annulé ou hors délai tue sa session, dont le protocole n'est plus
+synchronisé. Les workers du
+scheduler attendent le résultat via `run`, les routes async via
+`run_async`, sans thread supplémentaire par appel.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Awaitable, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import settings
+from app.core.exceptions import TTSEngineError
+from app.core.metrics import PIPER_RESTARTS, SPECULATIVE_RUNS, STAGE_LATENCY, record_cache
+from app.services.cpu_governor import CpuGovernor, cpu_governor
+
+logger = logging.getLogger(__name__)
+
+# Clé d'un pool : même modèle et mêmes paramètres de ligne de commande
+SessionKey = Tuple[str, Tuple[str, ...]]
+
+STDERR_LINES = 20
+CLOSE_TIMEOUT_SECONDS = 2.0
+HEDGE_POLL_SECONDS = 0.1  # attente d'un créneau libre pour une copie de secours
+RSS_FACTOR = 2  # mémoire d'un processus ≈ 2 × taille du modèle, si /proc absent
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError, TypeError):
+        return None
+
+
+class PiperSession:
+    """Un processus Piper chargé avec un modèle ; un énoncé à la fois."""
+
+    def __init__(self, key: SessionKey, voice: str):
+        self.key = key
+        self.voice = voice
+        self.memory = 0
+        self._killed = False
+        # cause de la fin du processus : crash tant qu'on ne l'a pas tué nous-mêmes
+        self.exit_reason = "crash"
+        self.slot: Optional[int] = None  # créneau de CPU sur lequel il est épinglé
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._stderr: Deque[str] = deque(maxlen=STDERR_LINES)
+        self._stderr_task: Optional[asyncio.Future] = None
+        self._workdir = TemporaryDirectory(prefix="piper-")
+
+    async def start(self, cmd: Sequence[str], env: Optional[Dict[str, str]] = None):
+        self.process = await asyncio.create_subprocess_exec(
+            *cmd, "--output_dir", self._workdir.name, "--json-input",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+        )
+        # stderr non lu finirait par bloquer Piper une fois le tube plein
+        self._stderr_task = asyncio.ensure_future(self._drain_stderr())
+
+    async def _drain_stderr(self):
+        try:
+            async for line in self.process.stderr:
+                self._stderr.append(line.decode("utf-8", "replace").rstrip())
+        except Exception:
+            pass
+
+    @property
+    def alive(self) -> bool:
+        # returncode n'est renseigné qu'une fois le processus réclamé par la boucle
+        return (
+            not self._killed and self.process is not None and self.process.returncode is None
+        )
+
+    async def synthesize(self, text: str, output_path: str, timeout: Optional[float]):
+        request = json.dumps({"text": text, "output_file": str(output_path)}, ensure_ascii=False)
+        try:
+            self.process.stdin.write(request.encode() + b"\n")
+            await self.process.stdin.drain()
+            produced = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            self.kill("timeout")
+            raise TTSEngineError(f"Piper timed out after {timeout:.0f}s")
+        except asyncio.CancelledError:
+            self.kill("cancelled")
+            # processus réclamé avant de rendre la main : il n'écrira plus rien
+            await self.process.wait()
+            raise
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            produced = b""
+        if not produced:
+            code = await self._exit_code()
+            details = " | ".join(self._stderr)
+            raise TTSEngineError(f"Piper exited with code {code}: {details}")
+        if not Path(output_path).exists():
+            raise TTSEngineError(f"Piper produced no output: {output_path}")
+
+    async def _exit_code(self) -> Optional[int]:
+        try:
+            code = await asyncio.wait_for(self.process.wait(), CLOSE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.kill()
+            code = await self.process.wait()
+        if self._stderr_task is not None:
+            await asyncio.wait([self._stderr_task], timeout=CLOSE_TIMEOUT_SECONDS)
+        return code
+
+    async def warm_up(self, timeout: Optional[float]):
+        warmup = str(Path(self._workdir.name) / "warmup.wav")
+        await self.synthesize(settings.VOICE_WARMUP_TEXT, warmup, timeout)
+        rss = _rss_bytes(self.process.pid)
+        self.memory = rss or RSS_FACTOR * Path(self.key[0]).stat().st_size
+
+    def kill(self, reason: str = "crash"):
+        if self.alive:
+            self._killed = True
+            self.exit_reason = reason
+            self.process.kill()
+
+    async def close(self):
+        if self.alive:
+            try:
+                self.process.stdin.close()
+                await asyncio.wait_for(self.process.wait(), CLOSE_TIMEOUT_SECONDS)
+            except (OSError, asyncio.TimeoutError):
+                self.kill()
+        if self.process is not None:
+            await self.process.wait()
+        self._workdir.cleanup()
+
+
+class _VoiceStats:
+    __slots__ = ("hits", "misses", "loads", "load_seconds", "last_load_seconds", "evictions")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.last_load_seconds = 0.0
+        self.evictions = 0
+
+
+class VoicePool:
+    def __init__(
+        self,
+        memory_budget: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        governor: Optional[CpuGovernor] = None,
+        interactive_slots: Optional[int] = None,
+    ):
+        self.memory_budget = memory_budget or settings.VOICE_POOL_MEMORY_BUDGET_MB * 1024 * 1024
+        self.governor = governor or cpu_governor
+        self.max_concurrency = max(1, max_concurrency or self.governor.workers)
+        self.interactive_slots = max(0, settings.VOICE_POOL_INTERACTIVE_SLOTS
+                                     if interactive_slots is None else interactive_slots)
+        # sessions inactives, de la moins à la plus récemment utilisée
+        self._idle: "OrderedDict[int, PiperSession]" = OrderedDict()
+        self._sessions: Dict[int, PiperSession] = {}
+        self._stats: Dict[str, _VoiceStats] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # créneaux de CPU libres ; un par synthèse en cours, sous le sémaphore
+        self._free_slots: List[int] = []
+        # voie réservée aux synthèses interactives, numérotée après les autres
+        self._interactive: Optional[asyncio.Semaphore] = None
+        self._interactive_free: List[int] = []
+        # appels en cours par étiquette (job), pour pouvoir les annuler
+        self._tagged: Dict[str, Set[Future]] = {}
+
+    # Boucle des processus --------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._free_slots = list(range(self.max_concurrency))
+                if self.interactive_slots:
+                    self._interactive = asyncio.Semaphore(self.interactive_slots)
+                    self._interactive_free = list(range(
+                        self.max_concurrency, self.max_concurrency + self.interactive_slots
+                    ))
+                self._thread = threading.Thread(
+                    target=loop.run_forever, name="piper-loop", daemon=True
+                )
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Lance `coro` sur la boucle des processus."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro: Awaitable, tag: Optional[str] = None) -> Any:
+        """Attend `coro` depuis un thread (worker du scheduler).
+
+        Un appel étiqueté peut être interrompu par `cancel(tag)` : il lève
+        alors ``concurrent.futures.CancelledError``.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("VoicePool.run called from the pool loop")
+        future = self.submit(coro)
+        if tag is None:
+            return future.result()
+        with self._lock:
+            self._tagged.setdefault(tag, set()).add(future)
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                futures = self._tagged.get(tag)
+                if futures is not None:
+                    futures.discard(future)
+                    if not futures:
+                        del self._tagged[tag]
+
+    def cancel(self, tag: str) -> int:
+        """Annule les appels en cours étiquetés `tag` ; leurs processus Piper sont tués."""
+        with self._lock:
+            futures = list(self._tagged.get(tag, ()))
+        return sum(1 for future in futures if future.cancel())
+
+    async def run_async(self, coro: Awaitable) -> Any:
+        """Attend `coro` depuis une autre boucle ; annuler l'attente annule l'appel."""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    # Synthèse (sur la boucle du pool) ----------------------------------------
+
+    async def synthesize(
+        self,
+        key: SessionKey,
+        cmd: Sequence[str],
+        text: str,
+        output_path: str,
+        timeout: Optional[float] = None,
+        interactive: bool = False,
+    ):
+        """Synthétise `text` sur une session chaude pour `key`, lancée au besoin.
+
+        Une session dont le processus a échoué n'est pas remise au pool.
+        """
+        voice = Path(key[0]).stem
+        semaphore, free_slots = self._lane(interactive)
+        async with semaphore:
+            slot = free_slots.pop()
+            try:
+                session = self._take_idle(key, voice)
+                if session is None:
+                    session = await self._load(key, cmd, voice, timeout, slot)
+                elif session.slot != slot:
+                    self.governor.apply(session.process.pid, slot)
+                    session.slot = slot
+                try:
+                    await session.synthesize(text, output_path, timeout)
+                finally:
+                    self._release(session)
+            finally:
+                free_slots.append(slot)
+
+    def _lane(self, interactive: bool) -> Tuple[asyncio.Semaphore, List[int]]:
+        """Sémaphore et créneaux d'une synthèse.
+
+        Une synthèse interactive ne prend la voie réservée que si tous les
+        créneaux partagés sont occupés ; le créneau réservé partage alors
+        les CPU d'un worker (légère surcharge plutôt qu'attente).
+        """
+        if interactive and self._interactive is not None and self._semaphore.locked():
+            return self._interactive, self._interactive_free
+        return self._semaphore, self._free_slots
+
+    async def synthesize_hedged(
+        self,
+        key: SessionKey,
+        cmd: Sequence[str],
+        text: str,
+        output_path: str,
+        timeout: Optional[float] = None,
+        hedge_after: Optional[float] = None,
+        interactive: bool = False,
+    ):
+        """Comme `synthesize`, avec une copie de secours pour les appels trop lents.
+
+        Si l'appel dure plus de `hedge_after` secondes, une seconde synthèse
+        du même texte est lancée dès qu'un créneau est libre ; la première
+        qui réussit est gardée et l'autre annulée (son processus est tué).
+        """
+        if hedge_after is None:
+            return await self.synthesize(key, cmd, text, output_path, timeout, interactive)
+        primary = asyncio.ensure_future(self.synthesize(key, cmd, text, output_path, timeout))
+        backup_path = f"{output_path}.backup.wav"
+        backup = None
+        try:
+            done, _ = await asyncio.wait([primary], timeout=hedge_after)
+            # ne pas prendre le créneau d'un autre job : on attend qu'il y en ait un libre
+            while not done and self._semaphore.locked():
+                done, _ = await asyncio.wait([primary], timeout=HEDGE_POLL_SECONDS)
+            if done:
+                return primary.result()
+
+            logger.info("Block running for over %.1fs: starting a backup synthesis", hedge_after)
+            backup = asyncio.ensure_future(self.synthesize(key, cmd, text, backup_path, timeout))
+            pending, winner, error = {primary, backup}, None, None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                    elif error is None:
+                        error = task.exception()
+            if winner is None:
+                raise error
+            # le perdant est tué (et réclamé) avant de toucher au fichier de sortie
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+            SPECULATIVE_RUNS.inc(winner="backup" if winner is backup else "primary")
+            if winner is backup:
+                os.replace(backup_path, output_path)
+        finally:
+            leftovers = [t for t in (primary, backup) if t is not None and not t.done()]
+            for task in leftovers:
+                task.cancel()
+            if leftovers:
+                await asyncio.wait(leftovers)
+            if backup is not None:
+                Path(backup_path).unlink(missing_ok=True)
+
+    def _take_idle(self, key: SessionKey, voice: str) -> Optional[PiperSession]:
+        with self._lock:
+            stats = self._stats.setdefault(voice, _VoiceStats())
+            for sid, session in reversed(self._idle.items()):
+                if session.key == key:
+                    del self._idle[sid]
+                    if session.alive:
+                        stats.hits += 1
+                        record_cache("voice_pool", True)
+                        return session
+                    self._sessions.pop(sid, None)
+                    break
+            stats.misses += 1
+        record_cache("voice_pool", False)
+        return None
+
+    async def _load(
+        self,
+        key: SessionKey,
+        cmd: Sequence[str],
+        voice: str,
+        timeout: Optional[float],
+        slot: int,
+    ) -> PiperSession:
+        started = time.monotonic()
+        session = PiperSession(key, voice)
+        try:
+            await session.start(cmd, self.governor.environment())
+        except OSError as e:
+            await session.close()
+            raise TTSEngineError(f"Cannot start Piper: {e}")
+        self.governor.apply(session.process.pid, slot)
+        session.slot = slot
+        try:
+            await session.warm_up(timeout)
+        except (TTSEngineError, asyncio.CancelledError):
+            session.kill()
+            PIPER_RESTARTS.inc(voice=voice, reason=session.exit_reason)
+            asyncio.ensure_future(session.close())
+            raise
+        elapsed = time.monotonic() - started
+        STAGE_LATENCY.observe(elapsed, stage="voice_load")
+        logger.info("Voice %s loaded in %.2fs (%d MB)", voice, elapsed, session.memory >> 20)
+        with self._lock:
+            stats = self._stats[voice]
+            stats.loads += 1
+            stats.load_seconds += elapsed
+            stats.last_load_seconds = elapsed
+            self._sessions[id(session)] = session
+            evicted = self._evict()
+        self._close_all(evicted)
+        return session
+
+    def _release(self, session: PiperSession):
+        with self._lock:
+            if session.alive:
+                self._idle[id(session)] = session
+                evicted = self._evict()
+            else:
+                self._sessions.pop(id(session), None)
+                PIPER_RESTARTS.inc(voice=session.voice, reason=session.exit_reason)
+                evicted = [session]
+        self._close_all(evicted)
+
+    def _evict(self) -> List[PiperSession]:
+        """Sessions inactives à arrêter pour revenir sous le budget (sous verrou)."""
+        evicted = []
+        while self._idle and self._memory_used() > self.memory_budget:
+            _, session = self._idle.popitem(last=False)
+            self._sessions.pop(id(session), None)
+            self._stats[session.voice].evictions += 1
+            logger.info("Evicting voice %s from the pool", session.voice)
+            evicted.append(session)
+        return evicted
+
+    @staticmethod
+    def _close_all(sessions: List[PiperSession]):
+        for session in sessions:
+            asyncio.ensure_future(session.close())
+
+    # Observabilité ------------------------------------------------------------
+
+    def _memory_used(self) -> int:
+        return sum(s.memory for s in self._sessions.values())
+
+    def memory_used(self) -> int:
+        with self._lock:
+            return self._memory_used()
+
+    def stats(self) -> Dict[str, dict]:
+        """Sessions chargées, mémoire, temps de chargement et taux de réussite, par voix."""
+        with self._lock:
+            loaded: Dict[str, List[PiperSession]] = {}
+            for session in self._sessions.values():
+                loaded.setdefault(session.voice, []).append(session)
+            result = {}
+            for voice, st in self._stats.items():
+                sessions = loaded.get(voice, [])
+                requests = st.hits + st.misses
+                result[voice] = {
+                    "sessions": len(sessions),
+                    "memory_bytes": sum(s.memory for s in sessions),
+                    "hits": st.hits,
+                    "misses": st.misses,
+                    "hit_rate": st.hits / requests if requests else 0.0,
+                    "loads": st.loads,
+                    "evictions": st.evictions,
+                    "last_load_seconds": st.last_load_seconds,
+                    "avg_load_seconds": st.load_seconds / st.loads if st.loads else 0.0,
+                }
+        return result
+
+    def shutdown(self):
+        """Arrête les sessions et la boucle ; le pool redémarre au prochain appel."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._idle.clear()
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        async def close_all():
+            await asyncio.gather(*(s.close() for s in sessions), return_exceptions=True)
+            # fermetures de sessions évincées ou mortes encore en cours
+            others = asyncio.all_tasks() - {asyncio.current_task()}
+            if others:
+                await asyncio.wait(others, timeout=CLOSE_TIMEOUT_SECONDS)
+
+        asyncio.run_coroutine_threadsafe(close_all(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+# Instance globale
+voice_pool = VoicePool()
@@ -0,0 +1,58 @@
+"""Commande de calibration : ``python -m app.tune [--voice ID ...]``.
+
+Mesure, pour chaque voix installée (ou celles demandées), la meilleure
+combinaison synthèses simultanées × threads × taille de bloc sur cette
+machine et l'enregistre dans le profil lu au démarrage par le backend et
+par ``tts.py``.
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.autotune import SAMPLE_CHARS, Autotuner, sample_text
+from app.services.tuning_profile import TuningProfile
+from app.services.voice_catalog import voice_catalog
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.tune", description=__doc__.splitlines()[0])
+    parser.add_argument("--voice", action="append", default=[],
+                        help="voix à calibrer (id du catalogue) ; toutes par défaut")
+    parser.add_argument("--chars", type=int, default=SAMPLE_CHARS,
+                        help="taille du texte d'exemple, en caractères")
+    parser.add_argument("--text", type=Path, help="texte d'exemple à utiliser à la place")
+    parser.add_argument("--output", type=Path, default=settings.TUNING_PROFILE_PATH,
+                        help="fichier de profil à écrire")
+    parser.add_argument("--piper", default=None, help="exécutable Piper")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    voices = {
+        v.id: (Path(v.full_path), v.quality.value)
+        for v in voice_catalog.voices()
+        if v.is_available and (not args.voice or v.id in args.voice)
+    }
+    missing = set(args.voice) - set(voices)
+    if missing:
+        print(f"Unknown or unavailable voices: {', '.join(sorted(missing))}", file=sys.stderr)
+        return 1
+    if not voices:
+        print(f"No installed voice in {voice_catalog.root}", file=sys.stderr)
+        return 1
+
+    text = args.text.read_text(encoding="utf-8") if args.text else sample_text(args.chars)
+    tuner = Autotuner(args.piper, text=text)
+    entries = tuner.tune(voices, TuningProfile(args.output))
+
+    for voice_id, entry in sorted(entries.items()):
+        if voice_id in voices:
+            print(f"{voice_id}: {entry['workers']} x {entry['threads']} threads, "
+                  f"max_chars={entry['max_chars']} ({entry['audio_seconds_per_second']} audio s/s)")
+    print(f"Profile written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,26 @@
 """Pytest configuration and shared fixtures."""
 
+import json
 import pytest
+import sys
 import tempfile
+import textwrap
 from pathlib import Path
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch
 
 from app.main import app
-from app.core.config import settings
+from app.core.config import BACKEND_DIR, settings
+
+
+@pytest.fixture(scope="session", autouse=True)
+def real_voices_untouched():
+    """Fail the run if a test writes into the real voices directory."""
+    voices_dir = BACKEND_DIR / "voices"
+    before = set(voices_dir.rglob("*"))
+    yield
+    created = sorted(str(p) for p in set(voices_dir.rglob("*")) - before)
+    assert not created, f"tests wrote into {voices_dir}: {created}"
 
 
 @pytest.fixture
@@ -64,4 +77,74 @@ def setup_test_environment(temp_dir, monkeypatch):
     (temp_dir / "uploads").mkdir(exist_ok=True)
     (temp_dir / "outputs").mkdir(exist_ok=True)
     (temp_dir / "temp").mkdir(exist_ok=True)
-    (temp_dir / "voices").mkdir(exist_ok=True)
\ No newline at end of file
+    (temp_dir / "voices").mkdir(exist_ok=True)
+
+
+@pytest.fixture
+def temp_storage(temp_dir):
+    """Storage root whose `voices` directory is VOICES_BASE_PATH."""
+    return temp_dir
+
+
+@pytest.fixture
+def sample_voice_files(temp_storage):
+    """One installed voice: model, Piper config and catalog metadata."""
+    voices_dir = temp_storage / "voices"
+    model_dir = voices_dir / "fr" / "fr_FR" / "test" / "low"
+    model_dir.mkdir(parents=True)
+    model = model_dir / "fr_FR-test-low.onnx"
+    model.write_bytes(b"mock voice model")
+    (model_dir / "fr_FR-test-low.onnx.json").write_text(json.dumps({
+        "audio": {"sample_rate": 16000, "quality": "low"},
+        "language": {"code": "fr_FR"},
+        "dataset": "test",
+    }))
+    (voices_dir / "voice_metadata.json").write_text(json.dumps({
+        "voices": {
+            "voices/fr/fr_FR/test/low/fr_FR-test-low.onnx": {
+                "name": "Test Voice",
+                "display_name": "Test Voice (low)",
+                "recommended_usage": ["test"],
+            }
+        }
+    }))
+    return model
+
+
+FAKE_PIPER = textwrap.dedent("""\
+    import json, os, sys, time, wave
+    assert "--json-input" in sys.argv
+    for line in sys.stdin:
+        request = json.loads(line)
+        if "CRASH" in request["text"]:
+            sys.exit(3)
+        if "SLEEP" in request["text"]:
+            time.sleep(float(request["text"].split()[-1]))
+        if request["text"].startswith("STALL "):
+            # seul le premier appel pour ce drapeau reste bloqué
+            flag = request["text"].split()[-1]
+            if not os.path.exists(flag):
+                open(flag, "w").close()
+                time.sleep(30)
+        with wave.open(request["output_file"], "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(b"\\x00\\x00" * 1600)
+        print(request["output_file"], flush=True)
+""")
+
+
+@pytest.fixture
+def piper(temp_dir):
+    """Fake `--json-input` Piper: one short WAV per request line.
+
+    Text containing CRASH makes it exit with code 3, "SLEEP <s>" delays it
+    and "STALL <flag file>" hangs only the first call for that flag.
+    """
+    script = temp_dir / "fake_piper.py"
+    script.write_text(FAKE_PIPER)
+    launcher = temp_dir / "piper"
+    launcher.write_text(f"#!/bin/sh\nexec {sys.executable} {script} \"$@\"\n")
+    launcher.chmod(0o755)
+    return str(launcher)
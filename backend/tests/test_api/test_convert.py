@@ -0,0 +1,99 @@
+"""Tests for conversion API endpoints."""
+
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.exceptions import AdmissionRejected, JobStateError, TextExtractionError
+from app.services.conversion_service import conversion_service
+
+
+class TestStartConversion:
+    """Tests for /api/convert/start endpoint."""
+
+    def test_start_rejected_with_retry_after(self, client: TestClient):
+        with patch.object(conversion_service, "start_conversion",
+                          side_effect=AdmissionRejected(42)):
+            response = client.post("/api/convert/start", json={"file_id": "abc"})
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "42"
+
+    def test_start_unknown_file(self, client: TestClient):
+        response = client.post("/api/convert/start", json={"file_id": "missing"})
+        assert response.status_code == 404
+
+    def test_start_passes_priority_and_client(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["testclient"])
+        with patch.object(conversion_service, "start_conversion",
+                          return_value="job-1") as mock_start:
+            response = client.post(
+                "/api/convert/start",
+                json={"file_id": "abc", "priority": "bulk"},
+                headers={"X-Client-ID": "library-import"},
+            )
+
+        assert response.status_code == 200
+        kwargs = mock_start.call_args.kwargs
+        assert kwargs["priority"].value == "bulk"
+        assert kwargs["client_id"] == "library-import"
+        assert kwargs["previous_job_id"] is None
+
+    def test_client_id_header_ignored_without_trusted_proxy(self, client: TestClient):
+        with patch.object(conversion_service, "start_conversion",
+                          return_value="job-1") as mock_start:
+            client.post(
+                "/api/convert/start",
+                json={"file_id": "abc"},
+                headers={"X-Client-ID": "someone-else"},
+            )
+
+        assert mock_start.call_args.kwargs["client_id"] == "testclient"
+
+    def test_start_passes_previous_job(self, client: TestClient):
+        with patch.object(conversion_service, "start_conversion",
+                          return_value="job-2") as mock_start:
+            response = client.post(
+                "/api/convert/start", json={"file_id": "abc", "previous_job_id": "job-1"}
+            )
+
+        assert response.status_code == 200
+        assert mock_start.call_args.kwargs["previous_job_id"] == "job-1"
+
+    def test_start_passes_selection(self, client: TestClient):
+        with patch.object(conversion_service, "start_conversion",
+                          return_value="job-3") as mock_start:
+            response = client.post("/api/convert/start", json={"file_id": "abc", "pages": "120-180"})
+
+        assert response.status_code == 200
+        assert mock_start.call_args.kwargs["pages"] == "120-180"
+        assert mock_start.call_args.kwargs["chapters"] is None
+
+    def test_start_invalid_selection(self, client: TestClient):
+        response = client.post("/api/convert/start", json={"file_id": "abc", "chapters": "trois"})
+        assert response.status_code == 422
+
+        with patch.object(conversion_service, "start_conversion",
+                          side_effect=TextExtractionError("Page ranges apply to PDF documents only")):
+            response = client.post("/api/convert/start", json={"file_id": "abc", "pages": "1-2"})
+        assert response.status_code == 400
+
+    def test_start_invalid_priority(self, client: TestClient):
+        response = client.post("/api/convert/start", json={"file_id": "abc", "priority": "urgent"})
+        assert response.status_code == 422
+
+
+class TestCancelConversion:
+    """Tests for DELETE /api/convert/{job_id}."""
+
+    def test_cancel_unknown_job(self, client: TestClient):
+        response = client.delete("/api/convert/missing-job")
+        assert response.status_code == 404
+
+    def test_cancel_finished_job_conflict(self, client: TestClient):
+        with patch.object(conversion_service, "cancel_conversion",
+                          side_effect=JobStateError("Job job-1 is already completed")):
+            response = client.delete("/api/convert/job-1")
+
+        assert response.status_code == 409
@@ -0,0 +1,43 @@
+"""Tests for /metrics and /ready endpoints."""
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.conversion_service import conversion_service
+
+
+def test_metrics_exposition(client: TestClient):
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    for name in (
+        "audiobook_queue_depth",
+        "audiobook_worker_utilization",
+        "audiobook_jobs",
+        "audiobook_stage_duration_seconds",
+        "audiobook_synthesis_real_time_factor",
+        "audiobook_piper_restarts_total",
+        "audiobook_cache_requests_total",
+    ):
+        assert f"# TYPE {name}" in body
+
+
+def test_ready_when_idle(client: TestClient):
+    response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+
+def test_ready_reports_saturation(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_BACKLOG_SECONDS", 10.0)
+    monkeypatch.setattr(conversion_service.scheduler, "backlog", lambda: 25.0)
+
+    response = client.get("/ready")
+
+    assert response.status_code == 503
+    data = response.json()
+    assert data["status"] == "saturated"
+    assert data["backlog_seconds"] == 25.0
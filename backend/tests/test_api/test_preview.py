@@ -52,11 +52,22 @@ class TestVoicesEndpoint:
 class TestTTSPreviewEndpoint:
     """Tests for /api/preview/tts endpoint."""
     
-    @patch('app.services.tts_engine.TTSEngine.synthesize_text')
-    def test_tts_preview_success(self, mock_synthesize, client: TestClient, sample_voice_files):
+    def test_tts_preview_success(self, client: TestClient, sample_voice_files):
         """Test successful TTS preview generation."""
-        # Mock TTS synthesis
-        mock_synthesize.return_value = 2.5  # Mock duration
+        import wave
+
+        from app.services.preview_service import preview_service
+
+        # Mock TTS synthesis: the engine must write the WAV it reports
+        class Engine:
+            async def synthesize_text(self, text, voice_path, output_path, **kwargs):
+                with wave.open(output_path, "wb") as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(16000)
+                    wf.writeframes(b"\x00\x00" * 40000)
+                return 2.5
+
         
         request_data = {
             "text": "Bonjour, ceci est un test",
@@ -67,7 +78,8 @@ class TestTTSPreviewEndpoint:
             "sentence_silence": 0.35
         }
         
-        response = client.post("/api/preview/tts", json=request_data)
+        with patch.object(preview_service, "_engine", Engine()):
+            response = client.post("/api/preview/tts", json=request_data)
         
         assert response.status_code == 200
         data = response.json()
@@ -124,3 +136,108 @@ class TestTTSPreviewEndpoint:
         response = client.post("/api/preview/tts", json=request_data)
         
         assert response.status_code == 422  # Validation error
+
+
+class TestPreviewAudio:
+    """Tests for synthesized preview audio and the voice pool stats."""
+
+    @pytest.fixture
+    def fake_engine(self):
+        import wave
+
+        from app.services.preview_service import preview_service
+
+        class Engine:
+            def synthesize_block(self, text, voice_path, output_path, **kwargs):
+                with wave.open(output_path, "wb") as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(16000)
+                    wf.writeframes(b"\x00\x00" * 8000)
+
+            async def synthesize_text(self, text, voice_path, output_path, **kwargs):
+                self.synthesize_block(text, voice_path, output_path, **kwargs)
+                return 0.5
+
+        with patch.object(preview_service, "_engine", Engine()):
+            yield
+
+    def test_preview_audio_served(self, client: TestClient, fake_engine):
+        from app.core.config import settings
+
+        (settings.VOICES_BASE_PATH / "fr_FR-siwis-low.onnx").write_bytes(b"model")
+        response = client.post("/api/preview/tts", json={"text": "Bonjour"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["duration_seconds"] == 0.5
+        audio = client.get(data["audio_url"])
+        assert audio.status_code == 200
+        assert audio.headers["content-type"] == "audio/wav"
+
+    def test_unknown_preview(self, client: TestClient):
+        assert client.get("/api/preview/audio/" + "0" * 32).status_code == 404
+        assert client.get("/api/preview/audio/../../etc").status_code == 404
+
+    def test_pool_stats(self, client: TestClient):
+        data = client.get("/api/preview/pool").json()
+        assert data["memory_budget_bytes"] > 0
+        assert isinstance(data["voices"], dict)
+        assert data["cpu"]["workers"] >= 1
+
+
+class TestVoiceCatalogCaching:
+    """ETag revalidation of the voice list."""
+
+    def test_etag_revalidation(self, client: TestClient, sample_voice_files):
+        first = client.get("/api/preview/voices")
+        etag = first.headers["etag"]
+
+        cached = client.get("/api/preview/voices", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+    def test_get_single_voice(self, client: TestClient, sample_voice_files):
+        response = client.get("/api/preview/voices/fr_FR-test-low")
+        assert response.status_code == 200
+        assert response.json()["name"] == "Test Voice"
+        assert "etag" in response.headers
+        assert client.get("/api/preview/voices/unknown").status_code == 404
+
+
+class TestStreamingTTS:
+    """Tests for /api/preview/tts/stream."""
+
+    def test_stream_returns_chunked_wav(self, client: TestClient, sample_voice_files):
+        import wave
+
+        from app.services.preview_service import preview_service
+
+        class Engine:
+            def synthesize_block(self, text, voice_path, output_path, **kwargs):
+                with wave.open(output_path, "wb") as wf:
+                    wf.setnchannels(1)
+                    wf.setsampwidth(2)
+                    wf.setframerate(22050)
+                    wf.writeframes(b"\x01\x00" * 100)
+
+            async def synthesize_text(self, text, voice_path, output_path, **kwargs):
+                self.synthesize_block(text, voice_path, output_path, **kwargs)
+
+        with patch.object(preview_service, "_engine", Engine()):
+            response = client.post(
+                "/api/preview/tts/stream",
+                json={"text": "Un. Deux. Trois.", "voice_model": "fr_FR-test-low"},
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/wav"
+        assert "content-length" not in response.headers
+        assert response.content[:4] == b"RIFF"
+        assert len(response.content) == 44 + 3 * 200
+
+    def test_stream_unknown_voice(self, client: TestClient):
+        response = client.post(
+            "/api/preview/tts/stream", json={"text": "Bonjour.", "voice_model": "nope"}
+        )
+        assert response.status_code == 400
@@ -0,0 +1,176 @@
+"""Tests for the streaming upload endpoint."""
+
+import hashlib
+import io
+import json
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def _epub_bytes(chapters):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip")
+        zf.writestr("META-INF/container.xml", (
+            '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf"/></rootfiles></container>'
+        ))
+        manifest = "".join(
+            f'<item id="c{i}" href="c{i}.xhtml" media-type="application/xhtml+xml"/>'
+            for i in range(len(chapters))
+        )
+        spine = "".join(f'<itemref idref="c{i}"/>' for i in range(len(chapters)))
+        zf.writestr("OEBPS/content.opf", (
+            '<package xmlns="http://www.idpf.org/2007/opf">'
+            f"<manifest>{manifest}</manifest><spine>{spine}</spine></package>"
+        ))
+        for i, text in enumerate(chapters):
+            zf.writestr(f"OEBPS/c{i}.xhtml", f"<html><body><p>{text}</p></body></html>")
+        zf.writestr("OEBPS/cover.jpg", b"\xff\xd8" * 100)
+    return buffer.getvalue()
+
+
+class TestUploadFile:
+    def test_upload_epub(self, client: TestClient):
+        data = _epub_bytes(["un deux trois", "quatre cinq six"])
+        response = client.post(
+            "/api/upload/file",
+            files={"file": ("livre.epub", data, "application/epub+zip")},
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["format"] == "epub"
+        assert body["filename"] == "livre.epub"
+        assert body["file_size"] == len(data)
+        assert body["page_count"] == 2
+        assert body["word_count"] == 6
+        assert not body["duplicate"]
+        stored = settings.UPLOAD_DIR / f"{body['file_id']}.epub"
+        assert stored.read_bytes() == data
+        assert body["content_hash"].startswith(body["file_id"])
+        assert json.loads((settings.UPLOAD_DIR / f"{body['file_id']}.json").read_text())["word_count"] == 6
+
+    def test_duplicate_upload_reuses_file_id(self, client: TestClient):
+        data = _epub_bytes(["bonjour"])
+        first = client.post("/api/upload/file", files={"file": ("a.epub", data)}).json()
+        second = client.post("/api/upload/file", files={"file": ("b.epub", data)}).json()
+
+        assert second["file_id"] == first["file_id"]
+        assert second["duplicate"]
+        assert second["filename"] == "b.epub"
+        assert not list(settings.UPLOAD_DIR.glob(".upload-*"))
+
+    def test_format_sniffed_from_content(self, client: TestClient):
+        response = client.post(
+            "/api/upload/file",
+            files={"file": ("document.pdf", b"PK\x03\x04 not really a pdf")},
+        )
+        assert response.status_code == 415
+        assert not list(settings.UPLOAD_DIR.iterdir())
+
+    def test_pdf_accepted_even_if_unparseable(self, client: TestClient):
+        response = client.post(
+            "/api/upload/file", files={"file": ("doc", b"%PDF-1.4 broken")}
+        )
+        assert response.status_code == 200
+        assert response.json()["format"] == "pdf"
+        assert response.json()["page_count"] is None
+
+    def test_too_large(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_FILE_SIZE", 10)
+        response = client.post(
+            "/api/upload/file", files={"file": ("doc.pdf", b"%PDF-1.4" + b"x" * 100)}
+        )
+        assert response.status_code == 413
+        assert not list(settings.UPLOAD_DIR.iterdir())
+
+    def test_missing_file_field(self, client: TestClient):
+        response = client.post("/api/upload/file", files={"other": ("x.pdf", b"%PDF-")})
+        assert response.status_code == 400
+
+    def test_not_multipart(self, client: TestClient):
+        response = client.post("/api/upload/file", content=b"%PDF-1.4")
+        assert response.status_code == 400
+
+
+class TestUploadSessions:
+    PART = 256 * 1024
+
+    def _create(self, client, data, **extra):
+        payload = {
+            "filename": "livre.epub",
+            "file_size": len(data),
+            "content_hash": hashlib.sha256(data).hexdigest(),
+            "part_size": self.PART,
+            **extra,
+        }
+        return client.post("/api/upload/sessions", json=payload)
+
+    def _data(self):
+        # EPUB valide suivi d'un remplissage stocké, pour avoir plusieurs parties
+        return _epub_bytes(["un deux trois"]) + b"\0" * (self.PART * 2)
+
+    def test_parts_out_of_order_then_complete(self, client: TestClient):
+        data = self._data()
+        session = self._create(client, data).json()
+        assert session["part_count"] == 3
+        data_path = settings.UPLOAD_DIR / ".sessions" / f"{session['session_id']}.data"
+        assert data_path.stat().st_size == len(data)
+
+        for index in (2, 0, 1):
+            chunk = data[index * self.PART:(index + 1) * self.PART]
+            url = f"/api/upload/sessions/{session['session_id']}/parts/{index}"
+            assert client.put(url, content=chunk).status_code == 200
+
+        state = client.get(f"/api/upload/sessions/{session['session_id']}").json()
+        assert state["received_parts"] == [0, 1, 2]
+
+        response = client.post(f"/api/upload/sessions/{session['session_id']}/complete")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["format"] == "epub"
+        assert body["content_hash"] == hashlib.sha256(data).hexdigest()
+        assert (settings.UPLOAD_DIR / f"{body['file_id']}.epub").read_bytes() == data
+        assert not data_path.exists()
+
+    def test_complete_with_missing_parts(self, client: TestClient):
+        data = self._data()
+        session_id = self._create(client, data).json()["session_id"]
+        client.put(f"/api/upload/sessions/{session_id}/parts/0", content=data[:self.PART])
+
+        response = client.post(f"/api/upload/sessions/{session_id}/complete")
+        assert response.status_code == 409
+        assert "[1, 2]" in response.json()["detail"]
+
+    def test_hash_mismatch_discards_session(self, client: TestClient):
+        data = self._data()
+        session_id = self._create(client, data, content_hash="0" * 64).json()["session_id"]
+        for index in range(3):
+            client.put(f"/api/upload/sessions/{session_id}/parts/{index}",
+                       content=data[index * self.PART:(index + 1) * self.PART])
+
+        response = client.post(f"/api/upload/sessions/{session_id}/complete")
+        assert response.status_code == 422
+        assert client.get(f"/api/upload/sessions/{session_id}").status_code == 404
+
+    def test_part_with_wrong_size(self, client: TestClient):
+        session_id = self._create(client, self._data()).json()["session_id"]
+        response = client.put(f"/api/upload/sessions/{session_id}/parts/0", content=b"short")
+        assert response.status_code == 400
+
+    def test_resumable_limit(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_RESUMABLE_FILE_SIZE", 100)
+        assert self._create(client, self._data()).status_code == 413
+
+    def test_unknown_session(self, client: TestClient):
+        assert client.get("/api/upload/sessions/" + "a" * 32).status_code == 404
+        assert client.get("/api/upload/sessions/../etc").status_code == 404
+
+    def test_abort(self, client: TestClient):
+        session_id = self._create(client, self._data()).json()["session_id"]
+        assert client.delete(f"/api/upload/sessions/{session_id}").status_code == 204
+        assert not list((settings.UPLOAD_DIR / ".sessions").iterdir())
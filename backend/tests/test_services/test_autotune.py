@@ -0,0 +1,77 @@
+"""Tests for the calibration sweep and the tuning profile it writes."""
+
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services.autotune import Autotuner, Trial, core_splits, sample_text
+from app.services.cpu_governor import CpuGovernor
+from app.services.tuning_profile import TuningProfile
+
+
+def test_core_splits_use_all_cores():
+    assert core_splits(8) == [(8, 1), (4, 2), (2, 4), (1, 8)]
+    assert core_splits(1) == [(1, 1)]
+
+
+def test_sample_text_has_paragraphs():
+    text = sample_text(1000)
+    assert len(text) >= 1000
+    assert text.count("\n\n") >= 3
+
+
+def test_measure_reports_audio_per_wall_second(piper, temp_dir):
+    voice = temp_dir / "fr_FR-a-low.onnx"
+    voice.write_bytes(b"model")
+    tuner = Autotuner(piper, cpus=[0, 1], text=sample_text(600))
+
+    trial = tuner.measure(voice, workers=2, threads=1, max_chars=200)
+    assert trial.pinned
+
+    # the fake piper writes 0.1 s per block
+    assert trial.audio_seconds == pytest.approx(0.1 * 4, abs=0.11)
+    assert trial.speed > 0
+
+
+def test_tune_keeps_best_trial_per_voice(temp_dir, monkeypatch):
+    speeds = {(2, 1, 1500): 3.0, (1, 2, 1500): 2.0, (2, 1, 500): 4.0, (2, 1, 2500): 1.0}
+
+    def fake_measure(self, voice_path, workers, threads, max_chars):
+        return Trial(workers, threads, max_chars, speeds.get((workers, threads, max_chars), 0.5), 1.0)
+
+    monkeypatch.setattr(Autotuner, "measure", fake_measure)
+    profile = TuningProfile(temp_dir / "profile.json", cpus=2)
+    tuner = Autotuner(cpus=[0, 1], max_chars_candidates=(500, 1500, 2500))
+
+    entries = tuner.tune({"fr_FR-a-low": (temp_dir / "a.onnx", "low")}, profile)
+
+    assert entries["fr_FR-a-low"] == {
+        "workers": 2, "threads": 1, "max_chars": 500,
+        "audio_seconds_per_second": 4.0, "quality": "low", "pinned": True,
+    }
+    saved = json.loads((temp_dir / "profile.json").read_text())
+    assert saved["cpus"] == 2
+    assert profile.max_chars("fr_FR-a-low") == 500
+
+
+def test_profile_ignored_on_other_hardware(temp_dir):
+    path = temp_dir / "profile.json"
+    TuningProfile(path, cpus=16).save(
+        {"fr_FR-a-low": {"workers": 4, "threads": 4, "max_chars": 800}}, cpus=16
+    )
+
+    assert TuningProfile(path, cpus=16).max_chars("fr_FR-a-low") == 800
+    assert TuningProfile(path, cpus=4).voice("fr_FR-a-low") is None
+    assert TuningProfile(path, cpus=4).max_chars("fr_FR-a-low") == settings.MAX_CHUNK_CHARS
+
+
+def test_governor_defaults_from_profile(temp_dir, monkeypatch):
+    profile = TuningProfile(temp_dir / "profile.json", cpus=8)
+    profile.save({settings.DEFAULT_VOICE_MODEL: {"workers": 2, "threads": 4, "max_chars": 1000}}, 8)
+    monkeypatch.setattr("app.services.cpu_governor.tuning_profile", profile)
+
+    governor = CpuGovernor(cpus=range(8), pin=False)
+    assert (governor.workers, governor.threads) == (2, 4)
+    # explicit settings win over the profile
+    assert CpuGovernor(workers=8, cpus=range(8), pin=False).threads == 1
@@ -0,0 +1,584 @@
+"""Tests for the conversion service pipeline on top of the scheduler."""
+
+import threading
+import time
+import wave
+from concurrent.futures import CancelledError
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import STAGE_LATENCY
+from app.core.exceptions import AdmissionRejected, JobStateError, TextExtractionError, TTSEngineError
+from app.models.conversion import Priority, Status
+from app.services.conversion_service import ConversionService
+from app.services.scheduler import WorkStealingScheduler
+from app.services.throughput import ThroughputModel
+from app.services.upload_service import CHARS_PER_PAGE, upload_service
+
+
+class FakeEngine:
+    """Writes one short WAV per block instead of calling Piper."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = []
+
+    def synthesize_block(self, text, voice_path, output_path, **kwargs):
+        self.calls.append(text)
+        if self.fail_on and self.fail_on in text:
+            raise TTSEngineError("Piper failed with code 1")
+        with wave.open(output_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(b"\x00\x00" * 1600)
+
+    def cancel(self, tag):
+        return 0
+
+
+class BlockingEngine(FakeEngine):
+    """Blocks every synthesis of the first job until that job is cancelled."""
+
+    def __init__(self):
+        super().__init__()
+        self.victim = None
+        self.victim_calls = 0
+        self.started = threading.Event()
+        self.cancelled = threading.Event()
+
+    def synthesize_block(self, text, voice_path, output_path, tag=None, **kwargs):
+        if self.victim is None:
+            self.victim = tag
+        if tag == self.victim:
+            self.victim_calls += 1
+            self.started.set()
+            if self.cancelled.wait(5):
+                raise CancelledError()
+        super().synthesize_block(text, voice_path, output_path, **kwargs)
+
+    def cancel(self, tag):
+        if tag != self.victim:
+            return 0
+        self.cancelled.set()
+        return 1
+
+
+class FlakyEngine(FakeEngine):
+    """Fails the first `failures` calls, then succeeds."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def synthesize_block(self, text, voice_path, output_path, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            self.calls.append(text)
+            raise TTSEngineError("Piper exited with code -9")
+        super().synthesize_block(text, voice_path, output_path, **kwargs)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "BLOCK_RETRY_BACKOFF_SECONDS", 0.0)
+    sched = WorkStealingScheduler(num_workers=3)
+    svc = ConversionService(job_scheduler=sched, model=ThroughputModel())
+    svc._engine = FakeEngine()
+    yield svc
+    sched.shutdown()
+
+
+@pytest.fixture
+def upload(temp_storage):
+    voice = temp_storage / "voices" / "fr_FR-siwis-low.onnx"
+    voice.write_bytes(b"mock voice model")
+    path = Path(settings.UPLOAD_DIR) / "file123.pdf"
+    path.write_bytes(b"%PDF-1.4 test content")
+    return "file123"
+
+
+def _wait(service, job_id):
+    for _ in range(200):
+        status = service.get_conversion_status(job_id)
+        if status.status in (Status.COMPLETED, Status.FAILED, Status.CANCELLED):
+            return status
+        time.sleep(0.01)
+    raise AssertionError("conversion did not finish")
+
+
+def test_conversion_runs_blocks_and_assembles(service, upload):
+    assembled_before = STAGE_LATENCY.count(stage="assembly")
+    text = "\n\n".join(f"Paragraphe {i}. " + "x" * 40 for i in range(10))
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value=text):
+        job_id = service.start_conversion(upload)
+        status = _wait(service, job_id)
+
+    assert status.status == Status.COMPLETED
+    assert status.progress == 100
+    job = service.jobs[job_id]
+    assert job["blocks_done"] == job["blocks_total"] == len(service.engine.calls)
+    with wave.open(str(service.output_path(job_id)), "rb") as wf:
+        assert wf.getnframes() >= 1600 * job["blocks_total"]
+    durations, complete = service.get_segments(job_id)
+    assert complete and len(durations) == job["blocks_total"]
+    assert all(service.segment_path(job_id, i).exists() for i in range(len(durations)))
+    assert STAGE_LATENCY.count(stage="assembly") == assembled_before + 1
+    assert status.blocks_done == status.blocks_total == job["blocks_total"]
+    assert status.audio_seconds_produced == pytest.approx(0.1 * job["blocks_total"])
+    assert status.eta_seconds == 0.0
+
+
+def test_conversion_block_failure_fails_job(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "BAD_SENTENCE_POLICY", "fail")
+    service._engine = FakeEngine(fail_on="BAD")
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="BAD text"):
+        job_id = service.start_conversion(upload)
+        status = _wait(service, job_id)
+
+    assert status.status == Status.FAILED
+    assert "Piper failed" in status.error
+
+
+def test_transient_block_failure_retried(service, upload):
+    service._engine = FlakyEngine(failures=settings.BLOCK_RETRIES)
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Une phrase."):
+        job_id = service.start_conversion(upload)
+        status = _wait(service, job_id)
+
+    assert status.status == Status.COMPLETED
+    assert service.engine.calls == ["Une phrase."] * (settings.BLOCK_RETRIES + 1)
+    assert status.bad_sentences == []
+
+
+def test_throughput_ignores_retry_backoff_and_bisection(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "BLOCK_RETRY_BACKOFF_SECONDS", 0.3)
+    recorded = []
+    monkeypatch.setattr(service.model, "record", lambda voice, chars, seconds: recorded.append(seconds))
+    service._engine = FlakyEngine(failures=1)
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Une phrase."):
+        assert _wait(service, service.start_conversion(upload)).status == Status.COMPLETED
+    # seul l'appel réussi est mesuré, sans l'attente avant le nouvel essai
+    assert len(recorded) == 1 and recorded[0] < 0.3
+
+    recorded.clear()
+    monkeypatch.setattr(settings, "BLOCK_RETRY_BACKOFF_SECONDS", 0.0)
+    service._engine = FakeEngine(fail_on="BAD")
+    (Path(settings.UPLOAD_DIR) / "file456.pdf").write_bytes(b"%PDF-1.4 other")
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Un. BAD."):
+        assert _wait(service, service.start_conversion("file456")).status == Status.COMPLETED
+    assert recorded == []
+
+
+@pytest.mark.parametrize("policy", ["silence", "skip"])
+def test_bad_sentence_isolated(service, upload, monkeypatch, policy):
+    monkeypatch.setattr(settings, "BAD_SENTENCE_POLICY", policy)
+    service._engine = FakeEngine(fail_on="BAD")
+    text = "Un. Deux. Trois BAD. Quatre."
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value=text):
+        job_id = service.start_conversion(upload)
+        status = _wait(service, job_id)
+
+    assert status.status == Status.COMPLETED
+    assert [(b.block, b.text) for b in status.bad_sentences] == [(0, "Trois BAD.")]
+    # bloc entier (avec ses nouvelles tentatives), puis les moitiés, puis les phrases
+    assert service.engine.calls[settings.BLOCK_RETRIES + 1:] == [
+        "Un. Deux.", "Trois BAD. Quatre.", "Trois BAD.", "Quatre.",
+    ]
+    with wave.open(str(service.segment_path(job_id, 0)), "rb") as wf:
+        # deux morceaux synthétisés, plus un silence à la place de la phrase fautive
+        if policy == "skip":
+            assert wf.getnframes() == 2 * 1600
+        else:
+            assert wf.getnframes() > 2 * 1600
+    assert not list(service.segment_dir(job_id).glob("*.*.wav"))
+
+
+@pytest.mark.parametrize("policy", ["silence", "skip"])
+def test_block_with_single_bad_sentence_completes(service, upload, monkeypatch, policy):
+    monkeypatch.setattr(settings, "BAD_SENTENCE_POLICY", policy)
+    service._engine = FakeEngine(fail_on="BAD")
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Phrase BAD."):
+        job_id = service.start_conversion(upload)
+        status = _wait(service, job_id)
+
+    assert status.status == Status.COMPLETED
+    assert [b.text for b in status.bad_sentences] == ["Phrase BAD."]
+    # la synthèse d'essai a montré que la voix fonctionne
+    assert service.engine.calls[-1] == settings.VOICE_WARMUP_TEXT
+    with wave.open(str(service.segment_path(job_id, 0)), "rb") as wf:
+        assert wf.getframerate() == 16000
+        assert (wf.getnframes() > 0) == (policy == "silence")
+    assert not list(service.segment_dir(job_id).glob("*.*.wav"))
+
+
+def test_broken_voice_fails_job(service, upload):
+    service._engine = FlakyEngine(failures=100)
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Un. Deux."):
+        status = _wait(service, service.start_conversion(upload))
+
+    assert status.status == Status.FAILED
+    assert "code -9" in status.error
+
+
+def test_bad_sentence_policy_fail(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "BAD_SENTENCE_POLICY", "fail")
+    service._engine = FakeEngine(fail_on="BAD")
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Un. BAD."):
+        job_id = service.start_conversion(upload)
+        status = _wait(service, job_id)
+
+    assert status.status == Status.FAILED
+    assert len(service.engine.calls) == settings.BLOCK_RETRIES + 1
+
+
+def test_page_furniture_removed_and_reported(service, upload):
+    pages = [f"MON LIVRE\nTexte {'x' * i}.\n{i}" for i in range(1, 8)]
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="\f".join(pages)):
+        job_id = service.start_conversion(upload)
+        status = _wait(service, job_id)
+
+    assert status.status == Status.COMPLETED
+    assert not any("MON LIVRE" in call for call in service.engine.calls)
+    assert status.furniture_chars_removed == 7 * (len("MON LIVRE") + 1)
+    assert status.furniture_seconds_saved > 0
+
+
+def test_reconversion_reuses_extracted_text(service, upload):
+    text = "Un paragraphe.\n\nUn autre."
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value=text) as extract:
+        first = _wait(service, service.start_conversion(upload))
+        second = _wait(service, service.start_conversion(upload))
+
+    assert first.status == second.status == Status.COMPLETED
+    assert extract.call_count == 1
+    assert second.blocks_total == first.blocks_total
+
+
+def test_revised_edition_reuses_unchanged_blocks(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_CHUNK_CHARS", 100)
+    paragraphs = [f"Paragraphe {i}. " + "x" * 60 for i in range(12)]
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file",
+               return_value="\n\n".join(paragraphs)):
+        first = _wait(service, service.start_conversion(upload))
+
+    revised = paragraphs[:6] + ["Un passage ajouté."] + paragraphs[6:]
+    (Path(settings.UPLOAD_DIR) / "file456.pdf").write_bytes(b"%PDF-1.4 revised")
+    service.engine.calls.clear()
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file",
+               return_value="\n\n".join(revised)):
+        second = _wait(service, service.start_conversion("file456", previous_job_id=first.job_id))
+
+    assert second.status == Status.COMPLETED
+    assert second.blocks_total == first.blocks_total + 1
+    assert second.blocks_reused == first.blocks_total
+    assert service.engine.calls == ["Un passage ajouté."]
+    durations, complete = service.get_segments(second.job_id)
+    assert complete and len(durations) == second.blocks_total
+    with wave.open(str(service.output_path(second.job_id)), "rb") as wf:
+        assert wf.getnframes() >= 1600 * second.blocks_total
+
+
+def test_unchanged_edition_reuses_every_block(service, upload):
+    text = "\n\n".join(f"Paragraphe {i}. " + "x" * 40 for i in range(5))
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value=text):
+        first = _wait(service, service.start_conversion(upload))
+        service.engine.calls.clear()
+        second = _wait(service, service.start_conversion(upload, previous_job_id=first.job_id))
+
+    assert second.status == Status.COMPLETED
+    assert second.blocks_reused == second.blocks_total == first.blocks_total
+    assert service.engine.calls == []
+    assert service.output_path(second.job_id).exists()
+    # le verrou du service n'est pas resté pris
+    assert service._lock.acquire(timeout=1)
+    service._lock.release()
+
+
+def test_previous_conversion_must_exist(service, upload):
+    with pytest.raises(FileNotFoundError):
+        service.start_conversion(upload, previous_job_id="missing")
+
+
+def test_estimate_without_metadata_uses_pages_not_bytes(service, upload, monkeypatch):
+    source = Path(settings.UPLOAD_DIR) / f"{upload}.pdf"
+    source.write_bytes(b"%PDF-1.4" + b"\0" * 5_000_000)  # images : gros fichier, peu de texte
+    monkeypatch.setattr(upload_service, "analyze", lambda path, fmt: (10, None))
+
+    assert service._estimate_chars(source) == 10 * CHARS_PER_PAGE
+    assert service._estimate_chars(source, "1-5") == 5 * CHARS_PER_PAGE
+
+    monkeypatch.setattr(upload_service, "analyze", lambda path, fmt: (None, None))
+    assert service._estimate_chars(source) == 0.0
+
+
+def test_page_range_conversion(service, upload):
+    from app.models.upload import FileUploadResponse
+
+    info = FileUploadResponse(file_id=upload, filename="book.pdf", file_size=1, content_type="application/pdf",
+                              content_hash="0" * 64, format="pdf", page_count=200, word_count=50000)
+    (Path(settings.UPLOAD_DIR) / f"{upload}.json").write_text(info.model_dump_json())
+    source = Path(settings.UPLOAD_DIR) / f"{upload}.pdf"
+    assert service._estimate_chars(source, "121-170") == pytest.approx(service._estimate_chars(source) / 4)
+
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Extrait.") as extract:
+        status = _wait(service, service.start_conversion(upload, pages="121-170"))
+    assert status.status == Status.COMPLETED
+    assert service.jobs[status.job_id]["pages"] == "121-170"
+    assert extract.call_args.kwargs == {"pages": "121-170", "chapters": None}
+
+    with pytest.raises(TextExtractionError):
+        service.start_conversion(upload, pages="300-310")
+    with pytest.raises(TextExtractionError):
+        service.start_conversion(upload, chapters="1-2")
+
+
+def test_conversion_unknown_file(service):
+    with pytest.raises(FileNotFoundError):
+        service.start_conversion("missing")
+
+
+def test_interactive_jobs_capped_per_client(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "INTERACTIVE_MAX_ACTIVE_JOBS", 1)
+    gate = threading.Event()
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file",
+               side_effect=lambda fp, **selection: gate.wait(5) and "Bonjour."):
+        first = service.start_conversion(upload, priority=Priority.INTERACTIVE, client_id="a")
+        second = service.start_conversion(upload, priority=Priority.INTERACTIVE, client_id="a")
+        other = service.start_conversion(upload, priority=Priority.INTERACTIVE, client_id="b")
+        gate.set()
+        for job_id in (first, second, other):
+            _wait(service, job_id)
+
+    assert service.jobs[first]["priority"] == Priority.INTERACTIVE
+    assert service.jobs[second]["priority"] == Priority.STANDARD
+    assert service.jobs[other]["priority"] == Priority.INTERACTIVE
+    # le premier terminé, la classe interactive est de nouveau ouverte
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Bonjour."):
+        again = service.start_conversion(upload, priority=Priority.INTERACTIVE, client_id="a")
+    assert service.jobs[again]["priority"] == Priority.INTERACTIVE
+
+
+def test_pending_job_reports_queue_position(service, upload):
+    """A client's second job waits behind its first one."""
+    import threading
+    gate = threading.Event()
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file",
+               side_effect=lambda fp, **selection: gate.wait(5) and "Bonjour."):
+        first = service.start_conversion(upload, client_id="alice")
+        second = service.start_conversion(upload, client_id="alice")
+        other = service.start_conversion(upload, client_id="bob")
+        time.sleep(0.05)
+
+        assert service.get_conversion_status(second).queue_position == 1
+        assert service.get_conversion_status(second).status == Status.PENDING
+        assert service.get_conversion_status(other).queue_position is None
+        gate.set()
+        for job_id in (first, second, other):
+            assert _wait(service, job_id).status == Status.COMPLETED
+
+
+def test_admission_rejects_when_backlog_over_limit(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_BACKLOG_SECONDS", 100.0)
+    monkeypatch.setattr(service.scheduler, "backlog", lambda: 90.0)
+    monkeypatch.setattr(service.scheduler, "drain_rate", lambda: 2.0)
+    # 3 words x 6 chars x 1 s/char = 18 s of work: 90 + 18 - 100 = 8 s over, at 2 s/s
+    monkeypatch.setattr(upload_service, "analyze", lambda path, fmt: (1, 3))
+    service.model.record("fr_FR-siwis-low", chars=1, seconds=1.0)
+
+    with pytest.raises(AdmissionRejected) as exc:
+        service.start_conversion(upload)
+
+    assert exc.value.retry_after == 4
+    assert service.jobs == {}
+
+
+def test_admission_accepts_when_queue_empty(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_BACKLOG_SECONDS", 1.0)
+    service.model.record("fr_FR-siwis-low", chars=1, seconds=1.0)
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Bonjour."):
+        job_id = service.start_conversion(upload)
+        assert _wait(service, job_id).status == Status.COMPLETED
+
+
+def test_eta_uses_measured_rate_and_observed_parallelism(service, upload, monkeypatch):
+    service.model.record("fr_FR-siwis-low", chars=100, seconds=1.0)  # 0.01 s/char
+    voice = Path(settings.VOICES_BASE_PATH) / "fr_FR-siwis-low.onnx"
+    job_data = {
+        "voice_path": voice,
+        "blocks_total": 10,
+        "blocks_done": 4,
+        "chars_total": 10000,
+        "chars_done": 4000,
+        "chars_estimate": 0.0,
+        # 40 worker-seconds consumed in 20 s: the job gets two workers
+        "synthesis_started": time.monotonic() - 20.0,
+    }
+    # 6000 chars left = 60 worker-seconds, at 2 workers
+    assert service._remaining_seconds(job_data) == pytest.approx(30.0, rel=0.01)
+
+    job_data.update(blocks_done=0, chars_done=0, synthesis_started=None)
+    # not started yet: all 3 workers assumed, 100 worker-seconds
+    assert service._remaining_seconds(job_data) == pytest.approx(100.0 / 3)
+
+
+def test_pending_job_has_eta_before_extraction(service, upload, monkeypatch):
+    import threading
+    gate = threading.Event()
+    monkeypatch.setattr(upload_service, "analyze", lambda path, fmt: (1, 50))
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file",
+               side_effect=lambda fp, **selection: gate.wait(5) and "Bonjour."):
+        job_id = service.start_conversion(upload)
+        status = service.get_conversion_status(job_id)
+        # 50 words of document at the default rate
+        assert status.eta_seconds == pytest.approx(
+            round(300 * settings.DEFAULT_SECONDS_PER_CHAR, 1))
+        assert status.blocks_total == 0
+        gate.set()
+        assert _wait(service, job_id).status == Status.COMPLETED
+
+
+def test_segments_published_in_order_only():
+    job_data = {"block_durations": [None] * 4, "segments_ready": 0}
+
+    ConversionService._publish_segments(job_data, 1, 2.0)
+    assert job_data["segments_ready"] == 0  # block 0 still missing
+
+    ConversionService._publish_segments(job_data, 0, 1.0)
+    assert job_data["segments_ready"] == 2
+
+    ConversionService._publish_segments(job_data, 3, 1.5)
+    ConversionService._publish_segments(job_data, 2, 1.5)
+    assert job_data["segments_ready"] == 4
+
+
+def test_failed_job_drops_segments(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "BAD_SENTENCE_POLICY", "fail")
+    service._engine = FakeEngine(fail_on="BAD")
+    text = "Bon debut.\n\n" + "x" * 1500 + "\n\nBAD fin."
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value=text):
+        job_id = service.start_conversion(upload)
+        assert _wait(service, job_id).status == Status.FAILED
+
+    assert service.get_segments(job_id) == ([], True)
+    assert not service.segment_dir(job_id).exists()
+
+
+def test_first_blocks_available_as_preview(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "FIRST_AUDIO_BLOCKS", 2)
+    text = "\n\n".join(f"Paragraphe {i}. " + "x" * 1400 for i in range(5))
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value=text):
+        job_id = service.start_conversion(upload, first_audio=True)
+        status = _wait(service, job_id)
+
+    assert status.preview_ready
+    assert status.first_audio_seconds is not None
+    # les blocs express partent avant le reste (à la course entre workers près)
+    first = service.engine.calls[:service.scheduler.num_workers]
+    assert any(c.startswith("Paragraphe 0.") for c in first)
+    with wave.open(str(service.preview_path(job_id)), "rb") as wf:
+        assert wf.getnframes() >= 2 * 1600
+
+
+def test_express_lane_only_for_first_blocks_of_the_book(service, upload, monkeypatch):
+    monkeypatch.setattr(settings, "FIRST_AUDIO_BLOCKS", 2)
+    monkeypatch.setattr(settings, "MAX_CHUNK_CHARS", 100)
+    express = []
+    submit = service.scheduler.submit
+    def spy(job_id, tasks, **kwargs):
+        express.append(kwargs.get("express", 0))
+        return submit(job_id, tasks, **kwargs)
+    monkeypatch.setattr(service.scheduler, "submit", spy)
+
+    paragraphs = [f"Paragraphe {i}. " + "x" * 60 for i in range(6)]
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file",
+               return_value="\n\n".join(paragraphs)):
+        first = _wait(service, service.start_conversion(upload, first_audio=True))
+        bulk = _wait(service, service.start_conversion(upload, priority=Priority.BULK, first_audio=True))
+    # groupe d'extraction, puis groupe des blocs
+    assert express[1] == 2 and express[3] == 0
+    assert not bulk.preview_ready
+
+    # début inchangé : ses blocs sont repris, la fin modifiée ne passe pas en express
+    (Path(settings.UPLOAD_DIR) / "file456.pdf").write_bytes(b"%PDF-1.4 revised")
+    express.clear()
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file",
+               return_value="\n\n".join(paragraphs[:5] + ["Une fin réécrite."])):
+        _wait(service, service.start_conversion("file456", first_audio=True, previous_job_id=first.job_id))
+    assert express[1] == 0
+
+
+def test_preview_not_ready_without_first_audio(service, upload):
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Texte."):
+        job_id = service.start_conversion(upload, first_audio=False)
+        status = _wait(service, job_id)
+
+    assert not status.preview_ready
+    with pytest.raises(LookupError):
+        service.preview_path(job_id)
+
+
+def test_cancel_running_job_frees_workers(service, upload):
+    service._engine = BlockingEngine()
+    text = "\n\n".join(f"Paragraphe {i}. " + "x" * 1400 for i in range(20))
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value=text):
+        job_id = service.start_conversion(upload, client_id="alice", first_audio=False)
+        assert service.engine.started.wait(2)
+        other = service.start_conversion(upload, client_id="bob")
+
+        started = time.monotonic()
+        status = service.cancel_conversion(job_id)
+        assert status.status == Status.CANCELLED
+        assert _wait(service, other).status == Status.COMPLETED
+        assert time.monotonic() - started < 1.0
+
+    assert service.engine.cancelled.is_set()
+    assert not service.segment_dir(job_id).exists()
+    assert not service.output_path(job_id).exists()
+    assert service.get_segments(job_id) == ([], True)
+    assert service.scheduler.queue_info(job_id) is None
+    # seuls les blocs déjà sur un worker ont été commencés
+    assert service.engine.victim_calls <= service.scheduler.num_workers
+    assert service.get_conversion_status(job_id).status == Status.CANCELLED
+
+
+def test_cancel_during_extraction_submits_nothing(service, upload):
+    gate = threading.Event()
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file",
+               side_effect=lambda fp, **selection: gate.wait(5) and "Bonjour."):
+        job_id = service.start_conversion(upload)
+        time.sleep(0.05)
+        service.cancel_conversion(job_id)
+        gate.set()
+        time.sleep(0.1)
+
+    assert service.get_conversion_status(job_id).status == Status.CANCELLED
+    assert service.engine.calls == []
+
+
+def test_cancel_finished_job_rejected(service, upload):
+    with patch("app.services.text_extractor.TextExtractor.extract_from_file", return_value="Texte."):
+        job_id = service.start_conversion(upload)
+        assert _wait(service, job_id).status == Status.COMPLETED
+
+    with pytest.raises(JobStateError):
+        service.cancel_conversion(job_id)
+    with pytest.raises(ValueError):
+        service.cancel_conversion("unknown")
+
+
+def test_block_deadlines_follow_measured_rate(service, monkeypatch):
+    voice = Path(settings.VOICES_BASE_PATH) / "fr_FR-siwis-low.onnx"
+    assert service._block_deadlines(voice, "x" * 1000) == {"timeout": None, "hedge_after": None}
+
+    service.model.record(voice, chars=100, seconds=2.0)  # 0.02 s/char
+    deadlines = service._block_deadlines(voice, "x" * 1000)
+    assert deadlines["timeout"] == pytest.approx(settings.BLOCK_TIMEOUT_FACTOR * 20.0)
+    assert deadlines["hedge_after"] == pytest.approx(settings.SPECULATE_AFTER_FACTOR * 20.0)
+    assert service._block_deadlines(voice, "x")["timeout"] == settings.BLOCK_TIMEOUT_MIN_SECONDS
+
+    monkeypatch.setattr(settings, "SPECULATE_AFTER_FACTOR", 0.0)
+    assert service._block_deadlines(voice, "x" * 1000)["hedge_after"] is None
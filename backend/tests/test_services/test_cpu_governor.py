@@ -0,0 +1,67 @@
+"""Tests for the CPU split between concurrent Piper processes."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.core.config import settings
+from app.services.cpu_governor import CpuGovernor, available_cpus, pin_process
+
+
+def test_default_is_one_thread_per_cpu():
+    governor = CpuGovernor(cpus=range(8), pin=False)
+    assert governor.workers == 8
+    assert governor.threads == 1
+
+
+def test_workers_get_their_share_of_cores():
+    governor = CpuGovernor(workers=3, cpus=range(8), pin=True)
+    assert governor.threads == 2
+    assert governor.cpu_sets == [[0, 1], [2, 3], [4, 5]]
+
+
+def test_threads_derive_worker_count():
+    governor = CpuGovernor(threads=4, cpus=[2, 3, 6, 7, 10, 11, 14, 15], pin=True)
+    assert governor.workers == 2
+    assert governor.cpu_sets == [[2, 3, 6, 7], [10, 11, 14, 15]]
+
+
+def test_oversubscribed_sets_wrap_around():
+    governor = CpuGovernor(workers=3, threads=2, cpus=range(4), pin=True)
+    assert governor.cpu_sets == [[0, 1], [2, 3], [0, 1]]
+
+
+def test_environment_carries_thread_budget():
+    env = CpuGovernor(workers=2, cpus=range(8), pin=False).environment({"PATH": "/bin"})
+    assert env["OMP_NUM_THREADS"] == "4"
+    assert env["PATH"] == "/bin"
+
+
+def test_describe_hides_sets_when_not_pinned():
+    info = CpuGovernor(workers=2, cpus=range(4), pin=False).describe()
+    assert info["workers"] == 2 and info["threads_per_worker"] is None
+    assert info["cpu_sets"] == []
+
+
+def test_pinned_by_default_when_slots_fit(monkeypatch):
+    monkeypatch.setattr(settings, "PIPER_PIN_CPUS", None)
+    governor = CpuGovernor(workers=2, threads=2, cpus=range(4))
+    assert governor.pin
+    assert governor.describe()["threads_per_worker"] == 2
+    assert not CpuGovernor(workers=3, threads=2, cpus=range(4)).pin
+    monkeypatch.setattr(settings, "PIPER_PIN_CPUS", False)
+    assert not CpuGovernor(workers=2, threads=2, cpus=range(4)).pin
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="needs sched_setaffinity")
+def test_pin_process_restricts_affinity():
+    cpu = available_cpus()[0]
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        pin_process(child.pid, [cpu])
+        assert os.sched_getaffinity(child.pid) == {cpu}
+    finally:
+        child.kill()
+        child.wait()
@@ -0,0 +1,44 @@
+"""Tests for aligning a revised document on a previous conversion."""
+
+from app.services.incremental import paragraph_hash, plan_blocks
+from app.services.text_processor import TextProcessor
+
+PARAGRAPHS = [f"Paragraphe {i}. " + "x" * 300 for i in range(40)]
+
+
+def _hashes(plan):
+    return [[paragraph_hash(p) for p in group] for group, _ in plan]
+
+
+def test_plan_without_previous_is_plain_chunking():
+    plan = plan_blocks(PARAGRAPHS, 1000)
+    assert ["\n".join(group) for group, _ in plan] == list(
+        TextProcessor.chunk_paragraphs("\n\n".join(PARAGRAPHS), 1000)
+    )
+    assert all(old is None for _, old in plan)
+
+
+def test_unchanged_document_reuses_every_block():
+    first = plan_blocks(PARAGRAPHS, 1000)
+    again = plan_blocks(PARAGRAPHS, 1000, _hashes(first))
+    assert [old for _, old in again] == list(range(len(first)))
+    assert [group for group, _ in again] == [group for group, _ in first]
+
+
+def test_edits_only_touch_their_blocks():
+    first = plan_blocks(PARAGRAPHS, 1000)
+    revised = PARAGRAPHS[:10] + ["Un paragraphe ajouté."] + PARAGRAPHS[10:]
+    revised[31] += " Corrigé."
+    plan = plan_blocks(revised, 1000, _hashes(first))
+
+    assert [p for group, _ in plan for p in group] == revised
+    new_blocks = [group for group, old in plan if old is None]
+    assert sum(len(group) for group in new_blocks) <= 2 * 3 + 1
+    assert any("Un paragraphe ajouté." in group for group in new_blocks)
+    assert any(revised[31] in group for group in new_blocks)
+    # les blocs repris gardent leur ordre et leur contenu
+    reused = [old for _, old in plan if old is not None]
+    assert reused == sorted(reused)
+    for group, old in plan:
+        if old is not None:
+            assert group == first[old][0]
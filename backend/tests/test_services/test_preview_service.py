@@ -0,0 +1,214 @@
+"""Tests for the preview cache and request coalescing."""
+
+import asyncio
+import struct
+import threading
+import wave
+
+import pytest
+
+from app.core.config import settings
+from app.core.exceptions import TTSEngineError
+from app.models.preview import TTSPreviewRequest, TTSStreamRequest
+from app.services.preview_service import PreviewService
+
+
+class SlowEngine:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize_block(self, text, voice_path, output_path, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.fail:
+            raise TTSEngineError("Piper failed with code 1")
+        with wave.open(output_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(b"\x00\x00" * 1600)
+
+    async def synthesize_text(self, text, voice_path, output_path, **kwargs):
+        await asyncio.sleep(self.delay)
+        self.synthesize_block(text, voice_path, output_path, **kwargs)
+        return 0.1
+
+
+@pytest.fixture(autouse=True)
+def voice():
+    path = settings.VOICES_BASE_PATH / "fr_FR-siwis-low.onnx"
+    path.write_bytes(b"model")
+    return path
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_hit_cache():
+    engine = SlowEngine()
+    service = PreviewService(engine)
+    request = TTSPreviewRequest(text="Bonjour à tous.")
+
+    first = await service.synthesize(request)
+    second = await service.synthesize(request)
+
+    assert engine.calls == 1
+    assert first[0] == second[0]
+    assert first[1] == pytest.approx(0.1)
+    assert (first[2], second[2]) == (False, True)
+
+
+@pytest.mark.asyncio
+async def test_parameters_and_text_are_part_of_the_key():
+    engine = SlowEngine()
+    service = PreviewService(engine)
+    ids = {
+        (await service.synthesize(TTSPreviewRequest(text="Bonjour.")))[0],
+        (await service.synthesize(TTSPreviewRequest(text="Bonjour.", length_scale=1.3)))[0],
+        (await service.synthesize(TTSPreviewRequest(text="Salut.")))[0],
+    }
+    assert len(ids) == 3
+    assert engine.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_synthesis():
+    engine = SlowEngine(delay=0.2)
+    service = PreviewService(engine)
+    request = TTSPreviewRequest(text="Phrase d'exemple.")
+
+    results = await asyncio.gather(*(service.synthesize(request) for _ in range(8)))
+
+    assert engine.calls == 1
+    assert len({r[0] for r in results}) == 1
+    assert sum(not r[2] for r in results) == 1
+    assert service.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failure_shared_and_not_cached():
+    engine = SlowEngine(delay=0.1, fail=True)
+    service = PreviewService(engine)
+    request = TTSPreviewRequest(text="Phrase d'exemple.")
+
+    results = await asyncio.gather(
+        *(service.synthesize(request) for _ in range(4)), return_exceptions=True
+    )
+    assert all(isinstance(r, TTSEngineError) for r in results)
+    assert engine.calls == 1
+
+    engine.fail = False
+    assert not (await service.synthesize(request))[2]
+    assert not list(service.preview_dir().glob("*.part"))
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_hands_over_to_follower():
+    engine = SlowEngine(delay=0.2)
+    service = PreviewService(engine)
+    request = TTSPreviewRequest(text="Phrase d'exemple.")
+
+    leader = asyncio.create_task(service.synthesize(request))
+    await asyncio.sleep(0.05)
+    follower = asyncio.create_task(service.synthesize(request))
+    await asyncio.sleep(0.05)
+    leader.cancel()
+
+    preview_id, duration, cached = await follower
+    assert leader.cancelled()
+    assert duration == pytest.approx(0.1)
+    assert not cached
+    assert service.preview_path(preview_id) is not None
+    assert service.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_missing_output_is_an_engine_error():
+    class SilentEngine:
+        async def synthesize_text(self, text, voice_path, output_path, **kwargs):
+            return 0.1
+
+    service = PreviewService(SilentEngine())
+    with pytest.raises(TTSEngineError, match="no audio"):
+        await service.synthesize(TTSPreviewRequest(text="Bonjour."))
+    assert service.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction(monkeypatch):
+    monkeypatch.setattr(settings, "PREVIEW_CACHE_MAX_ENTRIES", 2)
+    service = PreviewService(SlowEngine())
+    a = (await service.synthesize(TTSPreviewRequest(text="A.")))[0]
+    b = (await service.synthesize(TTSPreviewRequest(text="B.")))[0]
+    await service.synthesize(TTSPreviewRequest(text="A."))  # A redevient récent
+    await service.synthesize(TTSPreviewRequest(text="C."))
+
+    assert service.preview_path(a) is not None
+    assert service.preview_path(b) is None
+    assert service.stats()["entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_files_from_previous_run_are_reused():
+    request = TTSPreviewRequest(text="Bonjour.")
+    await PreviewService(SlowEngine()).synthesize(request)
+
+    engine = SlowEngine()
+    assert (await PreviewService(engine).synthesize(request))[2]
+    assert engine.calls == 0
+
+
+class RecordingEngine(SlowEngine):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.texts = []
+
+    def synthesize_block(self, text, voice_path, output_path, **kwargs):
+        self.texts.append(text)
+        super().synthesize_block(text, voice_path, output_path, **kwargs)
+
+
+async def _collect(service, request):
+    chunks = await service.stream(request)
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_stream_sentence_by_sentence():
+    engine = RecordingEngine()
+    service = PreviewService(engine)
+    chunks = await _collect(service, TTSStreamRequest(text="Première phrase. Deuxième phrase ! Et la fin."))
+
+    assert engine.texts == ["Première phrase.", "Deuxième phrase !", "Et la fin."]
+    assert len(chunks) == 3
+    header = chunks[0][:44]
+    assert header[:4] == b"RIFF" and header[8:16] == b"WAVEfmt "
+    assert struct.unpack("<I", header[24:28])[0] == 16000
+    assert len(chunks[0]) == 44 + 3200
+    assert all(len(c) == 3200 for c in chunks[1:])
+
+
+@pytest.mark.asyncio
+async def test_stream_first_chunk_is_short(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_FIRST_CHUNK_CHARS", 20)
+    engine = RecordingEngine()
+    service = PreviewService(engine)
+    await _collect(service, TTSStreamRequest(text="Une phrase, coupée à la virgule et qui continue."))
+
+    assert engine.texts[0] == "Une phrase,"
+    assert len(engine.texts) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_error_after_first_sentence():
+    class FailingEngine(RecordingEngine):
+        def synthesize_block(self, text, voice_path, output_path, **kwargs):
+            self.fail = text.startswith("Deux")
+            super().synthesize_block(text, voice_path, output_path, **kwargs)
+
+    service = PreviewService(FailingEngine())
+    chunks = await service.stream(TTSStreamRequest(text="Un. Deux."))
+    assert (await chunks.__anext__()).startswith(b"RIFF")
+    with pytest.raises(TTSEngineError):
+        await chunks.__anext__()
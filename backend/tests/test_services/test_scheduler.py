@@ -0,0 +1,245 @@
+"""Tests for the global work-stealing scheduler."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import scheduler as scheduler_module
+from app.services.scheduler import WorkStealingScheduler
+
+
+@pytest.fixture
+def scheduler():
+    sched = WorkStealingScheduler(num_workers=4, batch_size=2)
+    yield sched
+    sched.shutdown()
+
+
+def test_group_completion_tracking(scheduler):
+    """All tasks run once and the completion callback fires once."""
+    results = []
+    lock = threading.Lock()
+    completed = []
+
+    def make(i):
+        def run():
+            with lock:
+                results.append(i)
+        return run
+
+    group = scheduler.submit("job", [make(i) for i in range(50)], on_complete=completed.append)
+
+    assert group.finished.wait(5)
+    assert sorted(results) == list(range(50))
+    assert group.done == group.total == 50
+    assert completed == [group]
+    assert not group.failed
+
+
+def test_empty_group_completes_immediately(scheduler):
+    completed = []
+    group = scheduler.submit("job", [], on_complete=completed.append)
+    assert group.finished.is_set()
+    assert completed == [group]
+
+
+def test_small_job_not_stuck_behind_large_job(scheduler):
+    """Fair queuing lets another client's late small job finish before a big one."""
+    big = scheduler.submit("big", [lambda: time.sleep(0.01) for _ in range(200)], flow="a")
+    time.sleep(0.02)
+    small = scheduler.submit("small", [lambda: time.sleep(0.01) for _ in range(4)], flow="b")
+
+    assert small.finished.wait(5)
+    assert not big.finished.is_set()
+    assert big.finished.wait(10)
+
+
+def test_large_job_uses_all_workers(scheduler):
+    """A single job's blocks are spread over every worker."""
+    threads = set()
+    lock = threading.Lock()
+
+    def run():
+        with lock:
+            threads.add(threading.current_thread().name)
+        time.sleep(0.01)
+
+    group = scheduler.submit("job", [run for _ in range(40)])
+    assert group.finished.wait(5)
+    assert len(threads) == scheduler.num_workers
+
+
+def test_failed_task_cancels_rest_of_group(scheduler):
+    ran = []
+
+    def boom():
+        raise RuntimeError("piper crashed")
+
+    calls = [boom] + [lambda: (time.sleep(0.01), ran.append(1)) for _ in range(100)]
+    group = scheduler.submit("job", calls)
+
+    assert group.finished.wait(5)
+    assert group.failed
+    assert isinstance(group.errors[0], RuntimeError)
+    assert len(ran) < 100
+
+
+def test_steal_takes_from_other_workers(scheduler):
+    from app.services.scheduler import TaskGroup, _Task
+
+    group = TaskGroup("job", 6)
+    scheduler._locals[1].extend(_Task(group, lambda: None, 1.0) for _ in range(6))
+
+    task = scheduler._steal(0, scheduler._locals[0])
+
+    assert task is not None
+    assert len(scheduler._locals[1]) == 3
+    assert len(scheduler._locals[0]) == 2
+
+
+def test_jobs_of_same_flow_start_in_order():
+    sched = WorkStealingScheduler(num_workers=1, batch_size=1)
+    order = []
+    try:
+        gate = threading.Event()
+        sched.submit("first", [gate.wait], flow="client")
+        sched.submit("second", [lambda: order.append("second")], flow="client")
+        sched.submit("third", [lambda: order.append("third")], flow="client")
+        time.sleep(0.05)
+
+        assert sched.queue_info("first") is None  # already running
+        assert sched.queue_info("second")[0] == 1
+        assert sched.queue_info("third")[0] == 2
+
+        gate.set()
+        for _ in range(100):
+            if len(order) == 2:
+                break
+            time.sleep(0.01)
+        assert order == ["second", "third"]
+    finally:
+        sched.shutdown()
+
+
+def test_weighted_fair_share_between_flows():
+    """A heavier flow gets proportionally more dispatches than a bulk one."""
+    sched = WorkStealingScheduler(num_workers=1, batch_size=1)
+    order = []
+    try:
+        gate = threading.Event()
+        sched.submit("blocker", [gate.wait], flow="blocker")
+        time.sleep(0.02)
+        bulk = sched.submit("bulk", [lambda: order.append("bulk") for _ in range(20)],
+                            flow="bulk", weight=1.0)
+        inter = sched.submit("inter", [lambda: order.append("inter") for _ in range(20)],
+                             flow="inter", weight=4.0)
+        gate.set()
+        assert inter.finished.wait(5) and bulk.finished.wait(5)
+
+        first_half = order[:20]
+        assert first_half.count("inter") >= 15
+    finally:
+        sched.shutdown()
+
+
+def test_keep_open_holds_flow_until_group_done():
+    """Tasks submitted from an open job keep their place ahead of later jobs."""
+    sched = WorkStealingScheduler(num_workers=1, batch_size=1)
+    order = []
+    started = threading.Event()
+    try:
+        def prepare():
+            started.set()
+            time.sleep(0.05)
+            sched.submit("a", [lambda: order.append("a-block") for _ in range(3)], flow="c")
+
+        sched.submit("a", [prepare], flow="c", keep_open=True, estimated_cost=3)
+        sched.submit("b", [lambda: order.append("b")], flow="c")
+        assert started.wait(1)
+        assert sched.queue_info("b") == (1, 3.0)
+
+        for _ in range(100):
+            if len(order) == 4:
+                break
+            time.sleep(0.01)
+        assert order == ["a-block"] * 3 + ["b"]
+    finally:
+        sched.shutdown()
+
+
+def test_drain_rate_measures_completed_cost(scheduler):
+    assert scheduler.drain_rate() is None
+    group = scheduler.submit("job", [lambda: None] * 4, costs=[100.0] * 4)
+    assert group.finished.wait(5)
+    assert scheduler.drain_rate() == pytest.approx(400.0)
+
+
+def test_drain_rate_counts_time_spent_on_first_tasks(scheduler, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(scheduler_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+
+    def slow():
+        clock[0] += 10.0
+
+    group = scheduler.submit("job", [slow], costs=[100.0])
+    assert group.finished.wait(5)
+    # 100 de coût en 10 s de travail, pas en 1 s depuis la première complétion
+    assert scheduler.drain_rate() == pytest.approx(10.0)
+
+
+def test_express_tasks_run_before_everything_else():
+    sched = WorkStealingScheduler(num_workers=1, batch_size=1)
+    order = []
+    try:
+        gate, started = threading.Event(), threading.Event()
+        sched.submit("running", [lambda: (started.set(), gate.wait())], flow="a")
+        assert started.wait(1)
+        sched.submit("old", [lambda i=i: order.append(f"old{i}") for i in range(3)], flow="a")
+        group = sched.submit(
+            "new", [lambda i=i: order.append(f"new{i}") for i in range(3)], flow="b", express=2
+        )
+        queued = sched.stats()["queued"]
+        gate.set()
+        assert queued == 6
+        assert group.finished.wait(1)
+        time.sleep(0.05)
+        assert order[:2] == ["new0", "new1"]
+        assert sorted(order[2:]) == ["new2", "old0", "old1", "old2"]
+    finally:
+        sched.shutdown()
+
+
+def test_all_express_group_completes():
+    sched = WorkStealingScheduler(num_workers=2)
+    try:
+        group = sched.submit("job", [lambda: None] * 2, express=5)
+        assert group.finished.wait(1)
+        assert group.done == 2
+        assert sched.queue_info("job") is None
+    finally:
+        sched.shutdown()
+
+
+def test_cancel_drops_queued_tasks_and_completes_group():
+    sched = WorkStealingScheduler(num_workers=1, batch_size=1)
+    ran, completed = [], []
+    try:
+        gate, started = threading.Event(), threading.Event()
+        sched.submit("running", [lambda: (started.set(), gate.wait())], flow="a")
+        assert started.wait(1)
+        group = sched.submit(
+            "victim", [lambda i=i: ran.append(i) for i in range(5)],
+            on_complete=completed.append, flow="a", express=1,
+        )
+        other = sched.submit("other", [lambda: ran.append("other")], flow="b")
+
+        assert sched.cancel("victim") == 5
+        assert sched.queue_info("victim") is None
+        gate.set()
+        assert group.finished.wait(1) and other.finished.wait(1)
+        assert ran == ["other"]
+        assert completed == [group] and group.cancelled and not group.failed
+    finally:
+        sched.shutdown()
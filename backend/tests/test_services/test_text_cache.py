@@ -0,0 +1,68 @@
+"""Tests for the on-disk cache of extracted and chunked text."""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
+from app.services.text_cache import TextCache
+
+CHUNKS = ["Premier paragraphe,\nsur deux lignes.", "Deuxième paragraphe : « é à ç ».", "x" * 5000]
+
+
+def _source(name="book.pdf", content=b"%PDF-1.4 book"):
+    path = Path(settings.UPLOAD_DIR) / name
+    path.write_bytes(content)
+    return path
+
+
+def test_roundtrip_and_single_chunk():
+    cache = TextCache()
+    cache.put("k1", CHUNKS, {"furniture_chars": 12})
+
+    assert cache.get("k1") == (CHUNKS, {"furniture_chars": 12})
+    assert cache.read_chunk("k1", 1) == CHUNKS[1]
+    assert cache.read_chunk("k1", 2) == CHUNKS[2]
+    # morceaux compressés : l'entrée est plus petite que le texte
+    assert cache.entry_path("k1").stat().st_size < sum(len(b.encode()) for b in CHUNKS)
+
+
+def test_miss_and_corrupt_entry():
+    cache = TextCache()
+    misses = CACHE_REQUESTS.value(cache="text", result="miss")
+    assert cache.get("absent") is None
+
+    cache.put("k2", CHUNKS)
+    path = cache.entry_path("k2")
+    path.write_bytes(path.read_bytes()[:40])
+    assert cache.get("k2") is None
+    assert not path.exists()
+    assert CACHE_REQUESTS.value(cache="text", result="miss") == misses + 2
+
+
+def test_key_depends_on_content_and_versions():
+    first = TextCache.key(_source("a.pdf"))
+    assert TextCache.key(_source("b.pdf")) == first
+    assert TextCache.key(_source("c.pdf", b"%PDF-1.4 other")) != first
+    with patch("app.services.text_cache.CLEANER_VERSION", -1):
+        assert TextCache.key(_source("a.pdf")) != first
+
+
+def test_least_recently_read_entries_evicted():
+    cache = TextCache(max_bytes=0)
+    cache.put("old", CHUNKS)
+    assert not cache.entry_path("old").exists()
+
+    cache.max_bytes = None
+    cache.put("a", CHUNKS)
+    cache.put("b", CHUNKS)
+    os.utime(cache.entry_path("a"), (1, 1))
+    os.utime(cache.entry_path("b"), (2, 2))
+    cache.get("a")  # relu : devient la plus récente
+    cache.max_bytes = 2 * cache.entry_path("a").stat().st_size
+    cache.put("c", CHUNKS)
+
+    assert cache.entry_path("a").exists()
+    assert not cache.entry_path("b").exists()
+    assert cache.entry_path("c").exists()
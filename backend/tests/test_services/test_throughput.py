@@ -0,0 +1,45 @@
+"""Tests for the measured synthesis throughput model."""
+
+import pytest
+
+from app.core.config import settings
+from app.services.throughput import ThroughputModel
+
+
+def test_default_before_any_measurement():
+    model = ThroughputModel()
+    assert model.seconds_per_char("fr_FR-siwis-low") == settings.DEFAULT_SECONDS_PER_CHAR
+
+
+def test_first_sample_then_moving_average():
+    model = ThroughputModel(alpha=0.5)
+    model.record("voices/fr_FR-siwis-low.onnx", chars=1000, seconds=10.0)
+    assert model.seconds_per_char("fr_FR-siwis-low") == pytest.approx(0.01)
+
+    model.record("fr_FR-siwis-low", chars=1000, seconds=20.0)
+    assert model.seconds_per_char("fr_FR-siwis-low") == pytest.approx(0.015)
+
+
+def test_voices_are_tracked_separately():
+    model = ThroughputModel()
+    model.record("fr_FR-siwis-low", chars=100, seconds=1.0)
+    model.record("fr_FR-tom-medium", chars=100, seconds=3.0)
+    assert model.estimate_seconds("fr_FR-tom-medium", 1000) == pytest.approx(30.0)
+    assert model.estimate_seconds("fr_FR-siwis-low", 1000) == pytest.approx(10.0)
+
+
+def test_invalid_samples_are_ignored():
+    model = ThroughputModel()
+    model.record("v", chars=0, seconds=1.0)
+    model.record("v", chars=10, seconds=0.0)
+    assert model.seconds_per_char("v") == settings.DEFAULT_SECONDS_PER_CHAR
+
+
+def test_measurements_are_per_host():
+    model = ThroughputModel(host="worker-a")
+    model.record("fr_FR-siwis-low", chars=100, seconds=2.0)
+    assert model.snapshot() == {"fr_FR-siwis-low": pytest.approx(50.0)}
+    assert model.chars_per_second("fr_FR-siwis-low") == pytest.approx(50.0)
+
+    other = ThroughputModel(host="worker-b")
+    assert other.snapshot() == {}
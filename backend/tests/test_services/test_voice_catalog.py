@@ -0,0 +1,136 @@
+"""Tests for the cached voice catalog."""
+
+import os
+import wave
+
+import pytest
+
+from app.core.config import settings
+from app.core.exceptions import TTSEngineError
+from app.models.voice import VoiceQuality
+from app.services.voice_catalog import VoiceCatalog
+
+
+@pytest.fixture
+def catalog(temp_storage, monkeypatch):
+    monkeypatch.setattr(settings, "VOICE_CATALOG_CHECK_SECONDS", 0.0)
+    return VoiceCatalog(temp_storage / "voices")
+
+
+class CountingEngine:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    def synthesize_block(self, text, voice_path, output_path, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise TTSEngineError("Piper failed with code 1")
+        with wave.open(output_path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(b"\x00\x00" * 160)
+
+
+def test_metadata_merged(catalog, sample_voice_files):
+    voice = catalog.get("fr_FR-test-low")
+
+    assert voice.name == "Test Voice"
+    assert voice.language == "fr_FR"
+    assert voice.quality == VoiceQuality.LOW
+    assert voice.sample_rate == 16000
+    assert voice.model_path == "voices/fr/fr_FR/test/low/fr_FR-test-low.onnx"
+    assert voice.is_available
+    assert voice.metadata["recommended_usage"] == ["test"]
+
+
+def test_config_without_model_listed_as_unavailable(catalog, temp_storage):
+    (temp_storage / "voices" / "fr_FR-gilles-low.onnx.json").write_text("{}")
+
+    voice = catalog.get("fr_FR-gilles-low")
+    assert not voice.is_available
+    assert voice.quality == VoiceQuality.LOW
+
+
+def test_model_name_without_hyphen(catalog, sample_voice_files, temp_storage):
+    (temp_storage / "voices" / "myvoice.onnx").write_bytes(b"model")
+
+    voice = catalog.get("myvoice")
+    assert voice.dataset == "myvoice"
+    assert voice.name == "Myvoice"
+    assert catalog.get("fr_FR-test-low") is not None
+
+
+def test_rebuilt_only_when_mtimes_change(catalog, sample_voice_files):
+    _, etag = catalog.response()
+    build = catalog._build
+    calls = []
+    catalog._build = lambda root: (calls.append(root), build(root))
+
+    assert catalog.response()[1] == etag
+    assert calls == []
+
+    new_dir = sample_voice_files.parent.parent / "medium"
+    new_dir.mkdir()
+    (new_dir / "fr_FR-test-medium.onnx").write_bytes(b"model")
+    body, new_etag = catalog.response()
+    assert len(calls) == 1
+    assert new_etag != etag
+    assert b"fr_FR-test-medium" in body
+
+
+def test_check_interval_throttles_scans(catalog, sample_voice_files, monkeypatch):
+    monkeypatch.setattr(settings, "VOICE_CATALOG_CHECK_SECONDS", 3600.0)
+    catalog.refresh()
+    sample_voice_files.unlink()
+
+    assert catalog.voices()[0].is_available  # pas encore revérifié
+    catalog.refresh(force=True)
+    assert not catalog.voices()[0].is_available
+
+
+def test_unknown_voice_rescans_only_after_directory_change(catalog, sample_voice_files, monkeypatch):
+    monkeypatch.setattr(settings, "VOICE_CATALOG_CHECK_SECONDS", 3600.0)
+    catalog.refresh()
+    scans = []
+    signature = catalog._signature
+    monkeypatch.setattr(catalog, "_signature", lambda root: (scans.append(root), signature(root))[1])
+
+    assert catalog.get("fr_FR-inconnue-low") is None
+    assert catalog.get("fr_FR-inconnue-low") is None
+    assert scans == []
+
+    (sample_voice_files.parent / "fr_FR-nouvelle-low.onnx").write_bytes(b"model")
+    assert catalog.get("fr_FR-nouvelle-low") is not None
+    assert len(scans) == 1
+
+
+def test_validation_cached_per_size_and_mtime(catalog, sample_voice_files):
+    engine = CountingEngine()
+    first = catalog.validate(lambda: engine)
+    catalog.validate(lambda: engine)
+
+    assert first.summary["working_models"] == 1
+    assert first.summary["piper_available"]
+    assert engine.calls == 1
+
+    stat = sample_voice_files.stat()
+    os.utime(sample_voice_files, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    catalog.validate(lambda: engine)
+    assert engine.calls == 2
+
+
+def test_validation_without_piper_not_cached(catalog, sample_voice_files):
+    def missing():
+        raise TTSEngineError("Piper executable not found: piper")
+
+    result = catalog.validate(missing)
+    assert not result.summary["piper_available"]
+    assert result.summary["working_models"] == 0
+
+    engine = CountingEngine(fail=True)
+    result = catalog.validate(lambda: engine)
+    assert engine.calls == 1
+    assert not result.validation_results[0].working
+    assert result.recommendations
@@ -0,0 +1,253 @@
+"""Tests for the warm Piper session pool, against a fake `--json-input` Piper."""
+
+import asyncio
+import os
+import threading
+import time
+import wave
+from concurrent.futures import CancelledError
+
+import pytest
+
+from app.core.exceptions import TTSEngineError
+from app.core.metrics import PIPER_RESTARTS
+from app.services.cpu_governor import CpuGovernor, available_cpus
+from app.services.tts_engine import TTSEngine
+from app.services.voice_pool import VoicePool
+
+
+@pytest.fixture
+def voices(temp_dir):
+    paths = []
+    for name in ("fr_FR-a-low", "fr_FR-b-low", "fr_FR-c-low"):
+        path = temp_dir / f"{name}.onnx"
+        path.write_bytes(b"model")
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def pool():
+    pool = VoicePool(memory_budget=1 << 40)
+    yield pool
+    pool.shutdown()
+
+
+def test_session_reused_across_blocks(piper, voices, pool, temp_dir):
+    engine = TTSEngine(piper, pool=pool)
+    for i in range(3):
+        out = temp_dir / f"out{i}.wav"
+        engine.synthesize_block("Bonjour tout le monde.", str(voices[0]), str(out))
+        with wave.open(str(out), "rb") as wf:
+            assert wf.getnframes() == 1600
+
+    stats = pool.stats()["fr_FR-a-low"]
+    assert stats["loads"] == 1
+    assert stats["sessions"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["last_load_seconds"] > 0
+
+
+def test_synthesis_params_get_their_own_session(piper, voices, pool, temp_dir):
+    engine = TTSEngine(piper, pool=pool)
+    engine.synthesize_block("Un.", str(voices[0]), str(temp_dir / "a.wav"))
+    engine.synthesize_block("Deux.", str(voices[0]), str(temp_dir / "b.wav"), length_scale=1.5)
+
+    assert pool.stats()["fr_FR-a-low"]["sessions"] == 2
+
+
+def test_lru_eviction_under_budget(piper, voices, pool, temp_dir):
+    engine = TTSEngine(piper, pool=pool)
+    engine.synthesize_block("Un.", str(voices[0]), str(temp_dir / "a.wav"))
+    per_session = pool.memory_used()
+    pool.memory_budget = 2 * per_session + per_session // 2
+
+    engine.synthesize_block("Deux.", str(voices[1]), str(temp_dir / "b.wav"))
+    engine.synthesize_block("Un.", str(voices[0]), str(temp_dir / "a.wav"))  # a redevient récent
+    engine.synthesize_block("Trois.", str(voices[2]), str(temp_dir / "c.wav"))
+
+    stats = pool.stats()
+    assert stats["fr_FR-b-low"]["evictions"] == 1
+    assert stats["fr_FR-b-low"]["sessions"] == 0
+    assert stats["fr_FR-a-low"]["sessions"] == 1
+    assert stats["fr_FR-c-low"]["sessions"] == 1
+    assert pool.memory_used() <= pool.memory_budget
+
+
+def test_crashed_session_is_replaced(piper, voices, pool, temp_dir):
+    engine = TTSEngine(piper, pool=pool)
+    before = PIPER_RESTARTS.value(voice="fr_FR-a-low", reason="crash")
+    with pytest.raises(TTSEngineError, match="code 3"):
+        engine.synthesize_block("CRASH", str(voices[0]), str(temp_dir / "a.wav"))
+    assert pool.stats()["fr_FR-a-low"]["sessions"] == 0
+    assert PIPER_RESTARTS.value(voice="fr_FR-a-low", reason="crash") == before + 1
+
+    engine.synthesize_block("Encore.", str(voices[0]), str(temp_dir / "b.wav"))
+    assert pool.stats()["fr_FR-a-low"]["loads"] == 2
+
+
+def test_timeout_kills_session(piper, voices, pool, temp_dir):
+    engine = TTSEngine(piper, pool=pool)
+    before = PIPER_RESTARTS.value(voice="fr_FR-a-low", reason="timeout")
+    started = time.monotonic()
+    with pytest.raises(TTSEngineError, match="timed out"):
+        engine.synthesize_block("SLEEP 30", str(voices[0]), str(temp_dir / "a.wav"), timeout=0.5)
+    assert time.monotonic() - started < 10
+    assert pool.stats()["fr_FR-a-low"]["sessions"] == 0
+    assert PIPER_RESTARTS.value(voice="fr_FR-a-low", reason="timeout") == before + 1
+
+    engine.synthesize_block("Encore.", str(voices[0]), str(temp_dir / "b.wav"))
+    assert pool.stats()["fr_FR-a-low"]["loads"] == 2
+
+
+def test_concurrency_bounded_by_semaphore(piper, voices, temp_dir):
+    pool = VoicePool(memory_budget=1 << 40, max_concurrency=2)
+    engine = TTSEngine(piper, pool=pool)
+    try:
+        threads = [
+            threading.Thread(target=engine.synthesize_block, args=(
+                "SLEEP 0.3", str(voices[0]), str(temp_dir / f"{i}.wav"),
+            ))
+            for i in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # jamais plus de deux processus en parallèle : deux sessions suffisent
+        assert pool.stats()["fr_FR-a-low"]["sessions"] == 2
+        assert all((temp_dir / f"{i}.wav").exists() for i in range(4))
+    finally:
+        pool.shutdown()
+
+
+def test_cancelled_call_kills_session(piper, voices, pool, temp_dir):
+    engine = TTSEngine(piper, pool=pool)
+    before = PIPER_RESTARTS.value(voice="fr_FR-a-low", reason="crash")
+
+    async def cancel_during_synthesis():
+        task = asyncio.ensure_future(
+            engine.synthesize_text("SLEEP 30", str(voices[0]), str(temp_dir / "a.wav"))
+        )
+        await asyncio.sleep(1.0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_during_synthesis())
+    deadline = time.monotonic() + 5
+    while pool.stats()["fr_FR-a-low"]["sessions"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool.stats()["fr_FR-a-low"]["sessions"] == 0
+    # tué volontairement : ce n'est pas un crash
+    assert PIPER_RESTARTS.value(voice="fr_FR-a-low", reason="crash") == before
+
+
+def test_synthesize_text_returns_duration(piper, voices, pool, temp_dir):
+    engine = TTSEngine(piper, pool=pool)
+    duration = asyncio.run(
+        engine.synthesize_text("Bonjour.", str(voices[0]), str(temp_dir / "a.wav"))
+    )
+    assert duration == pytest.approx(0.1)
+
+
+def test_cancel_by_tag_kills_running_synthesis(piper, voices, pool, temp_dir):
+    engine = TTSEngine(piper, pool=pool)
+    errors = []
+
+    def run():
+        try:
+            engine.synthesize_block("SLEEP 30", str(voices[0]), str(temp_dir / "a.wav"), tag="job")
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not engine.cancel("job") and time.monotonic() < deadline:
+        time.sleep(0.05)
+    started = time.monotonic()
+    thread.join(5)
+    assert time.monotonic() - started < 1.0
+    assert isinstance(errors[0], CancelledError)
+
+
+def test_sessions_pinned_to_their_cpu_slot(piper, voices, temp_dir):
+    cpu = available_cpus()[-1]
+    governor = CpuGovernor(workers=1, cpus=[cpu], pin=True)
+    pool = VoicePool(memory_budget=1 << 40, governor=governor)
+    engine = TTSEngine(piper, pool=pool)
+    try:
+        engine.synthesize_block("Un.", str(voices[0]), str(temp_dir / "a.wav"))
+        (session,) = pool._sessions.values()
+        assert os.sched_getaffinity(session.process.pid) == {cpu}
+        assert pool.max_concurrency == 1
+    finally:
+        pool.shutdown()
+
+
+def test_slow_block_hedged_with_backup(piper, voices, temp_dir):
+    from app.core.metrics import SPECULATIVE_RUNS
+
+    pool = VoicePool(memory_budget=1 << 40, max_concurrency=2)
+    engine = TTSEngine(piper, pool=pool)
+    before = SPECULATIVE_RUNS.value(winner="backup")
+    started = time.monotonic()
+    out = temp_dir / "a.wav"
+    engine.synthesize_block(
+        f"STALL {temp_dir / 'flag'}", str(voices[0]), str(out), hedge_after=0.3
+    )
+
+    assert time.monotonic() - started < 5
+    with wave.open(str(out), "rb") as wf:
+        assert wf.getnframes() == 1600
+    assert not (temp_dir / "a.wav.backup.wav").exists()
+    assert SPECULATIVE_RUNS.value(winner="backup") == before + 1
+    # la copie lente a été tuée : sa session n'est pas remise au pool
+    assert pool.stats()["fr_FR-a-low"]["sessions"] == 1
+    pool.shutdown()
+
+
+def test_fast_block_not_hedged(piper, voices, pool, temp_dir):
+    engine = TTSEngine(piper, pool=pool)
+    engine.synthesize_block("Bonjour.", str(voices[0]), str(temp_dir / "a.wav"), hedge_after=5)
+    assert pool.stats()["fr_FR-a-low"]["loads"] == 1
+
+
+def test_no_backup_without_free_slot(piper, voices, temp_dir):
+    pool = VoicePool(memory_budget=1 << 40, max_concurrency=1)
+    engine = TTSEngine(piper, pool=pool)
+    try:
+        with pytest.raises(TTSEngineError, match="timed out"):
+            engine.synthesize_block(
+                f"STALL {temp_dir / 'flag'}", str(voices[0]), str(temp_dir / "a.wav"),
+                timeout=1.0, hedge_after=0.2,
+            )
+        assert pool.stats()["fr_FR-a-low"]["loads"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_interactive_synthesis_does_not_wait_for_busy_slots(piper, voices, temp_dir):
+    pool = VoicePool(memory_budget=1 << 40, max_concurrency=1, interactive_slots=1)
+    engine = TTSEngine(piper, pool=pool)
+    batch = threading.Thread(target=engine.synthesize_block, args=(
+        "SLEEP 3", str(voices[0]), str(temp_dir / "block.wav"),
+    ))
+    try:
+        batch.start()
+        deadline = time.monotonic() + 5
+        while not (pool._semaphore and pool._semaphore.locked()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        asyncio.run(engine.synthesize_text(
+            "Bonjour.", str(voices[0]), str(temp_dir / "preview.wav"), interactive=True
+        ))
+        # servie par le créneau réservé, sans attendre la fin du bloc
+        assert time.monotonic() - started < 2
+        assert batch.is_alive()
+    finally:
+        batch.join()
+        pool.shutdown()
@@ -1,22 +1,138 @@
 """Tests for text extraction services."""
 
+import io
+import zipfile
+
 import pytest
 from pathlib import Path
-from app.services.text_extractor import TextExtractor
+from unittest.mock import patch
+
+from app.services.text_extractor import TextExtractor, parse_selection, selected_indices
 from app.core.exceptions import TextExtractionError
 
-def test_extract_from_pdf():
+
+def make_pdf(path: Path, pages):
+    """Minimal PDF with one line of text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream.decode('latin-1')}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    path.write_bytes(out.getvalue())
+    return path
+
+
+def make_epub(path: Path, chapters):
+    """EPUB whose spine lists `chapters` in reverse manifest order, plus an image."""
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip")
+        zf.writestr("META-INF/container.xml", (
+            '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            '</rootfiles></container>'
+        ))
+        manifest = "".join(
+            f'<item id="c{i}" href="c{i}.xhtml" media-type="application/xhtml+xml"/>'
+            for i in reversed(range(len(chapters)))
+        )
+        spine = "".join(f'<itemref idref="c{i}"/>' for i in range(len(chapters)))
+        zf.writestr("OEBPS/content.opf", (
+            '<package xmlns="http://www.idpf.org/2007/opf" version="2.0">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:title>Livre</dc:title></metadata>'
+            f'<manifest>{manifest}<item id="img" href="cover.jpg" media-type="image/jpeg"/></manifest>'
+            f"<spine>{spine}</spine></package>"
+        ))
+        for i, text in enumerate(chapters):
+            zf.writestr(f"OEBPS/c{i}.xhtml", f"<html><body><p>{text}</p></body></html>")
+        zf.writestr("OEBPS/cover.jpg", b"\xff\xd8" * 100)
+    return path
+
+
+def test_extract_from_pdf(temp_dir):
     """Test PDF text extraction."""
-    # Create a simple test PDF or use fixture
-    # This would require a test PDF file
-    pass
+    pdf = make_pdf(temp_dir / "book.pdf", ["Page one", "Page two", "Page three"])
+    text = TextExtractor.extract_from_pdf(pdf)
+    assert [page.strip() for page in text.split("\f")] == ["Page one", "Page two", "Page three"]
+
+
+def test_extract_pdf_page_range_skips_other_pages(temp_dir):
+    from PyPDF2 import PageObject
+
+    pdf = make_pdf(temp_dir / "book.pdf", [f"Page {i}" for i in range(1, 11)])
+    with patch.object(PageObject, "extract_text", autospec=True,
+                      side_effect=lambda page, *a, **k: "x") as extract:
+        TextExtractor.extract_from_pdf(pdf, pages="3-4,9")
+    assert extract.call_count == 3
+
+    text = TextExtractor.extract_from_file(pdf, pages="3-4, 9-40")
+    assert [page.strip() for page in text.split("\f")] == ["Page 3", "Page 4", "Page 9", "Page 10"]
+
+
+def test_extract_from_epub(temp_dir):
+    """Test EPUB text extraction."""
+    epub = make_epub(temp_dir / "book.epub", ["Un", "Deux", "Trois", "Quatre"])
+    assert TextExtractor.extract_from_file(epub, chapters="2-3") == "Deux\nTrois"
+    assert TextExtractor.extract_from_file(epub, chapters="4,1") == "Un\nQuatre"
+
+
+def test_epub_streams_spine_documents_only(temp_dir):
+    epub = make_epub(temp_dir / "book.epub", ["Un", "Deux", "Trois"])
+    opened = []
+    real_open = zipfile.ZipFile.open
+
+    def spy(self, name, *args, **kwargs):
+        opened.append(getattr(name, "filename", name))
+        return real_open(self, name, *args, **kwargs)
+
+    with patch.object(zipfile.ZipFile, "open", spy):
+        documents = TextExtractor.iter_epub(epub)
+        assert opened == []
+        assert next(documents) == "Un"
+        assert "OEBPS/c1.xhtml" not in opened
+        assert list(documents) == ["Deux", "Trois"]
+
+    # ordre du spine (et non du manifeste), sans jamais lire l'image
+    assert opened == ["META-INF/container.xml", "OEBPS/content.opf",
+                      "OEBPS/c0.xhtml", "OEBPS/c1.xhtml", "OEBPS/c2.xhtml"]
+
+
+def test_selection_parsing():
+    assert parse_selection("120-180, 200") == [(120, 180), (200, 200)]
+    assert selected_indices(None, 3) == [0, 1, 2]
+    assert selected_indices("2-2,1", 3) == [0, 1]
+    for spec in ("0", "5-3", "a-b", ""):
+        with pytest.raises(ValueError):
+            parse_selection(spec)
+    with pytest.raises(TextExtractionError):
+        selected_indices("10-12", 3)
+
+
+def test_selection_must_match_format():
+    with pytest.raises(TextExtractionError):
+        TextExtractor.check_selection(Path("book.epub"), pages="1-2")
+    with pytest.raises(TextExtractionError):
+        TextExtractor.check_selection(Path("book.pdf"), chapters="1")
+    TextExtractor.check_selection(Path("book.pdf"), pages="1-2")
 
-def test_extract_from_epub():
-    """Test EPUB text extraction.""" 
-    # Create a simple test EPUB or use fixture
-    pass
 
 def test_unsupported_format():
     """Test handling of unsupported file formats."""
     with pytest.raises(TextExtractionError):
-        TextExtractor.extract_from_file(Path("test.txt"))
\ No newline at end of file
+        TextExtractor.extract_from_file(Path("test.txt"))
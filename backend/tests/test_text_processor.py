@@ -14,4 +14,33 @@ def test_chunk_paragraphs():
     text = "Paragraph 1.\n\nParagraph 2.\n\nParagraph 3."
     chunks = list(TextProcessor.chunk_paragraphs(text, max_chars=20))
     assert len(chunks) > 1
-    assert all(len(chunk) <= 20 for chunk in chunks)
\ No newline at end of file
+    assert all(len(chunk) <= 20 for chunk in chunks)
+
+def _book_pages(count):
+    """Pages with alternating running headers, a page number and unique body text."""
+    pages = []
+    for i in range(1, count + 1):
+        header = "LE GRAND LIVRE" if i % 2 else "Chapitre premier : le départ"
+        body = f"Ligne {'a' * i} du récit.\nElle continue {'b' * i}."
+        pages.append(f"{header}\n{body}\n\n- {i} -")
+    return "\f".join(pages)
+
+
+def test_strip_page_furniture():
+    text, removed = TextProcessor.strip_page_furniture(_book_pages(10))
+    assert "LE GRAND LIVRE" not in text
+    assert "Chapitre premier" not in text
+    assert "- 3 -" not in text
+    assert text.count("du récit.") == 10
+    headers = 5 * len("LE GRAND LIVRE") + 5 * len("Chapitre premier : le départ")
+    page_numbers = 9 * len("- 1 -") + len("- 10 -")
+    assert removed == headers + page_numbers
+
+
+def test_strip_page_furniture_keeps_short_documents():
+    text = _book_pages(2)
+    assert TextProcessor.strip_page_furniture(text) == (text, 0)
+
+
+def test_clean_text_joins_pages():
+    assert TextProcessor.clean_text("Fin de page\fDébut") == "Fin de page\nDébut"
@@ -56,4 +56,149 @@ def test_get_audio_info_invalid_job_id():
 
 # Note: For full integration tests with actual files,
 # we would need to set up proper test fixtures with temp directories
-# and mock the settings.outputs_dir
\ No newline at end of file
+# and mock the settings.outputs_dir
+
+@pytest.fixture
+def finished_audio(temp_audio_file):
+    """Place a WAV file where a completed job's output would be."""
+    job_id = "0123456789abcdef"
+    target = settings.OUTPUT_DIR / f"{job_id}.wav"
+    target.write_bytes(temp_audio_file.read_bytes())
+    temp_audio_file.unlink()
+    return job_id, target.read_bytes()
+
+def test_get_audio_full(finished_audio):
+    job_id, data = finished_audio
+    response = client.get(f"/api/audio/{job_id}")
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "audio/wav"
+    assert response.headers["etag"].startswith('"')
+
+def test_get_audio_range(finished_audio):
+    job_id, data = finished_audio
+    response = client.get(f"/api/audio/{job_id}", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == data[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(data)}"
+    assert response.headers["content-length"] == "100"
+
+def test_get_audio_suffix_and_open_ranges(finished_audio):
+    job_id, data = finished_audio
+    response = client.get(f"/api/audio/{job_id}", headers={"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.content == data[-10:]
+
+    response = client.get(f"/api/audio/{job_id}", headers={"Range": f"bytes={len(data) - 5}-"})
+    assert response.content == data[-5:]
+
+def test_get_audio_unsatisfiable_range(finished_audio):
+    job_id, data = finished_audio
+    response = client.get(f"/api/audio/{job_id}", headers={"Range": f"bytes={len(data)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(data)}"
+
+def test_get_audio_conditional_requests(finished_audio):
+    job_id, data = finished_audio
+    etag = client.head(f"/api/audio/{job_id}").headers["etag"]
+
+    response = client.get(f"/api/audio/{job_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # stale If-Range: the whole file is sent instead of the range
+    response = client.get(f"/api/audio/{job_id}",
+                          headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == data
+
+def test_head_audio_has_no_body(finished_audio):
+    job_id, data = finished_audio
+    response = client.head(f"/api/audio/{job_id}")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == str(len(data))
+
+def test_download_audio_is_attachment(finished_audio):
+    job_id, _ = finished_audio
+    response = client.get(f"/api/audio/{job_id}/download")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == f'attachment; filename="{job_id}.wav"'
+
+def test_get_audio_info(finished_audio):
+    job_id, data = finished_audio
+    response = client.get(f"/api/audio/info/{job_id}")
+    assert response.status_code == 200
+    info = response.json()
+    assert info["size_bytes"] == len(data)
+    assert info["duration_seconds"] == 1.0
+    assert info["sample_rate"] == 16000
+
+@pytest.mark.asyncio
+async def test_zero_copy_send_when_server_supports_it(finished_audio):
+    from unittest.mock import Mock
+    from app.api.responses import FileRangeResponse
+
+    job_id, data = finished_audio
+    request = Mock(method="GET", headers={"range": "bytes=10-19"})
+    response = FileRangeResponse(settings.OUTPUT_DIR / f"{job_id}.wav", request)
+    messages = []
+
+    async def send(message):
+        messages.append(dict(message))
+
+    scope = {"type": "http", "extensions": {"http.response.zerocopysend": {}}}
+    await response(scope, None, send)
+
+    assert messages[0]["status"] == 206
+    assert messages[1]["type"] == "http.response.zerocopysend"
+    assert (messages[1]["offset"], messages[1]["count"]) == (10, 10)
+
+@pytest.fixture
+def running_job(temp_audio_file):
+    """A job with blocks 0 and 1 synthesized, block 2 in flight."""
+    from datetime import datetime
+    from app.models.conversion import Status
+    from app.services.conversion_service import conversion_service
+
+    job_id = "fedcba9876543210"
+    conversion_service.jobs[job_id] = {
+        "status": Status.PROCESSING,
+        "block_durations": [1.0, 2.5, None],
+        "segments_ready": 2,
+    }
+    segment_dir = conversion_service.segment_dir(job_id)
+    segment_dir.mkdir(parents=True)
+    for index in range(2):
+        conversion_service.segment_path(job_id, index).write_bytes(temp_audio_file.read_bytes())
+    yield job_id
+    del conversion_service.jobs[job_id]
+
+def test_manifest_lists_published_segments(running_job):
+    response = client.get(f"/api/audio/{running_job}/manifest")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["complete"] is False
+    assert [s["start_seconds"] for s in data["segments"]] == [0.0, 1.0]
+    assert data["segments"][1]["url"] == f"/api/audio/{running_job}/segments/1"
+
+def test_playlist_grows_without_endlist_while_running(running_job):
+    response = client.get(f"/api/audio/{running_job}/playlist.m3u8")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/vnd.apple.mpegurl")
+    body = response.text
+    assert "#EXT-X-PLAYLIST-TYPE:EVENT" in body
+    assert "#EXT-X-TARGETDURATION:3" in body
+    assert "#EXTINF:2.500,\nsegments/1" in body
+    assert "#EXT-X-ENDLIST" not in body
+
+def test_segment_served_only_once_published(running_job):
+    assert client.get(f"/api/audio/{running_job}/segments/0").status_code == 200
+    response = client.get(f"/api/audio/{running_job}/segments/1", headers={"Range": "bytes=0-43"})
+    assert response.status_code == 206
+    assert client.get(f"/api/audio/{running_job}/segments/2").status_code == 404
+
+def test_manifest_unknown_job():
+    assert client.get("/api/audio/unknown-job-id/manifest").status_code == 404
+    assert client.get("/api/audio/bad/playlist.m3u8").status_code == 400
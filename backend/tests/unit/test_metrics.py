@@ -0,0 +1,47 @@
+"""Tests for the Prometheus-style metrics registry."""
+
+from app.core.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_with_labels():
+    counter = Counter("test_total", "Test counter.", ["voice"])
+    counter.inc(voice="a")
+    counter.inc(2, voice="a")
+    counter.inc(voice="b")
+
+    assert counter.value(voice="a") == 3
+    lines = counter.render()
+    assert "# TYPE test_total counter" in lines
+    assert 'test_total{voice="a"} 3' in lines
+    assert 'test_total{voice="b"} 1' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Test histogram.", ["stage"], buckets=(1, 5))
+    for value in (0.5, 2, 3, 10):
+        histogram.observe(value, stage="synthesis")
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{stage="synthesis",le="1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="synthesis",le="5"} 3' in lines
+    assert 'latency_seconds_bucket{stage="synthesis",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{stage="synthesis"} 15.5' in lines
+    assert 'latency_seconds_count{stage="synthesis"} 4' in lines
+
+
+def test_gauge_collected_at_render_time():
+    state = {"depth": 3}
+    gauge = Gauge("queue_depth", "Test gauge.", lambda: {(): state["depth"]})
+    assert "queue_depth 3" in gauge.render()
+    state["depth"] = 7
+    assert "queue_depth 7" in gauge.render()
+
+
+def test_registry_render_and_label_escaping():
+    registry = Registry()
+    counter = registry.register(Counter("c_total", "Escaping.", ["name"]))
+    counter.inc(name='quote"d')
+
+    text = registry.render()
+    assert text.endswith("\n")
+    assert 'c_total{name="quote\\"d"} 1' in text
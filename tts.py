@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
-import sys, re, wave, unicodedata, subprocess, tempfile, os, shutil
+import sys, re, wave, unicodedata, subprocess, tempfile, os, shutil, json, time, threading, argparse
+import posixpath, zipfile
+import xml.etree.ElementTree as ET
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from PyPDF2 import PdfReader
-from ebooklib import epub, ITEM_DOCUMENT
 from bs4 import BeautifulSoup
 
 VOICE_FILE = "voices/fr/fr_FR/siwis/low/fr_FR-siwis-low.onnx"
@@ -11,26 +14,136 @@ NOISE_SCALE  = "0.667"
 NOISE_W      = "0.8"
 SENT_SIL     = "0.35"    # pause entre phrases côté CLI
 PAUSE_BETWEEN_BLOCKS = 0.35  # pause manuelle entre blocs (sécurité)
+# Réglages calibrés par `python -m app.tune` (backend) : processus piper
+# simultanés, threads par processus et taille des blocs, par voix
+TUNING_PROFILE = os.environ.get("TTS_TUNING_PROFILE", "voices/tuning_profile.json")
+DEFAULT_TUNING = {"workers": 1, "threads": None, "max_chars": 1500}
 
-def extract_text_from_pdf(fp: Path) -> str:
+# Traînards : un bloc expire après TIMEOUT_FACTOR x son temps attendu, et
+# une seconde synthèse est lancée après SPECULATE_FACTOR x ce temps ; la
+# première copie terminée est gardée
+SECONDS_PER_CHAR = 0.01   # estimation initiale, affinée au fil des blocs
+TIMEOUT_FACTOR, TIMEOUT_MIN = 10.0, 30.0
+SPECULATE_FACTOR, SPECULATE_MIN = 3.0, 5.0
+_pace = {"chars": 0, "seconds": 0.0}
+
+# Bloc en échec : RETRIES nouvelles tentatives espacées (délai doublé, max
+# 8 s), puis découpage en phrases pour isoler la fautive, remplacée par un
+# silence ("silence"), omise ("skip") ou fatale ("fail")
+RETRIES, RETRY_BACKOFF = 2, 0.5
+BAD_SENTENCE = "silence"
+SYNTH_ERRORS = (subprocess.CalledProcessError, subprocess.TimeoutExpired)
+bad_sentences = []
+_pace_lock = threading.Lock()
+
+def expected_seconds(n_chars: int) -> float:
+    with _pace_lock:
+        rate = _pace["seconds"] / _pace["chars"] if _pace["chars"] else SECONDS_PER_CHAR
+    return n_chars * rate
+
+def record_pace(n_chars: int, seconds: float):
+    with _pace_lock:
+        _pace["chars"] += n_chars
+        _pace["seconds"] += seconds
+
+def load_tuning(voice_file: str = VOICE_FILE) -> dict:
+    """Réglages du profil pour la voix, s'il a été mesuré sur une machine comme celle-ci."""
+    tuning = dict(DEFAULT_TUNING)
+    try:
+        with open(TUNING_PROFILE, encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return tuning
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    entry = profile.get("voices", {}).get(Path(voice_file).stem)
+    if entry and profile.get("cpus") == cpus:
+        tuning.update({k: entry[k] for k in DEFAULT_TUNING if k in entry})
+    return tuning
+
+def select(spec, count: int):
+    """Indices (à partir de 0) retenus par "120-180,200" parmi `count`, dans l'ordre du document."""
+    if not spec:
+        return list(range(count))
+    chosen = set()
+    for part in spec.split(","):
+        m = re.fullmatch(r"\s*(\d+)\s*(?:-\s*(\d+))?\s*", part)
+        if not m or int(m.group(1)) < 1 or int(m.group(2) or m.group(1)) < int(m.group(1)):
+            raise ValueError(f"Sélection invalide : {part.strip()!r}")
+        chosen.update(range(int(m.group(1)) - 1, min(int(m.group(2) or m.group(1)), count)))
+    if not chosen:
+        raise ValueError(f"Sélection {spec!r} hors du document ({count} au total)")
+    return sorted(chosen)
+
+def extract_text_from_pdf(fp: Path, pages=None) -> str:
+    """Texte des pages retenues ; les autres ne sont pas analysées."""
     reader = PdfReader(str(fp))
     parts = []
-    for page in reader.pages:
-        t = page.extract_text() or ""
+    for i in select(pages, len(reader.pages)):
+        t = reader.pages[i].extract_text() or ""
         parts.append(t)
-    return "\n".join(parts)
+    return "\f".join(parts)  # pages séparées : voir strip_page_furniture
+
+def strip_page_furniture(text: str, edge_lines: int = 3, min_ratio: float = 0.3, min_pages: int = 3):
+    """Retire en-têtes, pieds de page et numéros de page répétés ; renvoie (texte, caractères retirés).
+
+    Une ligne en bord de page est réduite à une empreinte (minuscules, nombres
+    remplacés par #) avec sa position ; celles présentes sur au moins
+    `min_ratio` des pages sont retirées partout.
+    """
+    pages = [page.split("\n") for page in text.split("\f")]
+    if len(pages) < min_pages:
+        return text, 0
 
-def extract_text_from_epub(fp: Path) -> str:
-    book = epub.read_epub(str(fp))
+    def edges(lines):
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        for rank, i in enumerate(filled[:edge_lines]):
+            yield i, ("top", rank, re.sub(r"\d+", "#", " ".join(lines[i].lower().split())))
+        for rank, i in enumerate(reversed(filled[-edge_lines:])):
+            yield i, ("bottom", rank, re.sub(r"\d+", "#", " ".join(lines[i].lower().split())))
+
+    counts = {}
+    for lines in pages:
+        for key in {key for _, key in edges(lines)}:
+            counts[key] = counts.get(key, 0) + 1
+    threshold = max(min_pages, min_ratio * len(pages))
+    furniture = {key for key, n in counts.items() if n >= threshold}
+    removed, kept = 0, []
+    for lines in pages:
+        drop = {i for i, key in edges(lines) if key in furniture}
+        removed += sum(len(lines[i].strip()) for i in drop)
+        kept.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+    return "\f".join(kept), removed
+
+def epub_spine(zf: zipfile.ZipFile):
+    """Documents du spine dans l'ordre de lecture ; seuls container.xml et l'OPF sont lus."""
+    ns_c = {"c": "urn:oasis:names:tc:opendocument:xmlns:container"}
+    ns_o = {"opf": "http://www.idpf.org/2007/opf"}
+    rootfile = ET.fromstring(zf.read("META-INF/container.xml")).find(".//c:rootfile", ns_c)
+    opf_path = rootfile.get("full-path", "")
+    opf = ET.fromstring(zf.read(opf_path))
+    base = posixpath.dirname(opf_path)
+    hrefs = {
+        item.get("id"): posixpath.normpath(posixpath.join(base, unquote(item.get("href", ""))))
+        for item in opf.iterfind("opf:manifest/opf:item", ns_o)
+    }
+    spine = [hrefs.get(ref.get("idref")) for ref in opf.iterfind("opf:spine/opf:itemref", ns_o)]
+    return [name for name in spine if name in zf.NameToInfo]
+
+def extract_text_from_epub(fp: Path, chapters=None) -> str:
+    """Texte des documents du spine (ou des seuls `chapters`), un document en mémoire à la fois.
+
+    Les images, polices et feuilles de style du zip ne sont jamais lues.
+    """
     chunks = []
-    for item in book.get_items_of_type(ITEM_DOCUMENT):
-        html = item.get_content().decode("utf-8", errors="ignore")
-        text = BeautifulSoup(html, "lxml").get_text(" ", strip=True)
-        chunks.append(text)
+    with zipfile.ZipFile(fp) as zf:
+        spine = epub_spine(zf)
+        for i in select(chapters, len(spine)):
+            html = zf.read(spine[i]).decode("utf-8", errors="ignore")
+            chunks.append(BeautifulSoup(html, "lxml").get_text(" ", strip=True))
     return "\n".join(chunks)
 
 def clean_text(text: str) -> str:
-    text = unicodedata.normalize("NFKD", text)
+    text = unicodedata.normalize("NFKD", text).replace("\f", "\n")
     text = "".join(c for c in text if not unicodedata.combining(c))
     text = re.sub(r"[ \t]+", " ", text)
     text = re.sub(r"\n{2,}", "\n\n", text)
@@ -48,9 +161,8 @@ def chunk_paragraphs(text: str, max_chars: int = 1500):
     if cur:
         yield "\n".join(cur)
 
-def call_piper_cli_to_wav(block_text: str, out_wav: Path):
-    # On passe le texte via stdin (chaque ligne = une “utterance”)
-    cmd = [
+def piper_command(out_wav: Path):
+    return [
         "piper",
         "--model", VOICE_FILE,
         "--output_file", str(out_wav),
@@ -59,8 +171,158 @@ def call_piper_cli_to_wav(block_text: str, out_wav: Path):
         "--noise_w", NOISE_W,
         "--sentence_silence", SENT_SIL,
     ]
+
+def piper_env(threads=None):
+    if not threads:
+        return None
+    # budget de threads de calcul, pour ne pas surcharger les cœurs à plusieurs
+    return dict(os.environ, OMP_NUM_THREADS=str(threads))
+
+# onnxruntime (piper) ignore OMP_NUM_THREADS : c'est l'affinité qui borne ses
+# threads. Chaque thread de synthèse reçoit son jeu de CPU (voir main)
+_slot = threading.local()
+
+def cpu_sets(workers: int, threads) -> list:
+    """Jeux de CPU disjoints, un par processus piper ; aucun si le budget dépasse les CPU."""
+    if not threads or not hasattr(os, "sched_setaffinity"):
+        return []
+    cpus = sorted(os.sched_getaffinity(0))
+    if workers * threads > len(cpus):
+        return []
+    return [cpus[i * threads:(i + 1) * threads] for i in range(workers)]
+
+def pin_piper(pid: int):
+    """Restreint tous les threads de `pid` au jeu de CPU du thread appelant."""
+    cpus = getattr(_slot, "cpus", None)
+    if not cpus:
+        return
+    try:
+        tids = [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        tids = [pid]
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except OSError:
+            pass
+
+def start_piper(block_text: str, out_wav: Path, threads=None) -> subprocess.Popen:
+    proc = subprocess.Popen(piper_command(out_wav), stdin=subprocess.PIPE, text=True,
+                            env=piper_env(threads))
+    pin_piper(proc.pid)
+    # On passe le texte via stdin (chaque ligne = une “utterance”)
     # piper lit une ligne = un énoncé ; on force un seul énoncé par bloc
-    subprocess.run(cmd, input=block_text.strip()+"\n", text=True, check=True)
+    proc.stdin.write(block_text.strip() + "\n")
+    proc.stdin.close()
+    return proc
+
+def synthesize_block(block_text: str, out_wav: Path, threads=None):
+    """Synthèse d'un bloc avec délai maximal et copie de secours s'il traîne."""
+    expected = expected_seconds(len(block_text))
+    deadline = max(TIMEOUT_MIN, TIMEOUT_FACTOR * expected)
+    speculate_at = max(SPECULATE_MIN, SPECULATE_FACTOR * expected)
+    backup_wav = out_wav.with_suffix(".backup.wav")
+    t0 = time.monotonic()
+    attempts = [(start_piper(block_text, out_wav, threads), out_wav)]
+    try:
+        while True:
+            codes = [proc.poll() for proc, _ in attempts]
+            if 0 in codes:
+                winner = attempts[codes.index(0)]
+                # le perdant est tué avant de toucher au fichier de sortie
+                for proc, _ in attempts:
+                    if proc is not winner[0] and proc.poll() is None:
+                        proc.kill(); proc.wait()
+                if winner[1] != out_wav:
+                    os.replace(winner[1], out_wav)
+                record_pace(len(block_text), time.monotonic() - t0)
+                return
+            if None not in codes:
+                raise subprocess.CalledProcessError(codes[0], attempts[0][0].args)
+            elapsed = time.monotonic() - t0
+            if elapsed > deadline:
+                raise subprocess.TimeoutExpired(attempts[0][0].args, deadline)
+            if len(attempts) == 1 and elapsed > speculate_at:
+                print(f"🐢 Bloc lent ({elapsed:.0f}s), seconde synthèse en parallèle…")
+                attempts.append((start_piper(block_text, backup_wav, threads), backup_wav))
+            time.sleep(0.05)
+    finally:
+        for proc, _ in attempts:
+            if proc.poll() is None:
+                proc.kill(); proc.wait()
+        backup_wav.unlink(missing_ok=True)
+
+def synthesize_with_retry(block_text: str, out_wav: Path, threads=None):
+    delay = RETRY_BACKOFF
+    for attempt in range(RETRIES + 1):
+        try:
+            return synthesize_block(block_text, out_wav, threads)
+        except SYNTH_ERRORS as e:
+            if attempt == RETRIES:
+                raise
+            print(f"⚠️ Échec de synthèse ({e}), nouvel essai dans {delay:.1f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 8.0)
+
+def split_sentences(text: str):
+    return [s for s in re.split(r"(?<=[.!?…])\s+", " ".join(text.split())) if s]
+
+def synthesize_with_recovery(block_text: str, out_wav: Path, threads=None):
+    """Synthèse d'un bloc ; s'il échoue toujours, la phrase fautive est isolée par dichotomie."""
+    try:
+        return synthesize_with_retry(block_text, out_wav, threads)
+    except SYNTH_ERRORS as e:
+        if BAD_SENTENCE == "fail":
+            raise
+        error = e
+    print(f"⚠️ Bloc en échec ({error}), recherche de la phrase fautive…")
+
+    def bisect(sentences, wav):
+        try:
+            synthesize_block(" ".join(sentences), wav, threads)
+            return [wav]
+        except SYNTH_ERRORS as e:
+            if len(sentences) == 1:
+                print(f"❌ Phrase ignorée ({e}) : {sentences[0]!r}")
+                bad_sentences.append(sentences[0])
+                if BAD_SENTENCE == "skip":
+                    return []
+                # silence de la durée estimée de la phrase (~15 caractères/s)
+                return [len(sentences[0]) / 15.0 * float(LENGTH_SCALE) + float(SENT_SIL)]
+        mid = len(sentences) // 2
+        return (bisect(sentences[:mid], wav.with_suffix(".0.wav"))
+                + bisect(sentences[mid:], wav.with_suffix(".1.wav")))
+
+    sentences = split_sentences(block_text)
+    if len(sentences) > 1:
+        mid = len(sentences) // 2
+        parts = (bisect(sentences[:mid], out_wav.with_suffix(".0.wav"))
+                 + bisect(sentences[mid:], out_wav.with_suffix(".1.wav")))
+    else:
+        parts = bisect(sentences, out_wav.with_suffix(".0.wav")) if sentences else []
+    files = [p for p in parts if isinstance(p, Path)]
+    if not files:
+        # aucune phrase ne passe : une synthèse d'essai dit si la voix elle-même est en cause
+        probe = out_wav.with_suffix(".probe.wav")
+        try:
+            synthesize_block("Bonjour.", probe, threads)
+        except SYNTH_ERRORS:
+            probe.unlink(missing_ok=True)
+            raise error
+        files.append(probe)
+    with wave.open(str(files[0]), "rb") as ref:
+        nch, sw, sr = ref.getnchannels(), ref.getsampwidth(), ref.getframerate()
+    with wave.open(str(out_wav), "wb") as out_wf:
+        out_wf.setnchannels(nch)
+        out_wf.setsampwidth(sw)
+        out_wf.setframerate(sr)
+        for part in parts:
+            if isinstance(part, Path):
+                append_wav(out_wf, part)
+            else:
+                write_silence(out_wf, part, sr)
+    for part in files:
+        part.unlink(missing_ok=True)
 
 def append_wav(dst_wf: wave.Wave_write, src_wav: Path):
     with wave.open(str(src_wav), "rb") as sf:
@@ -77,12 +339,15 @@ def write_silence(dst_wf: wave.Wave_write, seconds: float, sample_rate: int):
     dst_wf.writeframes(b"\x00\x00" * n_samples)
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python tts_cli.py <fichier.pdf|fichier.epub> [out.wav]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Convertit un PDF ou un EPUB en WAV avec piper.")
+    parser.add_argument("input", help="fichier.pdf ou fichier.epub")
+    parser.add_argument("output", nargs="?", default="output.wav")
+    parser.add_argument("--pages", help='pages du PDF à convertir, ex. "120-180" ou "1-3,7"')
+    parser.add_argument("--chapters", help='chapitres (documents du spine) de l\'EPUB, ex. "3-5"')
+    args = parser.parse_args()
 
-    in_path = Path(sys.argv[1])
-    out_path = Path(sys.argv[2]) if len(sys.argv) >= 3 else Path("output.wav")
+    in_path = Path(args.input)
+    out_path = Path(args.output)
 
     if not shutil.which("piper"):
         print("❌ Le binaire `piper` n'est pas trouvé dans le PATH.")
@@ -91,24 +356,42 @@ def main():
     if not in_path.exists():
         print("❌ Fichier introuvable:", in_path); sys.exit(1)
 
-    if in_path.suffix.lower() == ".pdf":
-        raw = extract_text_from_pdf(in_path)
-    elif in_path.suffix.lower() == ".epub":
-        raw = extract_text_from_epub(in_path)
-    else:
-        print("❌ Format non supporté (PDF ou EPUB uniquement)."); sys.exit(1)
+    suffix = in_path.suffix.lower()
+    if args.pages and suffix != ".pdf" or args.chapters and suffix != ".epub":
+        print("❌ --pages s'applique aux PDF, --chapters aux EPUB."); sys.exit(1)
+    try:
+        if suffix == ".pdf":
+            raw = extract_text_from_pdf(in_path, args.pages)
+        elif suffix == ".epub":
+            raw = extract_text_from_epub(in_path, args.chapters)
+        else:
+            print("❌ Format non supporté (PDF ou EPUB uniquement)."); sys.exit(1)
+    except ValueError as e:
+        print("❌", e); sys.exit(1)
 
+    raw, furniture = strip_page_furniture(raw)
+    if furniture:
+        print(f"✂️ En-têtes/pieds de page retirés : {furniture} caractères "
+              f"(~{expected_seconds(furniture):.0f}s de synthèse en moins)")
     text = clean_text(raw)
+    tuning = load_tuning()
 
     # On génère chaque bloc dans un wav temporaire via le CLI, puis on concatène proprement
     with tempfile.TemporaryDirectory() as td:
         td_path = Path(td)
-        tmp_wavs = []
-        print("⏳ Synthèse par blocs…")
-        for i, block in enumerate(chunk_paragraphs(text)):
-            wpath = td_path / f"chunk_{i:05d}.wav"
-            call_piper_cli_to_wav(block, wpath)
-            tmp_wavs.append(wpath)
+        blocks = list(chunk_paragraphs(text, tuning["max_chars"]))
+        tmp_wavs = [td_path / f"chunk_{i:05d}.wav" for i in range(len(blocks))]
+        print(f"⏳ Synthèse par blocs… ({tuning['workers']} processus piper)")
+        sets = cpu_sets(tuning["workers"], tuning["threads"])
+        # un jeu de CPU par thread de synthèse (autant de jeux que de threads)
+        with ThreadPoolExecutor(tuning["workers"], initializer=lambda: setattr(
+                _slot, "cpus", sets.pop() if sets else None)) as pool:
+            # list() propage la première erreur de synthèse
+            list(pool.map(lambda b, w: synthesize_with_recovery(b, w, tuning["threads"]),
+                          blocks, tmp_wavs))
+        if bad_sentences:
+            print(f"⚠️ {len(bad_sentences)} phrase(s) impossible(s) à synthétiser, "
+                  f"{'omises' if BAD_SENTENCE == 'skip' else 'remplacées par un silence'}.")
 
         # Ouvrir le premier pour récupérer le format (mono, 16-bit, rate)
         if not tmp_wavs: